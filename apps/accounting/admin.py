@@ -1,28 +1,100 @@
 from django.contrib import admin
-from django.utils.html import format_html
-from django.db.models import Q
-from .models import Client
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.http import Http404, HttpResponseRedirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils.html import format_html, format_html_join
+from django.db.models import Count, Q
+from django.shortcuts import get_object_or_404
+from .models import ArchivedClient, Client, DuplicateCandidate
+from .archive import restore_clients
+from .dedup import MERGE_FIELDS, dismiss_candidates, find_duplicates, merge_clients, record_candidates
+from .reassignment import reassign_clients, reassignment_summary
+from .selection import serialize_selection
 from apps.business_lines.models import BusinessLine
+from apps.business_lines.hierarchy import get_request_tree
+from apps.business_lines.scoping import allowed_line_ids, is_line_allowed, is_scoped, scope_queryset
+from apps.common.autocomplete import PrefixAutocompleteMixin
+from apps.common.jobs import enqueue
+from apps.common.private_files import private_file_response
+from apps.common.tracing import traced
+
+
+# A partir de este número de clientes las acciones se ejecutan en segundo plano
+BACKGROUND_ACTION_THRESHOLD = 2000
 
 
 class ClientBusinessLineFilter(admin.SimpleListFilter):
-    """Filtro personalizado por línea de negocio jerárquica"""
+    """Filtro por línea de negocio jerárquica: incluye todo el subárbol y muestra recuentos"""
     title = 'Línea de negocio'
     parameter_name = 'business_line_hierarchy'
 
+    def __init__(self, request, params, model, model_admin):
+        self.request = request
+        self.tree = get_request_tree(request)
+        super().__init__(request, params, model, model_admin)
+
     def lookups(self, request, model_admin):
-        lines = BusinessLine.objects.filter(is_active=True).order_by('level', 'name')
+        allowed = allowed_line_ids(request)
         choices = []
-        for line in lines:
-            indent = "    " * (line.level - 1)
-            choices.append((line.id, f"{indent}{line.name}"))
+        for line_id, depth in self.tree.walk(only_active=True):
+            if allowed is not None and line_id not in allowed:
+                continue
+            indent = "    " * (depth - 1)
+            choices.append((line_id, f"{indent}{self.tree.nodes[line_id]['name']}"))
         return choices
 
+    def _selected_line_id(self):
+        try:
+            line_id = int(self.value())
+        except (TypeError, ValueError):
+            return None
+        if line_id not in self.tree or not is_line_allowed(self.request, line_id):
+            return None
+        return line_id
+
     def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(business_line_id=self.value())
+        line_id = self._selected_line_id()
+        if line_id is not None:
+            return queryset.filter(business_line_id__in=self.tree.descendant_ids(line_id))
         return queryset
 
+    def facet_counts(self, changelist):
+        """
+        Clientes por nodo respetando el resto de filtros y la búsqueda:
+        un único GROUP BY por línea, acumulado hacia arriba en memoria.
+        """
+        queryset = changelist.root_queryset
+        for spec in changelist.filter_specs:
+            if spec is not self:
+                # None significa "sin filtrar"; un queryset vacío es un resultado válido
+                filtered = spec.queryset(self.request, queryset)
+                if filtered is not None:
+                    queryset = filtered
+        queryset, _ = changelist.model_admin.get_search_results(
+            self.request, queryset, changelist.query
+        )
+        counts = dict(
+            queryset.order_by().values('business_line_id')
+            .annotate(total=Count('pk')).values_list('business_line_id', 'total')
+        )
+        return self.tree.fold_counts(counts)
+
+    def choices(self, changelist):
+        counts = self.facet_counts(changelist)
+        yield {
+            'selected': self.value() is None,
+            'query_string': changelist.get_query_string(remove=[self.parameter_name]),
+            'display': 'Todas',
+        }
+        for lookup, title in self.lookup_choices:
+            yield {
+                'selected': self.value() == str(lookup),
+                'query_string': changelist.get_query_string({self.parameter_name: lookup}),
+                'display': f"{title} ({counts.get(lookup, 0)})",
+            }
+
 
 class RenovacionProximaFilter(admin.SimpleListFilter):
     """Filtro para clientes con renovación próxima"""
@@ -47,7 +119,7 @@ class RenovacionProximaFilter(admin.SimpleListFilter):
 
 
 @admin.register(Client)
-class ClientAdmin(admin.ModelAdmin):
+class ClientAdmin(PrefixAutocompleteMixin, admin.ModelAdmin):
     """
     Admin para Client con filtros inteligentes y gestión de remanentes
     """
@@ -88,6 +160,14 @@ class ClientAdmin(admin.ModelAdmin):
         'business_line__parent__name'
     ]
     
+    # Selector con búsqueda en lugar de un <select> con todas las líneas
+    autocomplete_fields = ['business_line']
+    
+    # Autocompletado para futuros FK a Client: prefijo indexado sobre nombre y DNI
+    autocomplete_prefix_fields = ['nombre', 'dni']
+    autocomplete_only_fields = ['id', 'nombre', 'dni']
+    autocomplete_ordering = ['nombre']
+    
     readonly_fields = [
         'remanente_total',
         'dias_hasta_renovacion',
@@ -108,9 +188,9 @@ class ClientAdmin(admin.ModelAdmin):
             'description': 'El nutricionista debe seleccionar: White/Black, precio y tarjeta/efectivo'
         }),
         ('📅 Fechas del Servicio (Obligatorio)', {
-            'fields': ('fecha_inicio', 'fecha_renovacion'),
+            'fields': ('fecha_inicio', 'fecha_renovacion', 'periodicidad_meses'),
             'classes': ('wide',),
-            'description': 'El nutricionista debe introducir ambas fechas manualmente'
+            'description': 'El nutricionista debe introducir ambas fechas y la periodicidad de renovación'
         }),
         ('💳 Remanentes (Solo si es Black)', {
             'fields': (
@@ -143,12 +223,16 @@ class ClientAdmin(admin.ModelAdmin):
     
     ordering = ['business_line__name', 'categoria', 'nombre']
     
+    change_list_template = 'admin/accounting/client/change_list.html'
+    
+    @traced()
     def get_business_line_path(self, obj):
         """Muestra la ruta completa de la línea de negocio"""
         return obj.business_line.get_full_path()
     get_business_line_path.short_description = "Línea de negocio"
     get_business_line_path.admin_order_field = 'business_line__name'
     
+    @traced()
     def get_remanente_display(self, obj):
         """Muestra el remanente total con formato"""
         if obj.categoria == 'Black' and obj.remanente_total > 0:
@@ -162,6 +246,7 @@ class ClientAdmin(admin.ModelAdmin):
             return format_html('<span style="color: #bdc3c7;">N/A</span>')
     get_remanente_display.short_description = "Remanente"
     
+    @traced()
     def get_renovacion_status(self, obj):
         """Muestra el estado de renovación con colores"""
         dias = obj.dias_hasta_renovacion
@@ -184,31 +269,406 @@ class ClientAdmin(admin.ModelAdmin):
             )
     get_renovacion_status.short_description = "Renovación"
     
+    def get_autocomplete_text(self, request, obj):
+        return f"{obj.nombre} ({obj.dni})"
+    
     def get_queryset(self, request):
-        """Optimizar consultas"""
-        return super().get_queryset(request).select_related(
+        """Optimizar consultas; solo clientes de las líneas del ámbito del usuario"""
+        return scope_queryset(request, super().get_queryset(request)).select_related(
             'business_line', 
             'business_line__parent'
         )
     
+    def changelist_view(self, request, extra_context=None):
+        # Los informes agregados cubren todas las líneas: no se ofrecen con ámbito
+        extra_context = {'show_reports': not is_scoped(request), **(extra_context or {})}
+        return super().changelist_view(request, extra_context)
+    
+    def get_urls(self):
+        """Añade la vista de proyección de ingresos"""
+        custom_urls = [
+            path(
+                'proyeccion-ingresos/',
+                self.admin_site.admin_view(self.revenue_projection_view),
+                name='accounting_client_revenue_projection',
+            ),
+            path(
+                'cohortes/',
+                self.admin_site.admin_view(self.cohort_report_view),
+                name='accounting_client_cohort_report',
+            ),
+            path(
+                '<int:pk>/recibo/<str:period>/',
+                self.admin_site.admin_view(self.receipt_view),
+                name='accounting_client_receipt',
+            ),
+        ]
+        return custom_urls + super().get_urls()
+    
+    def revenue_projection_view(self, request):
+        """Proyección mensual de ingresos por línea de negocio (cacheada)"""
+        if is_scoped(request):
+            raise PermissionDenied
+        # Import diferido: NumPy no se carga al arrancar el proceso
+        from .projections import get_cached_revenue_projection
+        
+        try:
+            months = min(max(int(request.GET.get('meses', 12)), 1), 24)
+        except ValueError:
+            months = 12
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Proyección de ingresos',
+            'opts': self.model._meta,
+            'projection': get_cached_revenue_projection(months),
+            'months': months,
+        }
+        return TemplateResponse(
+            request, 'admin/accounting/client/revenue_projection.html', context
+        )
+    
+    def cohort_report_view(self, request):
+        """Retención por cohortes de inicio y abandono por grupo"""
+        if is_scoped(request):
+            raise PermissionDenied
+        from .analytics import DIMENSIONS, cohort_report
+        
+        dimension = request.GET.get('por', 'business_line')
+        if dimension not in DIMENSIONS:
+            dimension = 'business_line'
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Retención por cohortes',
+            'opts': self.model._meta,
+            'report': cohort_report(dimension),
+            'dimensions': DIMENSIONS.items(),
+            'dimension': dimension,
+        }
+        return TemplateResponse(
+            request, 'admin/accounting/client/cohort_report.html', context
+        )
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if not change:
+            self._avisar_duplicados(request, obj)
+    
+    def _avisar_duplicados(self, request, obj):
+        """Aviso al crear un cliente que probablemente ya existe (búsqueda por bloques)"""
+        matches = find_duplicates(obj.nombre, obj.dni, exclude_pk=obj.pk)
+        if not matches:
+            return
+        record_candidates(obj.pk, matches)
+        shown = [match for match in matches if is_line_allowed(request, match['business_line_id'])][:3]
+        hidden = len(matches) - len(shown)
+        if shown:
+            names = format_html_join(', ', '{} ({})', ((m['nombre'], m['dni']) for m in shown))
+            if hidden:
+                names = format_html('{} y {} más', names, hidden)
+        else:
+            names = f'{hidden} clientes de otras líneas'
+        message = format_html(
+            'Posible duplicado de {}. <a href="{}?status__exact=pending">Revisar duplicados</a>',
+            names,
+            reverse('admin:accounting_duplicatecandidate_changelist'),
+        )
+        self.message_user(request, message, level='warning')
+    
+    def receipt_view(self, request, pk, period):
+        """Recibo PDF del periodo, solo si el usuario puede ver el cliente (respeta su ámbito)"""
+        from .receipts import parse_period, receipt_number
+        
+        client = get_object_or_404(self.get_queryset(request), pk=pk)
+        if not self.has_view_permission(request, client):
+            raise PermissionDenied
+        try:
+            parse_period(period)
+        except ValueError:
+            raise Http404('Periodo no válido')
+        return private_file_response(
+            f'receipts/{period}/{receipt_number(period, client.pk)}.pdf'
+        )
+    
     def formfield_for_foreignkey(self, db_field, request, **kwargs):
-        """Filtrar líneas de negocio activas en el formulario"""
+        """Filtrar líneas de negocio activas (y del ámbito del usuario) en el formulario"""
         if db_field.name == "business_line":
-            kwargs["queryset"] = BusinessLine.objects.filter(
-                is_active=True
+            kwargs["queryset"] = scope_queryset(
+                request, BusinessLine.objects.filter(is_active=True), field='id'
             ).select_related('parent').order_by('level', 'name')
         return super().formfield_for_foreignkey(db_field, request, **kwargs)
     
-    actions = ['marcar_como_activo', 'marcar_como_inactivo']
+    actions = ['marcar_como_activo', 'marcar_como_inactivo', 'exportar_csv', 'reasignar_linea']
+    
+    def _enqueue_and_redirect(self, request, name, **kwargs):
+        """Encola un trabajo y lleva al usuario a su página de progreso"""
+        job = enqueue(name, user=request.user, **kwargs)
+        self.message_user(request, f'Trabajo #{job.pk} encolado. Esta página muestra su progreso.')
+        return HttpResponseRedirect(reverse('admin:common_job_change', args=[job.pk]))
+    
+    def _actualizar_estado(self, request, queryset, is_active):
+        if queryset.count() > BACKGROUND_ACTION_THRESHOLD:
+            return self._enqueue_and_redirect(
+                request,
+                'accounting.actualizar_estado_clientes',
+                selection=serialize_selection(request, queryset),
+                is_active=is_active,
+            )
+        updated = queryset.update(is_active=is_active)
+        estado = 'activos' if is_active else 'inactivos'
+        self.message_user(request, f'{updated} clientes marcados como {estado}.')
     
     def marcar_como_activo(self, request, queryset):
         """Acción para activar clientes seleccionados"""
-        updated = queryset.update(is_active=True)
-        self.message_user(request, f'{updated} clientes marcados como activos.')
+        return self._actualizar_estado(request, queryset, True)
     marcar_como_activo.short_description = "Marcar como activo"
     
     def marcar_como_inactivo(self, request, queryset):
         """Acción para desactivar clientes seleccionados"""
-        updated = queryset.update(is_active=False)
-        self.message_user(request, f'{updated} clientes marcados como inactivos.')
+        return self._actualizar_estado(request, queryset, False)
     marcar_como_inactivo.short_description = "Marcar como inactivo"
+    
+    def exportar_csv(self, request, queryset):
+        """Exporta los clientes seleccionados a CSV en segundo plano"""
+        return self._enqueue_and_redirect(
+            request,
+            'accounting.exportar_clientes_csv',
+            selection=serialize_selection(request, queryset),
+        )
+    exportar_csv.short_description = "Exportar a CSV (segundo plano)"
+    
+    def reasignar_linea(self, request, queryset):
+        """Mueve los clientes seleccionados a otra línea, con resumen previo"""
+        tree = get_request_tree(request)
+        summary = None
+        target_id = None
+        try:
+            target_id = int(request.POST.get('target', ''))
+        except ValueError:
+            pass
+        
+        if target_id is not None:
+            try:
+                if not is_line_allowed(request, target_id):
+                    raise ValidationError("La línea destino no está en tu ámbito")
+                if 'apply' in request.POST:
+                    moved = reassign_clients(queryset, target_id)
+                    self.message_user(
+                        request, f'{moved} clientes reasignados a {tree.path(target_id)}.'
+                    )
+                    return None
+                summary = reassignment_summary(queryset, target_id)
+            except ValidationError as exc:
+                self.message_user(request, '; '.join(exc.messages), level='error')
+                summary = None
+        
+        selected_ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Reasignar clientes a otra línea',
+            'opts': self.model._meta,
+            # Ids explícitos también con "seleccionar todos": sin ellos el admin no
+            # vuelve a ejecutar la acción al enviar el resumen o la confirmación
+            'selected_ids': selected_ids,
+            'selected_count': len(selected_ids),
+            'targets': [
+                (line_id, tree.path(line_id))
+                for line_id, _ in tree.walk(only_active=True)
+                if is_line_allowed(request, line_id)
+            ],
+            'target_id': target_id,
+            'summary': summary,
+            'action_checkbox_name': ACTION_CHECKBOX_NAME,
+        }
+        return TemplateResponse(request, 'admin/accounting/client/reassign.html', context)
+    reasignar_linea.short_description = "Reasignar a otra línea de negocio"
+
+
+@admin.register(ArchivedClient)
+class ArchivedClientAdmin(admin.ModelAdmin):
+    """
+    Archivo de clientes inactivos: solo se consulta bajo demanda
+    """
+    
+    list_display = [
+        'nombre',
+        'dni',
+        'business_line',
+        'categoria',
+        'precio',
+        'fecha_renovacion',
+        'updated_at',
+        'archived_at'
+    ]
+    
+    list_filter = ['categoria', ('business_line', admin.RelatedOnlyFieldListFilter)]
+    
+    search_fields = ['nombre', '=dni']
+    
+    list_per_page = 50
+    
+    # Evita el COUNT(*) completo de la tabla archivada en cada página
+    show_full_result_count = False
+    
+    actions = ['restaurar']
+    
+    def get_queryset(self, request):
+        return scope_queryset(request, super().get_queryset(request)).select_related('business_line')
+    
+    def get_readonly_fields(self, request, obj=None):
+        return [field.name for field in self.model._meta.fields]
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def restaurar(self, request, queryset):
+        """Devuelve los clientes seleccionados a la tabla principal"""
+        restored, skipped, failed = restore_clients(queryset)
+        self.message_user(request, f'{restored} clientes restaurados (inactivos).')
+        if skipped:
+            self.message_user(
+                request,
+                f'{skipped} clientes no se restauraron porque su DNI ya existe.',
+                level='warning'
+            )
+        for archived, error in failed:
+            # Solo la primera línea: el resto es el contexto de PostgreSQL
+            reason = str(error).splitlines()[0] if str(error) else type(error).__name__
+            self.message_user(
+                request,
+                f'{archived.nombre} ({archived.dni}) no se restauró: {reason}',
+                level='error'
+            )
+    restaurar.short_description = "Restaurar a clientes"
+
+
+@admin.register(DuplicateCandidate)
+class DuplicateCandidateAdmin(admin.ModelAdmin):
+    """
+    Revisión de posibles duplicados: fusionar o descartar cada pareja
+    """
+    
+    list_display = [
+        'client',
+        'duplicate',
+        'get_score_display',
+        'get_reasons_display',
+        'status',
+        'created_at',
+        'get_review_link',
+    ]
+    
+    list_display_links = None
+    
+    list_filter = ['status']
+    
+    search_fields = ['client__nombre', '=client__dni', 'duplicate__nombre', '=duplicate__dni']
+    
+    actions = ['descartar']
+    
+    REASON_LABELS = {
+        'nombre': 'Mismo nombre',
+        'nombre_similar': 'Nombre parecido',
+        'fonetico': 'Suena igual',
+        'dni': 'Mismo DNI',
+        'dni_letra': 'DNI con otra letra',
+        'dni_errata': 'DNI con errata',
+        'dni_distinto': 'DNI distinto',
+    }
+    
+    def get_queryset(self, request):
+        # Solo parejas con los dos clientes dentro del ámbito del usuario
+        queryset = super().get_queryset(request).select_related(
+            'client__business_line__parent', 'duplicate__business_line__parent'
+        )
+        queryset = scope_queryset(request, queryset, field='client__business_line_id')
+        return scope_queryset(request, queryset, field='duplicate__business_line_id')
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def get_score_display(self, obj):
+        return f"{obj.score:.0%}"
+    get_score_display.short_description = "Similitud"
+    get_score_display.admin_order_field = 'score'
+    
+    def get_reasons_display(self, obj):
+        return ', '.join(self.REASON_LABELS.get(reason, reason) for reason in obj.reasons)
+    get_reasons_display.short_description = "Coincidencias"
+    
+    def get_review_link(self, obj):
+        if obj.status != DuplicateCandidate.STATUS_PENDING:
+            return '-'
+        return format_html(
+            '<a href="{}">Revisar</a>',
+            reverse('admin:accounting_duplicatecandidate_review', args=[obj.pk]),
+        )
+    get_review_link.short_description = ""
+    
+    def get_urls(self):
+        custom_urls = [
+            path(
+                '<int:pk>/revisar/',
+                self.admin_site.admin_view(self.review_view),
+                name='accounting_duplicatecandidate_review',
+            ),
+        ]
+        return custom_urls + super().get_urls()
+    
+    def review_view(self, request, pk):
+        """Comparación campo a campo y fusión de la pareja"""
+        if not (request.user.has_perm('accounting.change_client')
+                and request.user.has_perm('accounting.delete_client')):
+            raise PermissionDenied
+        candidate = get_object_or_404(
+            self.get_queryset(request), pk=pk, status=DuplicateCandidate.STATUS_PENDING
+        )
+        changelist_url = reverse('admin:accounting_duplicatecandidate_changelist')
+        
+        if request.method == 'POST':
+            if 'dismiss' in request.POST:
+                dismiss_candidates(DuplicateCandidate.objects.filter(pk=candidate.pk), request.user)
+                self.message_user(request, 'Pareja descartada.')
+                return HttpResponseRedirect(changelist_url)
+            keep = request.POST.get('keep')
+            if keep in ('client', 'duplicate'):
+                other = 'duplicate' if keep == 'client' else 'client'
+                fields = [field for field in MERGE_FIELDS if request.POST.get(f'field_{field}') == other]
+                try:
+                    survivor = merge_clients(candidate, keep, fields)
+                except ValidationError as exc:
+                    self.message_user(request, '; '.join(exc.messages), level='error')
+                else:
+                    self.message_user(request, f'Clientes fusionados en {survivor.nombre} ({survivor.dni}).')
+                    return HttpResponseRedirect(
+                        reverse('admin:accounting_client_change', args=[survivor.pk])
+                    )
+        
+        rows = [
+            (
+                field,
+                Client._meta.get_field(field).verbose_name,
+                getattr(candidate.client, field),
+                getattr(candidate.duplicate, field),
+            )
+            for field in MERGE_FIELDS
+        ]
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Revisar posible duplicado',
+            'opts': self.model._meta,
+            'candidate': candidate,
+            'reasons': self.get_reasons_display(candidate),
+            'rows': rows,
+        }
+        return TemplateResponse(
+            request, 'admin/accounting/duplicatecandidate/review.html', context
+        )
+    
+    def descartar(self, request, queryset):
+        """Marca las parejas seleccionadas como no duplicadas"""
+        dismissed = dismiss_candidates(queryset, request.user)
+        self.message_user(request, f'{dismissed} parejas descartadas.')
+    descartar.short_description = "Descartar (no son duplicados)"
@@ -0,0 +1,323 @@
+"""
+Análisis de cohortes: retención y abandono por línea de negocio y categoría.
+
+Cada cliente pertenece a la cohorte del mes de su fecha_inicio. El mes de
+baja se toma del último evento 'deactivated' del outbox (o de updated_at si
+el cliente se desactivó antes de existir el outbox). Los clientes
+archivados (ArchivedClient, con su id original) cuentan como bajas: sin
+ellos el abandono bajaría y la retención subiría con cada archivado. Todo
+se calcula en memoria sobre arrays de NumPy, un array por columna.
+
+Los datos columnares se guardan en caché junto con el cursor del último
+evento del outbox procesado; en cada consulta solo se recargan los clientes
+con eventos nuevos, en lugar de releer toda la tabla.
+"""
+
+from datetime import date
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import BooleanField, Max, Value
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+from apps.business_lines.models import BusinessLine
+from apps.common.models import OutboxEvent
+from apps.common.outbox import aggregate_type_for, committed_events, snapshot_xmin
+from .models import ArchivedClient, Client
+
+
+CACHE_KEY = 'accounting:cohort_data:v2'
+CACHE_TIMEOUT = 24 * 60 * 60
+
+# Mes de baja de los clientes que siguen activos
+ACTIVE = np.iinfo(np.int64).max
+
+# Si cambian más clientes que esta fracción se reconstruye todo
+FULL_REBUILD_RATIO = 0.5
+
+ID_CHUNK_SIZE = 5000
+
+DIMENSIONS = {
+    'business_line': 'Línea de negocio',
+    'categoria': 'Categoría',
+    'business_line_categoria': 'Línea de negocio y categoría',
+}
+
+
+def month_index(field):
+    """Índice absoluto de mes (año * 12 + mes - 1) calculado en la base de datos"""
+    return ExtractYear(field) * 12 + ExtractMonth(field) - 1
+
+
+def month_label(index):
+    return f'{index // 12}-{index % 12 + 1:02d}'
+
+
+def _client_rows(queryset):
+    return queryset.order_by().annotate(
+        start_month=month_index('fecha_inicio'),
+        updated_month=month_index('updated_at'),
+    ).values_list('pk', 'business_line_id', 'categoria', 'start_month', 'is_active', 'updated_month')
+
+
+def _archived_rows(queryset):
+    """Mismas columnas que _client_rows para los archivados: siempre inactivos"""
+    return queryset.order_by().annotate(
+        start_month=month_index('fecha_inicio'),
+        updated_month=month_index('updated_at'),
+        active=Value(False, output_field=BooleanField()),
+    ).values_list('original_id', 'business_line_id', 'categoria', 'start_month', 'active', 'updated_month')
+
+
+def _all_rows(client_ids=None):
+    """Clientes vivos y archivados (opcionalmente solo los ids indicados)"""
+    clients = Client.objects.all()
+    archived = ArchivedClient.objects.all()
+    if client_ids is not None:
+        clients = clients.filter(pk__in=client_ids)
+        archived = archived.filter(original_id__in=client_ids)
+    return list(_client_rows(clients)) + list(_archived_rows(archived))
+
+
+def _client_events():
+    return OutboxEvent.objects.filter(aggregate_type=aggregate_type_for(Client)).order_by()
+
+
+def _deactivation_months(client_ids=None):
+    """Mes del último evento de baja por cliente: {client_id: mes}"""
+    events = _client_events().filter(event_type=OutboxEvent.EVENT_DEACTIVATED)
+    if client_ids is not None:
+        events = events.filter(aggregate_id__in=client_ids)
+    return dict(
+        events.values('aggregate_id')
+        .annotate(month=Max(month_index('created_at')))
+        .values_list('aggregate_id', 'month')
+    )
+
+
+def _chunks(ids, size=ID_CHUNK_SIZE):
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+class CohortData:
+    """Columnas de clientes necesarias para el análisis, ordenadas por id"""
+
+    def __init__(self, ids, business_line_id, is_black, start_month, churn_month, watermark):
+        order = np.argsort(ids, kind='stable')
+        self.ids = ids[order]
+        self.business_line_id = business_line_id[order]
+        self.is_black = is_black[order]
+        self.start_month = start_month[order]
+        self.churn_month = churn_month[order]
+        self.watermark = watermark
+
+    @classmethod
+    def from_rows(cls, rows, deactivations, watermark):
+        if rows:
+            ids, lines, categorias, start, is_active, updated = zip(*rows)
+        else:
+            ids = lines = categorias = start = is_active = updated = ()
+        ids = np.array(ids, dtype=np.int64)
+        is_active = np.array(is_active, dtype=bool)
+        churn = np.array(updated, dtype=np.int64)
+        if deactivations and ids.size:
+            # Cruce vectorizado con los meses de baja del outbox
+            event_ids = np.fromiter(deactivations.keys(), dtype=np.int64, count=len(deactivations))
+            event_months = np.fromiter(deactivations.values(), dtype=np.int64, count=len(deactivations))
+            order = np.argsort(event_ids)
+            event_ids, event_months = event_ids[order], event_months[order]
+            position = np.minimum(np.searchsorted(event_ids, ids), len(event_ids) - 1)
+            found = event_ids[position] == ids
+            churn[found] = event_months[position[found]]
+        churn[is_active] = ACTIVE
+        return cls(
+            ids,
+            np.array(lines, dtype=np.int64),
+            np.array(categorias) == 'Black',
+            np.array(start, dtype=np.int64),
+            churn,
+            watermark,
+        )
+
+    @classmethod
+    def build(cls):
+        # Cursor del outbox tomado antes de leer: las transacciones aún abiertas
+        # (transaction_id >= xmin) se volverán a leer en el siguiente refresh
+        watermark = (snapshot_xmin() - 1, np.iinfo(np.int64).max)
+        return cls.from_rows(_all_rows(), _deactivation_months(), watermark)
+
+    @property
+    def size(self):
+        return len(self.ids)
+
+    def refresh(self):
+        """Aplica los cambios registrados en el outbox desde el último watermark"""
+        events = committed_events(*self.watermark).filter(aggregate_type=aggregate_type_for(Client))
+        changed = set()
+        latest = None
+        for transaction_id, event_id, client_id in events.values_list(
+            'transaction_id', 'id', 'aggregate_id'
+        ).iterator(chunk_size=ID_CHUNK_SIZE):
+            changed.add(client_id)
+            latest = (transaction_id, event_id)
+        if latest is None:
+            return self
+
+        changed = sorted(changed)
+        if len(changed) > max(self.size, 1) * FULL_REBUILD_RATIO:
+            return CohortData.build()
+
+        rows = []
+        deactivations = {}
+        for chunk in _chunks(changed):
+            rows.extend(_all_rows(chunk))
+            deactivations.update(_deactivation_months(chunk))
+        fresh = CohortData.from_rows(rows, deactivations, latest)
+
+        # Los clientes cambiados, archivados o borrados se sustituyen por su versión actual
+        keep = ~np.isin(self.ids, np.array(changed, dtype=np.int64))
+        return CohortData(
+            np.concatenate([self.ids[keep], fresh.ids]),
+            np.concatenate([self.business_line_id[keep], fresh.business_line_id]),
+            np.concatenate([self.is_black[keep], fresh.is_black]),
+            np.concatenate([self.start_month[keep], fresh.start_month]),
+            np.concatenate([self.churn_month[keep], fresh.churn_month]),
+            latest,
+        )
+
+
+def get_cohort_data():
+    """Datos columnares cacheados y actualizados de forma incremental"""
+    data = cache.get(CACHE_KEY)
+    if data is None:
+        data = CohortData.build()
+    else:
+        watermark = data.watermark
+        data = data.refresh()
+        if data.watermark == watermark:
+            return data
+    cache.set(CACHE_KEY, data, CACHE_TIMEOUT)
+    return data
+
+
+def _group_codes(data, dimension):
+    """Código entero de grupo por cliente y su etiqueta legible"""
+    if dimension == 'categoria':
+        codes = data.is_black.astype(np.int64)
+        return codes, lambda code: 'Black' if code else 'White'
+
+    paths = {
+        line.pk: line.get_full_path()
+        for line in BusinessLine.objects.filter(
+            pk__in=np.unique(data.business_line_id).tolist()
+        ).select_related('parent__parent__parent')
+    }
+    if dimension == 'business_line':
+        return data.business_line_id, lambda code: paths.get(code, str(code))
+
+    codes = data.business_line_id * 2 + data.is_black
+    return codes, lambda code: f"{paths.get(code // 2, code // 2)} · {'Black' if code % 2 else 'White'}"
+
+
+def _churn_by_group(data, codes, current):
+    """
+    (grupos, clientes, bajas, meses de exposición) por código de grupo. Un
+    cliente está expuesto desde su inicio hasta su baja o hasta el mes actual.
+    """
+    group_values, group_index = np.unique(codes, return_inverse=True)
+    churned = data.churn_month != ACTIVE
+    end = np.where(churned, data.churn_month, current)
+    exposure = np.maximum(end - data.start_month, 0)
+    totals = np.bincount(group_index, minlength=len(group_values))
+    churn_counts = np.bincount(group_index, weights=churned, minlength=len(group_values))
+    exposure_months = np.bincount(group_index, weights=exposure, minlength=len(group_values))
+    return group_values, totals, churn_counts, exposure_months
+
+
+def monthly_churn_by_line(today=None):
+    """Bajas por mes de exposición de cada línea: {business_line_id: tasa mensual}"""
+    data = get_cohort_data()
+    if data.size == 0:
+        return {}
+    today = today or date.today()
+    current = today.year * 12 + today.month - 1
+    line_ids, _totals, churn_counts, exposure_months = _churn_by_group(
+        data, data.business_line_id, current
+    )
+    return {
+        int(line_id): float(churn_counts[i] / max(exposure_months[i], 1))
+        for i, line_id in enumerate(line_ids)
+    }
+
+
+def cohort_report(dimension='business_line', max_age=12, today=None):
+    """
+    Matrices de retención por cohorte de inicio y tasas de abandono por grupo.
+
+    retention[a] es la fracción de la cohorte que seguía activa a los 'a' meses
+    de empezar; None cuando la cohorte todavía no tiene esa antigüedad.
+    """
+    if dimension not in DIMENSIONS:
+        raise ValueError(f'Dimensión no válida: {dimension}')
+
+    data = get_cohort_data()
+    today = today or date.today()
+    current = today.year * 12 + today.month - 1
+
+    report = {
+        'dimension': DIMENSIONS[dimension],
+        'ages': list(range(max_age + 1)),
+        'cohorts': [],
+        'churn': [],
+        'clients': data.size,
+    }
+    if data.size == 0:
+        return report
+
+    codes, label = _group_codes(data, dimension)
+    start = data.start_month
+
+    # Cohortes: combinación (grupo, mes de inicio)
+    cohort_keys, cohort_index = np.unique(
+        np.stack([codes, start], axis=1), axis=0, return_inverse=True
+    )
+    cohort_index = cohort_index.reshape(-1)
+
+    # Meses de vida acotados: los activos cuentan como supervivientes en todo el horizonte
+    width = max_age + 2
+    lifetime = np.clip(np.minimum(data.churn_month, current + width) - start, 0, width - 1)
+    counts = np.bincount(
+        cohort_index * width + lifetime, minlength=len(cohort_keys) * width
+    ).reshape(len(cohort_keys), width)
+    at_least = counts[:, ::-1].cumsum(axis=1)[:, ::-1]
+    sizes = at_least[:, 0]
+    retention = at_least[:, 1:] / sizes[:, None]
+
+    for i, (code, cohort_start) in enumerate(cohort_keys.tolist()):
+        observed = current - cohort_start
+        report['cohorts'].append({
+            'group': label(code),
+            'month': month_label(cohort_start),
+            'size': int(sizes[i]),
+            'retention': [
+                round(float(value), 4) if age <= observed else None
+                for age, value in enumerate(retention[i])
+            ],
+        })
+    report['cohorts'].sort(key=lambda row: (row['group'], row['month']))
+
+    # Abandono: clientes dados de baja y bajas por mes de exposición
+    group_values, totals, churn_counts, exposure_months = _churn_by_group(data, codes, current)
+
+    for i, code in enumerate(group_values.tolist()):
+        report['churn'].append({
+            'group': label(code),
+            'clients': int(totals[i]),
+            'churned': int(churn_counts[i]),
+            'churn_rate': round(float(churn_counts[i] / totals[i]), 4),
+            'monthly_churn_rate': round(float(churn_counts[i] / max(exposure_months[i], 1)), 4),
+        })
+    report['churn'].sort(key=lambda row: row['group'])
+
+    return report
@@ -5,3 +5,7 @@ class AccountingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.accounting'
     verbose_name = 'Contabilidad y Clientes'
+
+    def ready(self):
+        # Claves de detección de duplicados (accounting.dedup)
+        from . import signals  # noqa: F401
@@ -0,0 +1,140 @@
+"""
+Archivado de clientes inactivos (tabla caliente / tabla fría).
+
+Los clientes inactivos desde hace tiempo se mueven a ArchivedClient para que
+los listados, recuentos, búsquedas e índices de Client solo trabajen con el
+conjunto vivo. El proceso es reversible: restore_clients() los devuelve a
+Client con su id original.
+"""
+
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.common.models import OutboxEvent
+from apps.common.outbox import aggregate_type_for
+from .dedup import index_clients
+from .models import ArchivedClient, Client, ClientMatchKey, DuplicateCandidate
+
+
+BATCH_SIZE = 1000
+
+
+def archivable_clients(days):
+    """Clientes inactivos sin cambios en los últimos 'days' días"""
+    cutoff = timezone.now() - timedelta(days=days)
+    return Client.objects.filter(is_active=False, updated_at__lt=cutoff)
+
+
+def _archive_batch(pks):
+    rows = list(
+        Client.objects.filter(pk__in=pks, is_active=False)
+        .order_by()
+        .values('pk', *ArchivedClient.COPIED_FIELDS)
+    )
+    if not rows:
+        return 0
+
+    ArchivedClient.objects.bulk_create([
+        ArchivedClient(original_id=row.pop('pk'), **row) for row in rows
+    ])
+    archived_ids = [archived.original_id for archived in ArchivedClient.objects.filter(
+        original_id__in=pks
+    ).only('original_id')]
+
+    # DELETE directo: el evento que corresponde es 'archived', no el 'deleted'
+    # de las señales de borrado. Las únicas relaciones inversas de Client son
+    # las de la detección de duplicados, que se borran antes a mano (un
+    # archivado no participa en el bloqueo; restore_clients lo reindexa)
+    ClientMatchKey.objects.filter(client_id__in=archived_ids)._raw_delete(ClientMatchKey.objects.db)
+    DuplicateCandidate.objects.filter(
+        Q(client_id__in=archived_ids) | Q(duplicate_id__in=archived_ids)
+    )._raw_delete(DuplicateCandidate.objects.db)
+    Client.objects.filter(pk__in=archived_ids)._raw_delete(Client.objects.db)
+
+    OutboxEvent.objects.bulk_create([
+        OutboxEvent(
+            aggregate_type=aggregate_type_for(Client),
+            aggregate_id=pk,
+            event_type=OutboxEvent.EVENT_ARCHIVED,
+            payload={},
+        )
+        for pk in archived_ids
+    ])
+    return len(archived_ids)
+
+
+def archive_inactive_clients(days, batch_size=BATCH_SIZE):
+    """Mueve al archivo los clientes inactivos en lotes; cada lote es una transacción"""
+    archived = 0
+    while True:
+        with transaction.atomic():
+            pks = list(
+                archivable_clients(days)
+                .order_by('pk')
+                .select_for_update(skip_locked=True, of=('self',))
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not pks:
+                break
+            archived += _archive_batch(pks)
+    return archived
+
+
+def _restore_rows(rows):
+    clients = Client.objects.bulk_create([
+        Client(
+            pk=row.original_id,
+            is_active=False,
+            **{field: getattr(row, field) for field in ArchivedClient.COPIED_FIELDS},
+        )
+        for row in rows
+    ])
+
+    # bulk_create aplica auto_now/auto_now_add: se recuperan las fechas originales
+    originals = {row.original_id: row for row in rows}
+    for client in clients:
+        client.created_at = originals[client.pk].created_at
+        client.updated_at = originals[client.pk].updated_at
+    Client.objects.bulk_update(clients, ['created_at', 'updated_at'])
+
+    ArchivedClient.objects.filter(pk__in=[row.pk for row in rows]).delete()
+
+    # bulk_create no emite post_save: las claves de duplicados se calculan aquí
+    index_clients(clients)
+
+
+def restore_clients(archived_queryset):
+    """
+    Devuelve los clientes archivados a la tabla principal (inactivos, con su id).
+    Se omiten los que tienen el DNI ocupado por un cliente creado después.
+    Retorna (restaurados, omitidos, fallidos); fallidos es una lista de
+    (archivado, error) con las filas que incumplen alguna restricción.
+    """
+    failed = []
+    with transaction.atomic():
+        archived = list(archived_queryset.select_for_update())
+        taken = set(
+            Client.objects.filter(dni__in=[row.dni for row in archived]).values_list('dni', flat=True)
+        )
+        restorable = [row for row in archived if row.dni not in taken]
+        if not restorable:
+            return 0, len(archived), failed
+
+        try:
+            with transaction.atomic():
+                _restore_rows(restorable)
+            restored = len(restorable)
+        except IntegrityError:
+            # Alguna fila incumple una restricción: se reintenta una a una para aislarla
+            restored = 0
+            for row in restorable:
+                try:
+                    with transaction.atomic():
+                        _restore_rows([row])
+                    restored += 1
+                except IntegrityError as exc:
+                    failed.append((row, exc))
+    return restored, len(archived) - len(restorable), failed
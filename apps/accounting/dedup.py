@@ -0,0 +1,367 @@
+"""
+Detección de clientes duplicados por bloques.
+
+Comparar cada cliente con todos los demás es cuadrático. En su lugar cada
+cliente tiene unas pocas claves de bloqueo en ClientMatchKey y solo se
+comparan los clientes que comparten alguna:
+
+- n:  pares de prefijos (4 letras) de los tokens normalizados del nombre,
+      sin tildes ni partículas; el orden de nombre y apellidos no importa.
+- p:  los mismos pares con una clave fonética del español (b/v, c/z/s,
+      g/j, ll/y, h muda...), que absorbe erratas de sonido.
+- d:  los 8 dígitos del DNI (erratas en la letra). Si la letra no cuadra
+      con el número, también los números que la harían válida con un solo
+      dígito cambiado o dos contiguos intercambiados: cualquiera de esas
+      erratas altera el resto módulo 23, así que siempre se detecta.
+
+Las claves demasiado comunes (más de MAX_BLOCK_SIZE clientes) no
+discriminan y se ignoran, de modo que el coste de buscar los duplicados de
+un cliente está acotado (claves x MAX_BLOCK_SIZE filas) y no crece con la
+tabla. La puntuación final combina similitud de nombre y de DNI. Dos DNI
+válidos distintos restan: no pueden ser erratas uno del otro (la letra no
+cuadraría), así que son dos personas aunque se llamen igual.
+
+Las claves se recalculan en accounting.signals al guardar un cliente y en
+update()/bulk_update() que cambian nombre o dni. Los cambios hechos fuera
+del ORM (SQL directo) requieren find_duplicates --rebuild.
+"""
+
+import itertools
+import re
+import unicodedata
+from difflib import SequenceMatcher
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Client, ClientMatchKey, DuplicateCandidate
+
+
+DNI_LETTERS = 'TRWAGMYFPDXBNJZSQVHLCKE'
+DNI_RE = re.compile(r'^(\d{8})([A-Z])$')
+
+NAME_STOPWORDS = {'de', 'del', 'la', 'las', 'los', 'y', 'e', 'da', 'do', 'dos', 'san', 'santa'}
+MAX_NAME_TOKENS = 4
+PREFIX_LENGTH = 4
+
+MAX_BLOCK_SIZE = 50
+KEY_MAX_LENGTH = 100
+
+NAME_WEIGHT = 0.65
+DNI_WEIGHT = 0.35
+DUPLICATE_THRESHOLD = 0.6
+
+# Campos que se pueden tomar del cliente descartado al fusionar. La línea,
+# la categoría y los remanentes son siempre los del cliente que se conserva.
+MERGE_FIELDS = ['nombre', 'dni', 'metodo_pago', 'fecha_inicio', 'fecha_renovacion', 'precio', 'is_active']
+
+INDEX_BATCH_SIZE = 2000
+
+
+def normalize_text(value):
+    """'José  Pérez-Núñez' -> 'jose perez nunez'"""
+    value = unicodedata.normalize('NFKD', value or '')
+    value = ''.join(char for char in value if not unicodedata.combining(char))
+    return ' '.join(re.sub(r'[^a-z]+', ' ', value.lower()).split())
+
+
+def name_tokens(nombre):
+    return [
+        token for token in normalize_text(nombre).split()
+        if len(token) > 1 and token not in NAME_STOPWORDS
+    ]
+
+
+_PHONETIC_RULES = [
+    (r'ch', 'X'),
+    (r'll', 'y'),
+    (r'qu', 'k'),
+    (r'gu(?=[ei])', 'g'),
+    (r'c(?=[ei])', 's'),
+    (r'g(?=[ei])', 'j'),
+    (r'z', 's'),
+    (r'c', 'k'),
+    (r'[vw]', 'b'),
+    (r'x', 'ks'),
+    (r'h', ''),
+    (r'y(?![aeiou])', 'i'),
+]
+
+
+def phonetic_key(token):
+    """Clave fonética aproximada: primera letra + consonantes sin repetir"""
+    for pattern, replacement in _PHONETIC_RULES:
+        token = re.sub(pattern, replacement, token)
+    if not token:
+        return ''
+    head, tail = token[0], re.sub(r'[aeiou]', '', token[1:])
+    return re.sub(r'(.)\1+', r'\1', head + tail)
+
+
+def dni_parts(dni):
+    """('12345678', 'Z') o (None, None) si no tiene formato de DNI"""
+    match = DNI_RE.match(re.sub(r'[^0-9A-Z]', '', (dni or '').upper()))
+    return match.groups() if match else (None, None)
+
+
+def dni_letter(digits):
+    return DNI_LETTERS[int(digits) % 23]
+
+
+def dni_corrections(digits, letter):
+    """Números a una errata de distancia (un dígito o dos contiguos) con los que la letra cuadra"""
+    corrections = set()
+    for position, current in enumerate(digits):
+        for digit in '0123456789':
+            if digit != current:
+                candidate = digits[:position] + digit + digits[position + 1:]
+                if dni_letter(candidate) == letter:
+                    corrections.add(candidate)
+    for position in range(len(digits) - 1):
+        if digits[position] != digits[position + 1]:
+            candidate = (
+                digits[:position] + digits[position + 1] + digits[position] + digits[position + 2:]
+            )
+            if dni_letter(candidate) == letter:
+                corrections.add(candidate)
+    return corrections
+
+
+def match_keys(nombre, dni):
+    """Claves de bloqueo de un cliente"""
+    keys = set()
+    tokens = name_tokens(nombre)[:MAX_NAME_TOKENS]
+    prefixes = sorted({token[:PREFIX_LENGTH] for token in tokens})
+    phonetics = sorted({phonetic_key(token) for token in tokens} - {''})
+    for kind, values in (('n', prefixes), ('p', phonetics)):
+        if len(values) == 1:
+            keys.add(f'{kind}:{values[0]}')
+        for first, second in itertools.combinations(values, 2):
+            keys.add(f'{kind}:{first}|{second}')
+
+    digits, letter = dni_parts(dni)
+    if digits:
+        keys.add(f'd:{digits}')
+        if dni_letter(digits) != letter:
+            keys.update(f'd:{candidate}' for candidate in dni_corrections(digits, letter))
+    return {key[:KEY_MAX_LENGTH] for key in keys}
+
+
+def index_clients(clients):
+    """Recalcula las claves de los clientes indicados (objetos con pk, nombre y dni)"""
+    clients = list(clients)
+    if not clients:
+        return 0
+    rows = [
+        ClientMatchKey(client_id=client.pk, key=key)
+        for client in clients
+        for key in match_keys(client.nombre, client.dni)
+    ]
+    with transaction.atomic():
+        ClientMatchKey.objects.filter(client_id__in=[client.pk for client in clients]).delete()
+        ClientMatchKey.objects.bulk_create(rows, batch_size=INDEX_BATCH_SIZE)
+    return len(rows)
+
+
+def rebuild_index(batch_size=INDEX_BATCH_SIZE):
+    """Regenera todas las claves por lotes; devuelve el número de claves"""
+    ClientMatchKey.objects.all().delete()
+    total = 0
+    clients = Client.objects.order_by('pk').only('pk', 'nombre', 'dni').iterator(chunk_size=batch_size)
+    while True:
+        batch = list(itertools.islice(clients, batch_size))
+        if not batch:
+            return total
+        total += index_clients(batch)
+
+
+def block_members(keys, exclude_pk=None):
+    """
+    {client_id: claves compartidas} de los bloques de las claves dadas. Una
+    sola consulta con un LIMIT por clave: los bloques saturados se descartan.
+    """
+    keys = sorted(keys)
+    if not keys:
+        return {}
+    querysets = [
+        ClientMatchKey.objects.filter(key=key).order_by().values_list('key', 'client_id')[:MAX_BLOCK_SIZE + 1]
+        for key in keys
+    ]
+    rows = querysets[0].union(*querysets[1:], all=True) if len(querysets) > 1 else querysets[0]
+
+    blocks = {}
+    for key, client_id in rows:
+        blocks.setdefault(key, []).append(client_id)
+
+    members = {}
+    for key, client_ids in blocks.items():
+        if len(client_ids) > MAX_BLOCK_SIZE:
+            continue
+        for client_id in client_ids:
+            if client_id != exclude_pk:
+                members.setdefault(client_id, set()).add(key)
+    return members
+
+
+def score_pair(a, b):
+    """(puntuación 0-1, motivos) entre dos clientes (dicts u objetos con nombre y dni)"""
+    nombre_a, dni_a = _get(a, 'nombre'), _get(a, 'dni')
+    nombre_b, dni_b = _get(b, 'nombre'), _get(b, 'dni')
+    tokens_a, tokens_b = name_tokens(nombre_a), name_tokens(nombre_b)
+    reasons = []
+
+    if tokens_a and tokens_b:
+        name_score = SequenceMatcher(None, ' '.join(sorted(tokens_a)), ' '.join(sorted(tokens_b))).ratio()
+    else:
+        name_score = 0.0
+    if name_score == 1:
+        reasons.append('nombre')
+    elif name_score >= 0.85:
+        reasons.append('nombre_similar')
+    elif tokens_a and {phonetic_key(t) for t in tokens_a} == {phonetic_key(t) for t in tokens_b}:
+        name_score = max(name_score, 0.85)
+        reasons.append('fonetico')
+
+    dni_score = 0.0
+    digits_a, letter_a = dni_parts(dni_a)
+    digits_b, letter_b = dni_parts(dni_b)
+    if digits_a and digits_b:
+        valid_a, valid_b = dni_letter(digits_a) == letter_a, dni_letter(digits_b) == letter_b
+        if digits_a == digits_b:
+            dni_score = 1.0
+            reasons.append('dni' if letter_a == letter_b else 'dni_letra')
+        elif (
+            not valid_a and digits_b in dni_corrections(digits_a, letter_a)
+        ) or (
+            not valid_b and digits_a in dni_corrections(digits_b, letter_b)
+        ):
+            dni_score = 0.9
+            reasons.append('dni_errata')
+        elif valid_a and valid_b:
+            dni_score = -1.0
+            reasons.append('dni_distinto')
+
+    score = NAME_WEIGHT * name_score + DNI_WEIGHT * dni_score
+    return round(max(score, 0.0), 3), reasons
+
+
+def _get(obj, name):
+    return obj[name] if isinstance(obj, dict) else getattr(obj, name)
+
+
+def find_duplicates(nombre, dni, exclude_pk=None, threshold=DUPLICATE_THRESHOLD):
+    """
+    Clientes que probablemente son la misma persona, de mayor a menor
+    similitud: [{'id', 'nombre', 'dni', 'business_line_id', 'score', 'reasons'}]
+    """
+    members = block_members(match_keys(nombre, dni), exclude_pk=exclude_pk)
+    if not members:
+        return []
+    probe = {'nombre': nombre, 'dni': dni}
+    matches = []
+    for row in Client.objects.filter(pk__in=list(members)).values('id', 'nombre', 'dni', 'business_line_id'):
+        score, reasons = score_pair(probe, row)
+        if score >= threshold:
+            matches.append({**row, 'score': score, 'reasons': reasons})
+    return sorted(matches, key=lambda match: -match['score'])
+
+
+def record_candidates(client_pk, matches):
+    """Guarda las parejas como pendientes; las ya existentes (o descartadas) no se tocan"""
+    DuplicateCandidate.objects.bulk_create(
+        [
+            DuplicateCandidate(
+                client_id=min(client_pk, match['id']),
+                duplicate_id=max(client_pk, match['id']),
+                score=match['score'],
+                reasons=match['reasons'],
+            )
+            for match in matches
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def _block_pairs():
+    """Parejas de clientes que comparten algún bloque no saturado, recorriendo el índice ordenado"""
+    rows = ClientMatchKey.objects.order_by('key', 'client_id').values_list('key', 'client_id')
+    for _key, group in itertools.groupby(rows.iterator(chunk_size=INDEX_BATCH_SIZE), key=lambda row: row[0]):
+        client_ids = [client_id for _, client_id in itertools.islice(group, MAX_BLOCK_SIZE + 1)]
+        if len(client_ids) > MAX_BLOCK_SIZE:
+            for _ in group:
+                pass
+            continue
+        yield from itertools.combinations(client_ids, 2)
+
+
+def scan_duplicates(threshold=DUPLICATE_THRESHOLD, batch_size=INDEX_BATCH_SIZE):
+    """
+    Recorre todos los bloques y registra las parejas que superan el umbral.
+    Devuelve (parejas comparadas, parejas registradas).
+    """
+    compared = 0
+    existing = DuplicateCandidate.objects.count()
+    pairs = set()
+
+    def flush():
+        nonlocal compared
+        ids = {client_id for pair in pairs for client_id in pair}
+        clients = Client.objects.in_bulk(list(ids))
+        candidates = []
+        for client_id, duplicate_id in pairs:
+            if client_id not in clients or duplicate_id not in clients:
+                continue
+            score, reasons = score_pair(clients[client_id], clients[duplicate_id])
+            if score >= threshold:
+                candidates.append(DuplicateCandidate(
+                    client_id=client_id, duplicate_id=duplicate_id, score=score, reasons=reasons,
+                ))
+        compared += len(pairs)
+        DuplicateCandidate.objects.bulk_create(candidates, ignore_conflicts=True)
+        pairs.clear()
+
+    for pair in _block_pairs():
+        pairs.add(pair)
+        if len(pairs) >= batch_size:
+            flush()
+    if pairs:
+        flush()
+    return compared, DuplicateCandidate.objects.count() - existing
+
+
+def merge_clients(candidate, keep, fields_from_other=()):
+    """
+    Fusiona una pareja: conserva 'client' o 'duplicate' (keep), copia del otro
+    los campos indicados de MERGE_FIELDS y borra el otro. Devuelve el cliente conservado.
+    """
+    if keep not in ('client', 'duplicate'):
+        raise ValueError(keep)
+    unknown = set(fields_from_other) - set(MERGE_FIELDS)
+    if unknown:
+        raise ValidationError(f"No se pueden copiar los campos: {', '.join(sorted(unknown))}")
+
+    with transaction.atomic():
+        clients = Client.objects.select_for_update().select_related('business_line').in_bulk(
+            [candidate.client_id, candidate.duplicate_id]
+        )
+        if len(clients) < 2:
+            raise ValidationError("Alguno de los clientes ya no existe")
+        survivor = clients[getattr(candidate, f'{keep}_id')]
+        other = clients[candidate.duplicate_id if keep == 'client' else candidate.client_id]
+
+        for field in fields_from_other:
+            setattr(survivor, field, getattr(other, field))
+        # El otro se borra antes de validar: su DNI puede pasar al que se conserva
+        other.delete()
+        survivor.full_clean()
+        survivor.save()
+    return survivor
+
+
+def dismiss_candidates(queryset, user=None):
+    return queryset.filter(status=DuplicateCandidate.STATUS_PENDING).update(
+        status=DuplicateCandidate.STATUS_DISMISSED,
+        reviewed_by=user,
+        reviewed_at=timezone.now(),
+    )
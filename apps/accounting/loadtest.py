@@ -0,0 +1,110 @@
+"""
+Escenario de carga del changelist de clientes (manage.py loadtest_admin).
+
+Mezcla de peticiones de un nutricionista: listado paginado, filtros,
+búsqueda, guardado de list_editable y acción masiva. Los datos de ejemplo
+(ids, nombres, precios, líneas) se leen de la base de datos local, que debe
+ser la misma que usa el servidor. Las escrituras reenvían los valores que ya
+tiene cada cliente y la acción masiva marca como activos clientes activos:
+la prueba no altera los datos (solo updated_at y eventos del outbox).
+"""
+
+from urllib.parse import urlencode
+
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+
+from apps.business_lines.hierarchy import get_tree
+from .models import Client
+
+
+CHANGELIST_PATH = '/admin/accounting/client/'
+SAMPLE_SIZE = 1000
+BULK_SELECTION = 20
+
+DEFAULT_MIX = {
+    'changelist': 40,
+    'filter': 20,
+    'search': 20,
+    'edit': 15,
+    'bulk_action': 5,
+}
+
+
+def load_sample(size=SAMPLE_SIZE):
+    """Clientes activos de ejemplo y líneas de negocio para construir las peticiones"""
+    clients = list(
+        Client.objects.filter(is_active=True).order_by('pk')
+        .values('pk', 'nombre', 'dni', 'precio', 'metodo_pago')[:size]
+    )
+    if not clients:
+        raise ValueError('No hay clientes activos con los que generar carga')
+    pages = max(Client.objects.count() // 50, 1)
+    return {
+        'clients': clients,
+        'lines': [line_id for line_id, _depth in get_tree().walk(only_active=True)],
+        'pages': pages,
+    }
+
+
+def build_scenario(sample, mix=None):
+    """
+    {nombre: (peso, función(sesión, rng) -> (método, ruta, datos[, estado]))}.
+    Las escrituras solo cuentan como correctas si el admin redirige (302).
+    """
+    mix = mix or DEFAULT_MIX
+    clients = sample['clients']
+    lines = sample['lines']
+
+    def changelist(session, rng):
+        page = rng.randrange(min(sample['pages'], 20))
+        return 'GET', f'{CHANGELIST_PATH}?p={page}' if page else CHANGELIST_PATH, None
+
+    def filter_(session, rng):
+        choices = [
+            'categoria__exact=Black',
+            'categoria__exact=White',
+            'is_active__exact=1',
+            'renovacion_proxima=si',
+            'renovacion_proxima=vencida',
+        ]
+        if lines:
+            choices.append(f'business_line_hierarchy={rng.choice(lines)}')
+        return 'GET', f'{CHANGELIST_PATH}?{rng.choice(choices)}', None
+
+    def search(session, rng):
+        client = rng.choice(clients)
+        term = client['nombre'][:rng.randint(2, 6)] if rng.random() < 0.7 else client['dni'][:5]
+        return 'GET', f"{CHANGELIST_PATH}?{urlencode({'q': term})}", None
+
+    def edit(session, rng):
+        client = rng.choice(clients)
+        data = [
+            ('form-TOTAL_FORMS', '1'),
+            ('form-INITIAL_FORMS', '1'),
+            ('form-MIN_NUM_FORMS', '0'),
+            ('form-MAX_NUM_FORMS', '1000'),
+            ('form-0-id', client['pk']),
+            ('form-0-precio', client['precio']),
+            ('form-0-metodo_pago', client['metodo_pago']),
+            ('form-0-is_active', 'on'),
+            ('_save', 'Guardar'),
+        ]
+        return 'POST', CHANGELIST_PATH, data, 302
+
+    def bulk_action(session, rng):
+        selected = rng.sample(clients, min(BULK_SELECTION, len(clients)))
+        data = [('action', 'marcar_como_activo'), ('index', '0'), ('select_across', '0')]
+        data.extend((ACTION_CHECKBOX_NAME, client['pk']) for client in selected)
+        return 'POST', CHANGELIST_PATH, data, 302
+
+    requests = {
+        'changelist': changelist,
+        'filter': filter_,
+        'search': search,
+        'edit': edit,
+        'bulk_action': bulk_action,
+    }
+    unknown = set(mix) - set(requests)
+    if unknown:
+        raise ValueError(f"Peticiones desconocidas en la mezcla: {', '.join(sorted(unknown))}")
+    return {name: (weight, requests[name]) for name, weight in mix.items() if weight > 0}
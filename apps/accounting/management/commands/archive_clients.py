@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from apps.accounting.archive import BATCH_SIZE, archivable_clients, archive_inactive_clients
+
+
+class Command(BaseCommand):
+    help = 'Mueve al archivo los clientes inactivos desde hace más de N días'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=365, help='Días sin cambios desde la baja')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Solo contar los clientes archivables')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            count = archivable_clients(options['days']).count()
+            self.stdout.write(f'{count} clientes se archivarían')
+            return
+
+        archived = archive_inactive_clients(options['days'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{archived} clientes archivados'))
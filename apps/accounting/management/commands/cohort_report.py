@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from apps.accounting.analytics import DIMENSIONS, cohort_report
+
+
+class Command(BaseCommand):
+    help = 'Muestra la retención por cohortes de inicio y las tasas de abandono'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--by', choices=list(DIMENSIONS), default='business_line',
+                            help='Agrupación de las cohortes')
+        parser.add_argument('--max-age', type=int, default=12, help='Meses de antigüedad a mostrar')
+
+    def handle(self, *args, **options):
+        report = cohort_report(options['by'], max_age=options['max_age'])
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f'Retención por cohorte ({report["dimension"]})'))
+        ages = ''.join(f'{"M" + str(age):>7}' for age in report['ages'])
+        self.stdout.write(f'{"Grupo":<40}{"Inicio":>9}{"Clientes":>10}{ages}')
+        for cohort in report['cohorts']:
+            values = ''.join(
+                f'{value * 100:>6.1f}%' if value is not None else f'{"":>7}'
+                for value in cohort['retention']
+            )
+            self.stdout.write(f'{cohort["group"][:39]:<40}{cohort["month"]:>9}{cohort["size"]:>10}{values}')
+
+        self.stdout.write('')
+        self.stdout.write(self.style.MIGRATE_HEADING('Abandono'))
+        self.stdout.write(f'{"Grupo":<40}{"Clientes":>10}{"Bajas":>8}{"Abandono":>10}{"Mensual":>10}')
+        for row in report['churn']:
+            self.stdout.write(
+                f'{row["group"][:39]:<40}{row["clients"]:>10}{row["churned"]:>8}'
+                f'{row["churn_rate"] * 100:>9.1f}%{row["monthly_churn_rate"] * 100:>9.2f}%'
+            )
+
+        self.stdout.write(self.style.SUCCESS(f'{report["clients"]} clientes analizados'))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.accounting.snapshots import ROW_GROUP_SIZE, TABLES, export_snapshot, snapshot_root
+
+
+class Command(BaseCommand):
+    help = 'Exporta a Parquet los clientes y líneas de negocio cambiados desde la última ejecución'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tables', nargs='*', help=f"Tablas a exportar: {', '.join(TABLES)} (por defecto, todas)")
+        parser.add_argument('--output', help='Directorio de las instantáneas (por defecto SNAPSHOT_ROOT)')
+        parser.add_argument('--full', action='store_true', help='Borrar las partes anteriores y exportar todo')
+        parser.add_argument('--row-group-size', type=int, default=ROW_GROUP_SIZE)
+
+    def handle(self, *args, **options):
+        unknown = set(options['tables']) - set(TABLES)
+        if unknown:
+            raise CommandError(f"Tablas desconocidas: {', '.join(sorted(unknown))}")
+
+        root = options['output'] or snapshot_root()
+        written = export_snapshot(
+            root=root,
+            tables=options['tables'] or None,
+            full=options['full'],
+            row_group_size=options['row_group_size'],
+        )
+        for name, rows in written.items():
+            self.stdout.write(f'{name}: {rows} filas')
+        self.stdout.write(self.style.SUCCESS(f'Instantánea actualizada en {root}'))
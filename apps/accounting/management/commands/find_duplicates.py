@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from apps.accounting.dedup import DUPLICATE_THRESHOLD, rebuild_index, scan_duplicates
+
+
+class Command(BaseCommand):
+    help = 'Busca clientes duplicados comparando solo dentro de cada bloque y los deja pendientes de revisión'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Regenerar antes todas las claves de bloqueo')
+        parser.add_argument('--threshold', type=float, default=DUPLICATE_THRESHOLD, help='Similitud mínima (0-1)')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            keys = rebuild_index()
+            self.stdout.write(f'{keys} claves de bloqueo generadas')
+
+        compared, recorded = scan_duplicates(threshold=options['threshold'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{compared} parejas comparadas, {recorded} posibles duplicados nuevos'
+        ))
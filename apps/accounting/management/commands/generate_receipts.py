@@ -0,0 +1,38 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.accounting.receipts import CHUNK_SIZE, generate_receipts, receipts_dir
+
+
+class Command(BaseCommand):
+    help = 'Genera en paralelo los recibos PDF de los clientes que renuevan en un mes (reanudable)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--period', default=date.today().strftime('%Y-%m'), help='Mes AAAA-MM (por defecto, el actual)')
+        parser.add_argument('--processes', type=int, default=None, help='Procesos del pool (por defecto, uno por CPU)')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument('--force', action='store_true', help='Regenerar también los recibos ya existentes')
+
+    def handle(self, *args, **options):
+        period = options['period']
+
+        def progress(count):
+            self.stdout.write(f'{count} recibos generados...')
+
+        try:
+            generated, existing = generate_receipts(
+                period,
+                processes=options['processes'],
+                chunk_size=options['chunk_size'],
+                force=options['force'],
+                progress=progress if options['verbosity'] > 1 else None,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if existing:
+            self.stdout.write(f'{existing} recibos ya existían y se han conservado')
+        self.stdout.write(self.style.SUCCESS(
+            f'{generated} recibos generados en {receipts_dir(period)}'
+        ))
@@ -0,0 +1,91 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.accounting.loadtest import DEFAULT_MIX, build_scenario, load_sample
+from apps.common.loadtest import LoadTest
+
+
+def parse_mix(value):
+    """'changelist=40,search=20' -> {'changelist': 40, 'search': 20}"""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        try:
+            mix[name.strip()] = int(weight)
+        except ValueError:
+            raise CommandError(f"Peso no válido en la mezcla: '{part}'")
+    return mix
+
+
+def format_ms(value):
+    return f'{value:8.1f}' if value is not None else f"{'-':>8}"
+
+
+class Command(BaseCommand):
+    help = 'Prueba de carga concurrente del changelist de clientes contra un servidor local'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='URL base del servidor')
+        parser.add_argument('--username', required=True, help='Usuario staff con permisos sobre clientes')
+        parser.add_argument('--password', default=os.environ.get('LOADTEST_PASSWORD'),
+                            help='Contraseña (por defecto, variable LOADTEST_PASSWORD)')
+        parser.add_argument('--users', type=int, default=10, help='Usuarios concurrentes')
+        parser.add_argument('--duration', type=int, default=60, help='Segundos de prueba')
+        parser.add_argument('--requests', type=int, default=None, help='Peticiones por usuario (en lugar de duración)')
+        parser.add_argument('--think-time', type=float, default=0.0, help='Pausa media entre peticiones (s)')
+        parser.add_argument('--mix', default=','.join(f'{name}={weight}' for name, weight in DEFAULT_MIX.items()))
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        if not options['password']:
+            raise CommandError('Indica --password o la variable LOADTEST_PASSWORD')
+
+        try:
+            scenario = build_scenario(load_sample(), parse_mix(options['mix']))
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if options['requests']:
+            limit = f"{options['requests']} peticiones por usuario"
+        else:
+            limit = f"{options['duration']} s"
+        self.stdout.write(f"{options['users']} usuarios contra {options['url']} ({limit})")
+        report = LoadTest(
+            options['url'],
+            options['username'],
+            options['password'],
+            scenario,
+            users=options['users'],
+            duration=None if options['requests'] else options['duration'],
+            requests_per_user=options['requests'],
+            think_time=options['think_time'],
+            seed=options['seed'],
+        ).run()
+
+        if report['login_errors']:
+            self.stdout.write(self.style.ERROR(f"{report['login_errors']} usuarios no pudieron iniciar sesión"))
+        if not report['requests']:
+            raise CommandError('No se ha completado ninguna petición')
+
+        self.stdout.write('')
+        self.stdout.write(
+            f"{'endpoint':<14}{'peticiones':>11}{'errores':>9}{'p50 ms':>9}{'p95 ms':>9}"
+            f"{'p99 ms':>9}{'req/s':>8}{'SQL/req':>9}{'SQL total':>10}"
+        )
+        for row in report['endpoints']:
+            queries = row['db_queries_per_request']
+            self.stdout.write(
+                f"{row['endpoint']:<14}{row['requests']:>11}{row['errors']:>9}"
+                f"{format_ms(row['p50_ms']):>9}{format_ms(row['p95_ms']):>9}{format_ms(row['p99_ms']):>9}"
+                f"{row['throughput']:>8.1f}"
+                f"{(f'{queries:.1f}' if queries is not None else '-'):>9}"
+                f"{(row['db_queries'] if row['db_queries'] is not None else '-'):>10}"
+            )
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['requests']} peticiones en {report['elapsed']:.1f} s: "
+            f"{report['throughput']:.1f} req/s"
+        ))
+        if all(row['db_queries'] is None for row in report['endpoints']):
+            self.stdout.write('Activa TRACING_ENABLED en el servidor para ver las consultas SQL por endpoint')
@@ -0,0 +1,41 @@
+import csv
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.accounting.projections import build_revenue_projection
+
+
+class Command(BaseCommand):
+    help = 'Proyecta los ingresos mensuales por línea de negocio para los próximos meses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, default=12, help='Horizonte en meses (12-24 habitual)')
+        parser.add_argument('--csv', action='store_true', help='Salida en CSV en lugar de tabla')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        projection = build_revenue_projection(months=options['months'])
+        elapsed = time.perf_counter() - started
+
+        if options['csv']:
+            writer = csv.writer(sys.stdout)
+            writer.writerow(['Línea de negocio'] + projection['months'] + ['Total'])
+            for row in projection['rows']:
+                writer.writerow([row['business_line']] + row['amounts'] + [row['total']])
+            writer.writerow(['TOTAL'] + projection['totals'] + [projection['grand_total']])
+            return
+
+        width = max([len(row['business_line']) for row in projection['rows']] + [16])
+        header = 'Línea de negocio'.ljust(width) + ''.join(f'{month:>12}' for month in projection['months'])
+        self.stdout.write(header + f'{"Total":>14}')
+        for row in projection['rows']:
+            amounts = ''.join(f'{amount:>12.2f}' for amount in row['amounts'])
+            self.stdout.write(row['business_line'].ljust(width) + amounts + f'{row["total"]:>14.2f}')
+        totals = ''.join(f'{amount:>12.2f}' for amount in projection['totals'])
+        self.stdout.write('TOTAL'.ljust(width) + totals + f'{projection["grand_total"]:>14.2f}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{projection["clients"]} clientes activos proyectados en {elapsed:.2f}s'
+        ))
@@ -0,0 +1,56 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.accounting.models import Client
+from apps.accounting.reassignment import reassign_clients, reassignment_summary
+from apps.business_lines.hierarchy import get_tree
+from apps.business_lines.models import BusinessLine
+
+
+class Command(BaseCommand):
+    help = 'Mueve todos los clientes de una línea de negocio a otra, trasladando los remanentes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='source', required=True, help='Slug de la línea de origen')
+        parser.add_argument('--to', dest='target', required=True, help='Slug de la línea destino')
+        parser.add_argument('--include-descendants', action='store_true',
+                            help='Incluir los clientes de las sublíneas de la línea de origen')
+        parser.add_argument('--dry-run', action='store_true', help='Mostrar el resumen sin modificar nada')
+
+    def handle(self, *args, **options):
+        lines = dict(
+            BusinessLine.objects.filter(slug__in=[options['source'], options['target']])
+            .values_list('slug', 'pk')
+        )
+        for key in ('source', 'target'):
+            if options[key] not in lines:
+                raise CommandError(f"No existe la línea '{options[key]}'")
+        source_id, target_id = lines[options['source']], lines[options['target']]
+
+        if options['include_descendants']:
+            source_ids = get_tree().descendant_ids(source_id)
+        else:
+            source_ids = [source_id]
+        queryset = Client.objects.filter(business_line_id__in=source_ids).exclude(business_line_id=target_id)
+
+        try:
+            summary = reassignment_summary(queryset, target_id)
+        except ValidationError as exc:
+            raise CommandError('; '.join(exc.messages))
+
+        self.stdout.write(f"Destino: {summary['target']} (remanente: {summary['target_remanente_field'] or 'ninguno'})")
+        for source in summary['sources']:
+            self.stdout.write(
+                f"  {source['business_line']}: {source['clients']} clientes, "
+                f"€{source['remanente_moved']} trasladado, €{source['remanente_discarded']} descartado"
+            )
+        self.stdout.write(
+            f"Total: {summary['clients']} clientes, €{summary['remanente_moved']} trasladado, "
+            f"€{summary['remanente_discarded']} descartado"
+        )
+
+        if options['dry_run']:
+            return
+
+        moved = reassign_clients(queryset, target_id)
+        self.stdout.write(self.style.SUCCESS(f'{moved} clientes reasignados'))
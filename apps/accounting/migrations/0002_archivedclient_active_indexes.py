@@ -0,0 +1,54 @@
+# Generated by Django 4.2.22 on 2026-10-19 05:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('business_lines', '0001_initial'),
+        ('accounting', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedClient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.BigIntegerField(unique=True, verbose_name='ID original')),
+                ('nombre', models.CharField(db_index=True, max_length=200, verbose_name='Nombre completo')),
+                ('dni', models.CharField(db_index=True, max_length=20, verbose_name='DNI')),
+                ('categoria', models.CharField(choices=[('White', 'White'), ('Black', 'Black')], max_length=10, verbose_name='Categoría')),
+                ('metodo_pago', models.CharField(choices=[('tarjeta', 'Tarjeta'), ('efectivo', 'Efectivo')], max_length=20, verbose_name='Método de pago')),
+                ('fecha_inicio', models.DateField(verbose_name='Fecha de inicio')),
+                ('fecha_renovacion', models.DateField(verbose_name='Fecha de renovación')),
+                ('precio', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Precio €')),
+                ('remanente_pepe', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('remanente_pepe_video', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('remanente_dani', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('remanente_aven', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Cliente archivado',
+                'verbose_name_plural': 'Clientes archivados',
+                'ordering': ['-archived_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['business_line', 'categoria', 'nombre'], name='client_active_line_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['fecha_renovacion'], name='client_active_renov_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedclient',
+            name='business_line',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archived_clients', to='business_lines.businessline', verbose_name='Línea de negocio'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.22 on 2026-10-19 05:24
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0002_archivedclient_active_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('nombre'), name='text_pattern_ops'), name='client_nombre_prefix_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('dni'), name='text_pattern_ops'), name='client_dni_prefix_idx'),
+        ),
+    ]
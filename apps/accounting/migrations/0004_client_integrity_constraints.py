@@ -0,0 +1,149 @@
+# Generated by Django 4.2.22 on 2026-10-19 05:25
+
+import logging
+
+from django.db import migrations, models
+
+
+logger = logging.getLogger(__name__)
+
+REMANENTE_FIELDS = [
+    'remanente_pepe',
+    'remanente_pepe_video',
+    'remanente_dani',
+    'remanente_aven',
+]
+
+
+def _fix(queryset, description, **changes):
+    """Aplica los cambios y deja en el log los ids afectados"""
+    pks = list(queryset.order_by('pk').values_list('pk', flat=True))
+    if pks:
+        logger.warning('%s: %d clientes corregidos (ids %s)', description, len(pks), pks)
+        queryset.model.objects.filter(pk__in=pks).update(**changes)
+
+
+def clean_violations(apps, schema_editor):
+    """Corrige las filas existentes que incumplirían las nuevas restricciones"""
+    Client = apps.get_model('accounting', 'Client')
+    BusinessLine = apps.get_model('business_lines', 'BusinessLine')
+
+    def with_remanente(fields):
+        condition = models.Q()
+        for field in fields:
+            condition |= models.Q(**{f'{field}__isnull': False})
+        return condition
+
+    # White: sin remanentes
+    _fix(
+        Client.objects.exclude(categoria='Black').filter(with_remanente(REMANENTE_FIELDS)),
+        'Remanentes borrados de clientes White',
+        **{field: None for field in REMANENTE_FIELDS}
+    )
+
+    # Black: solo el campo de remanente de su línea
+    fields_by_line = {}
+    for line_id, has_remanente, remanente_field in BusinessLine.objects.values_list(
+        'id', 'has_remanente', 'remanente_field'
+    ):
+        keep = remanente_field if has_remanente and remanente_field in REMANENTE_FIELDS else None
+        fields_by_line.setdefault(keep, []).append(line_id)
+    for keep, line_ids in fields_by_line.items():
+        others = [field for field in REMANENTE_FIELDS if field != keep]
+        _fix(
+            Client.objects.filter(business_line_id__in=line_ids).filter(with_remanente(others)),
+            f'Remanentes distintos de {keep or "ninguno"} borrados',
+            **{field: None for field in others}
+        )
+
+    # La renovación no puede ser anterior al inicio
+    _fix(
+        Client.objects.filter(fecha_renovacion__lt=models.F('fecha_inicio')),
+        'Renovación anterior al inicio ajustada a la fecha de inicio',
+        fecha_renovacion=models.F('fecha_inicio')
+    )
+
+
+# El campo de remanente debe coincidir con el de la línea (regla entre tablas)
+TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION accounting_client_check_remanente() RETURNS trigger AS $$
+DECLARE
+    line_field varchar;
+BEGIN
+    SELECT COALESCE(CASE WHEN has_remanente THEN remanente_field END, '')
+      INTO line_field
+      FROM business_lines_businessline
+     WHERE id = NEW.business_line_id;
+
+    IF (NEW.remanente_pepe IS NOT NULL AND line_field <> 'remanente_pepe')
+       OR (NEW.remanente_pepe_video IS NOT NULL AND line_field <> 'remanente_pepe_video')
+       OR (NEW.remanente_dani IS NOT NULL AND line_field <> 'remanente_dani')
+       OR (NEW.remanente_aven IS NOT NULL AND line_field <> 'remanente_aven') THEN
+        RAISE EXCEPTION 'El remanente del cliente % no corresponde a su línea de negocio', NEW.id
+            USING ERRCODE = 'check_violation';
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER accounting_client_check_remanente
+    BEFORE INSERT OR UPDATE OF business_line_id, remanente_pepe, remanente_pepe_video, remanente_dani, remanente_aven
+    ON accounting_client
+    FOR EACH ROW EXECUTE FUNCTION accounting_client_check_remanente();
+
+CREATE OR REPLACE FUNCTION business_lines_check_client_remanente() RETURNS trigger AS $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM accounting_client c
+         WHERE c.business_line_id = NEW.id
+           AND (
+               (c.remanente_pepe IS NOT NULL AND NOT (NEW.has_remanente AND NEW.remanente_field = 'remanente_pepe'))
+            OR (c.remanente_pepe_video IS NOT NULL AND NOT (NEW.has_remanente AND NEW.remanente_field = 'remanente_pepe_video'))
+            OR (c.remanente_dani IS NOT NULL AND NOT (NEW.has_remanente AND NEW.remanente_field = 'remanente_dani'))
+            OR (c.remanente_aven IS NOT NULL AND NOT (NEW.has_remanente AND NEW.remanente_field = 'remanente_aven'))
+           )
+    ) THEN
+        RAISE EXCEPTION 'La línea % tiene clientes con remanentes en otro campo', NEW.id
+            USING ERRCODE = 'check_violation';
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER business_lines_check_client_remanente
+    AFTER UPDATE OF has_remanente, remanente_field
+    ON business_lines_businessline
+    FOR EACH ROW EXECUTE FUNCTION business_lines_check_client_remanente();
+"""
+
+DROP_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS business_lines_check_client_remanente ON business_lines_businessline;
+DROP FUNCTION IF EXISTS business_lines_check_client_remanente();
+DROP TRIGGER IF EXISTS accounting_client_check_remanente ON accounting_client;
+DROP FUNCTION IF EXISTS accounting_client_check_remanente();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0003_client_prefix_indexes'),
+        ('business_lines', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(clean_violations, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='client',
+            constraint=models.CheckConstraint(check=models.Q(('categoria', 'Black'), models.Q(('remanente_aven__isnull', True), ('remanente_dani__isnull', True), ('remanente_pepe__isnull', True), ('remanente_pepe_video__isnull', True)), _connector='OR'), name='client_white_sin_remanente'),
+        ),
+        migrations.AddConstraint(
+            model_name='client',
+            constraint=models.CheckConstraint(check=models.Q(models.Q(('remanente_pepe__isnull', False), ('remanente_pepe_video__isnull', False), _negated=True), models.Q(('remanente_dani__isnull', False), ('remanente_pepe__isnull', False), _negated=True), models.Q(('remanente_aven__isnull', False), ('remanente_pepe__isnull', False), _negated=True), models.Q(('remanente_dani__isnull', False), ('remanente_pepe_video__isnull', False), _negated=True), models.Q(('remanente_aven__isnull', False), ('remanente_pepe_video__isnull', False), _negated=True), models.Q(('remanente_aven__isnull', False), ('remanente_dani__isnull', False), _negated=True)), name='client_un_solo_remanente'),
+        ),
+        migrations.AddConstraint(
+            model_name='client',
+            constraint=models.CheckConstraint(check=models.Q(('fecha_renovacion__gte', models.F('fecha_inicio'))), name='client_renovacion_tras_inicio'),
+        ),
+        migrations.RunSQL(TRIGGER_SQL, DROP_TRIGGER_SQL),
+    ]
@@ -0,0 +1,164 @@
+# Generated by Django 4.2.22 on 2026-10-19 05:42
+
+import itertools
+import re
+import unicodedata
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Copia congelada de las claves de bloqueo de apps.accounting.dedup tal y
+# como eran al crear esta migración: si cambian, find_duplicates --rebuild
+# las regenera, pero la migración debe dar siempre el mismo resultado.
+DNI_LETTERS = 'TRWAGMYFPDXBNJZSQVHLCKE'
+DNI_RE = re.compile(r'^(\d{8})([A-Z])$')
+NAME_STOPWORDS = {'de', 'del', 'la', 'las', 'los', 'y', 'e', 'da', 'do', 'dos', 'san', 'santa'}
+MAX_NAME_TOKENS = 4
+PREFIX_LENGTH = 4
+KEY_MAX_LENGTH = 100
+BATCH_SIZE = 2000
+
+PHONETIC_RULES = [
+    (r'ch', 'X'),
+    (r'll', 'y'),
+    (r'qu', 'k'),
+    (r'gu(?=[ei])', 'g'),
+    (r'c(?=[ei])', 's'),
+    (r'g(?=[ei])', 'j'),
+    (r'z', 's'),
+    (r'c', 'k'),
+    (r'[vw]', 'b'),
+    (r'x', 'ks'),
+    (r'h', ''),
+    (r'y(?![aeiou])', 'i'),
+]
+
+
+def name_tokens(nombre):
+    value = unicodedata.normalize('NFKD', nombre or '')
+    value = ''.join(char for char in value if not unicodedata.combining(char))
+    return [
+        token for token in re.sub(r'[^a-z]+', ' ', value.lower()).split()
+        if len(token) > 1 and token not in NAME_STOPWORDS
+    ]
+
+
+def phonetic_key(token):
+    for pattern, replacement in PHONETIC_RULES:
+        token = re.sub(pattern, replacement, token)
+    if not token:
+        return ''
+    head, tail = token[0], re.sub(r'[aeiou]', '', token[1:])
+    return re.sub(r'(.)\1+', r'\1', head + tail)
+
+
+def dni_letter(digits):
+    return DNI_LETTERS[int(digits) % 23]
+
+
+def dni_corrections(digits, letter):
+    corrections = set()
+    for position, current in enumerate(digits):
+        for digit in '0123456789':
+            if digit != current:
+                candidate = digits[:position] + digit + digits[position + 1:]
+                if dni_letter(candidate) == letter:
+                    corrections.add(candidate)
+    for position in range(len(digits) - 1):
+        if digits[position] != digits[position + 1]:
+            candidate = (
+                digits[:position] + digits[position + 1] + digits[position] + digits[position + 2:]
+            )
+            if dni_letter(candidate) == letter:
+                corrections.add(candidate)
+    return corrections
+
+
+def match_keys(nombre, dni):
+    keys = set()
+    tokens = name_tokens(nombre)[:MAX_NAME_TOKENS]
+    prefixes = sorted({token[:PREFIX_LENGTH] for token in tokens})
+    phonetics = sorted({phonetic_key(token) for token in tokens} - {''})
+    for kind, values in (('n', prefixes), ('p', phonetics)):
+        if len(values) == 1:
+            keys.add(f'{kind}:{values[0]}')
+        for first, second in itertools.combinations(values, 2):
+            keys.add(f'{kind}:{first}|{second}')
+
+    match = DNI_RE.match(re.sub(r'[^0-9A-Z]', '', (dni or '').upper()))
+    if match:
+        digits, letter = match.groups()
+        keys.add(f'd:{digits}')
+        if dni_letter(digits) != letter:
+            keys.update(f'd:{candidate}' for candidate in dni_corrections(digits, letter))
+    return {key[:KEY_MAX_LENGTH] for key in keys}
+
+
+def build_match_keys(apps, schema_editor):
+    """Claves de duplicados de los clientes existentes"""
+    Client = apps.get_model('accounting', 'Client')
+    ClientMatchKey = apps.get_model('accounting', 'ClientMatchKey')
+    rows = []
+    for pk, nombre, dni in Client.objects.order_by('pk').values_list('pk', 'nombre', 'dni').iterator():
+        rows.extend(ClientMatchKey(client_id=pk, key=key) for key in match_keys(nombre, dni))
+        if len(rows) >= BATCH_SIZE:
+            ClientMatchKey.objects.bulk_create(rows)
+            rows = []
+    ClientMatchKey.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('accounting', '0004_client_integrity_constraints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DuplicateCandidate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(verbose_name='Similitud')),
+                ('reasons', models.JSONField(default=list, verbose_name='Coincidencias')),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('dismissed', 'Descartado')], default='pending', max_length=10, verbose_name='Estado')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('reviewed_at', models.DateTimeField(blank=True, null=True)),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='duplicate_candidates', to='accounting.client', verbose_name='Cliente')),
+                ('duplicate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='accounting.client', verbose_name='Posible duplicado')),
+                ('reviewed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Revisado por')),
+            ],
+            options={
+                'verbose_name': 'Posible duplicado',
+                'verbose_name_plural': 'Posibles duplicados',
+                'ordering': ['-score'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ClientMatchKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100)),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='match_keys', to='accounting.client')),
+            ],
+            options={
+                'verbose_name': 'Clave de duplicados',
+                'verbose_name_plural': 'Claves de duplicados',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='duplicatecandidate',
+            constraint=models.UniqueConstraint(fields=('client', 'duplicate'), name='duplicate_candidate_unique_pair'),
+        ),
+        migrations.AddConstraint(
+            model_name='duplicatecandidate',
+            constraint=models.CheckConstraint(check=models.Q(('client__lt', models.F('duplicate'))), name='duplicate_candidate_ordered_pair'),
+        ),
+        migrations.AddConstraint(
+            model_name='clientmatchkey',
+            constraint=models.UniqueConstraint(fields=('key', 'client'), name='client_match_key_unique'),
+        ),
+        migrations.RunPython(build_match_keys, migrations.RunPython.noop),
+    ]
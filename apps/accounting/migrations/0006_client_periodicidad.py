@@ -0,0 +1,83 @@
+# Generated by Django 4.2.22 on 2026-10-19 05:53
+
+from datetime import date
+
+from django.db import migrations, models
+
+
+PERIODICIDADES = [1, 3, 6, 12]
+
+
+def months_between(start, end):
+    return (end.year - start.year) * 12 + end.month - start.month
+
+
+def nearest_periodicidad(months):
+    return min(PERIODICIDADES, key=lambda value: (abs(value - months), value))
+
+
+def _fecha_renovacion(payload):
+    """fecha_renovacion de un evento de save() o de un update() masivo"""
+    value = payload.get('fecha_renovacion') or payload.get('values', {}).get('fecha_renovacion')
+    return date.fromisoformat(value[:10]) if value else None
+
+
+def backfill_periodicidad(apps, schema_editor):
+    """
+    Periodicidad a partir de la última renovación registrada en el outbox
+    (dos últimas fechas de renovación distintas). Sin historial, si la
+    renovación es la primera (como mucho a 12 meses del inicio) se usa el
+    intervalo inicio-renovación; si no, se deja mensual.
+    """
+    Client = apps.get_model('accounting', 'Client')
+    OutboxEvent = apps.get_model('common', 'OutboxEvent')
+
+    history = {}
+    events = OutboxEvent.objects.filter(aggregate_type='accounting.client').order_by('id')
+    for client_id, payload in events.values_list('aggregate_id', 'payload').iterator(chunk_size=2000):
+        fecha = _fecha_renovacion(payload or {})
+        if fecha is None:
+            continue
+        dates = history.setdefault(client_id, [])
+        if not dates or dates[-1] != fecha:
+            dates.append(fecha)
+            del dates[:-2]
+
+    batch = []
+    clients = Client.objects.order_by('pk').only('pk', 'fecha_inicio', 'fecha_renovacion')
+    for client in clients.iterator(chunk_size=2000):
+        dates = history.get(client.pk, [])
+        if len(dates) == 2 and dates[1] > dates[0]:
+            months = months_between(dates[0], dates[1])
+        else:
+            months = months_between(client.fecha_inicio, client.fecha_renovacion)
+            if months > 12:
+                months = 1
+        client.periodicidad_meses = nearest_periodicidad(max(months, 1))
+        batch.append(client)
+        if len(batch) >= 2000:
+            Client.objects.bulk_update(batch, ['periodicidad_meses'])
+            batch = []
+    Client.objects.bulk_update(batch, ['periodicidad_meses'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0005_duplicate_detection'),
+        ('common', '0004_outbox_transaction_order'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedclient',
+            name='periodicidad_meses',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'Mensual'), (3, 'Trimestral'), (6, 'Semestral'), (12, 'Anual')], default=1, verbose_name='Periodicidad'),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='periodicidad_meses',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'Mensual'), (3, 'Trimestral'), (6, 'Semestral'), (12, 'Anual')], default=1, help_text='Meses entre renovaciones', verbose_name='Periodicidad'),
+        ),
+        migrations.RunPython(backfill_periodicidad, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,23 @@
+from django.conf import settings
+from django.contrib.postgres.indexes import OpClass
 from django.db import models
+from django.db.models.functions import Upper
 from django.core.validators import RegexValidator
 from django.core.exceptions import ValidationError
 from datetime import date, timedelta
 from apps.business_lines.models import BusinessLine
+from apps.common.models import OutboxModelMixin, OutboxQuerySet
 
 
-class Client(models.Model):
+REMANENTE_FIELDS = [
+    'remanente_pepe',
+    'remanente_pepe_video',
+    'remanente_dani',
+    'remanente_aven',
+]
+
+
+class Client(OutboxModelMixin, models.Model):
     """
     Modelo para gestionar clientes y sus ingresos.
     Cada cliente pertenece a una línea de negocio específica.
@@ -21,6 +33,13 @@ class Client(models.Model):
         ('efectivo', 'Efectivo'),
     ]
     
+    PERIODICIDAD_CHOICES = [
+        (1, 'Mensual'),
+        (3, 'Trimestral'),
+        (6, 'Semestral'),
+        (12, 'Anual'),
+    ]
+    
     # Datos básicos del cliente
     nombre = models.CharField(
         max_length=200,
@@ -70,6 +89,13 @@ class Client(models.Model):
         verbose_name="Fecha de renovación"
     )
     
+    periodicidad_meses = models.PositiveSmallIntegerField(
+        choices=PERIODICIDAD_CHOICES,
+        default=1,
+        verbose_name="Periodicidad",
+        help_text="Meses entre renovaciones"
+    )
+    
     # Precio del servicio
     precio = models.DecimalField(
         max_digits=10,
@@ -124,11 +150,63 @@ class Client(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = OutboxQuerySet.as_manager()
+    
     class Meta:
         verbose_name = "Cliente"
         verbose_name_plural = "Clientes"
         ordering = ['business_line__name', 'categoria', 'nombre']
         unique_together = ['dni', 'business_line']
+        constraints = [
+            # Los clientes White no tienen remanentes
+            models.CheckConstraint(
+                check=models.Q(categoria='Black') | models.Q(
+                    remanente_pepe__isnull=True,
+                    remanente_pepe_video__isnull=True,
+                    remanente_dani__isnull=True,
+                    remanente_aven__isnull=True,
+                ),
+                name='client_white_sin_remanente',
+            ),
+            # Como mucho un campo de remanente: el de la línea (verificado por trigger)
+            models.CheckConstraint(
+                check=(
+                    ~models.Q(remanente_pepe__isnull=False, remanente_pepe_video__isnull=False)
+                    & ~models.Q(remanente_pepe__isnull=False, remanente_dani__isnull=False)
+                    & ~models.Q(remanente_pepe__isnull=False, remanente_aven__isnull=False)
+                    & ~models.Q(remanente_pepe_video__isnull=False, remanente_dani__isnull=False)
+                    & ~models.Q(remanente_pepe_video__isnull=False, remanente_aven__isnull=False)
+                    & ~models.Q(remanente_dani__isnull=False, remanente_aven__isnull=False)
+                ),
+                name='client_un_solo_remanente',
+            ),
+            models.CheckConstraint(
+                check=models.Q(fecha_renovacion__gte=models.F('fecha_inicio')),
+                name='client_renovacion_tras_inicio',
+            ),
+        ]
+        indexes = [
+            # Índices parciales: solo cubren los clientes activos (conjunto caliente)
+            models.Index(
+                fields=['business_line', 'categoria', 'nombre'],
+                name='client_active_line_idx',
+                condition=models.Q(is_active=True),
+            ),
+            models.Index(
+                fields=['fecha_renovacion'],
+                name='client_active_renov_idx',
+                condition=models.Q(is_active=True),
+            ),
+            # Búsqueda por prefijo del autocompletado: UPPER(campo) LIKE 'X%'
+            models.Index(
+                OpClass(Upper('nombre'), name='text_pattern_ops'),
+                name='client_nombre_prefix_idx',
+            ),
+            models.Index(
+                OpClass(Upper('dni'), name='text_pattern_ops'),
+                name='client_dni_prefix_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.nombre} ({self.business_line.get_full_path()} - {self.categoria})"
@@ -137,25 +215,12 @@ class Client(models.Model):
         """Validaciones específicas de negocio"""
         super().clean()
         
-        # Validar que solo las líneas correctas tengan remanentes
-        if self.categoria == 'Black':
-            business_line_name = self.business_line.name
-            
-            # Limpiar remanentes que no corresponden a esta línea
-            if business_line_name != 'PEPE-normal':
-                self.remanente_pepe = None
-            if business_line_name != 'PEPE-videoCall':
-                self.remanente_pepe_video = None
-            if business_line_name != 'Dani-Rubi':
-                self.remanente_dani = None
-            if business_line_name != 'Dani':
-                self.remanente_aven = None
-        else:
-            # Clientes White no tienen remanentes
-            self.remanente_pepe = None
-            self.remanente_pepe_video = None
-            self.remanente_dani = None
-            self.remanente_aven = None
+        # Solo se conserva el remanente del campo de la línea; el resto se
+        # limpia (las restricciones de la base de datos aplican la misma regla)
+        keep = self.get_remanente_field_name()
+        for field in REMANENTE_FIELDS:
+            if field != keep:
+                setattr(self, field, None)
     
     @property
     def remanente_total(self):
@@ -187,14 +252,188 @@ class Client(models.Model):
     
     def get_remanente_field_name(self):
         """Retorna el nombre del campo de remanente correspondiente"""
-        if self.categoria != 'Black':
+        if self.categoria != 'Black' or self.business_line_id is None:
             return None
             
-        business_line_name = self.business_line.name
-        remanente_map = {
-            'PEPE-normal': 'remanente_pepe',
-            'PEPE-videoCall': 'remanente_pepe_video',
-            'Dani-Rubi': 'remanente_dani',
-            'Dani': 'remanente_aven',
-        }
-        return remanente_map.get(business_line_name)
+        if not self.business_line.has_remanente:
+            return None
+        if self.business_line.remanente_field not in REMANENTE_FIELDS:
+            return None
+        return self.business_line.remanente_field
+
+
+class ArchivedClient(models.Model):
+    """
+    Cliente inactivo movido fuera de la tabla principal (archivo frío).
+    Conserva todos los datos para poder restaurarlo con el mismo id.
+    """
+    
+    original_id = models.BigIntegerField(
+        unique=True,
+        verbose_name="ID original"
+    )
+    
+    nombre = models.CharField(
+        max_length=200,
+        db_index=True,
+        verbose_name="Nombre completo"
+    )
+    
+    dni = models.CharField(
+        max_length=20,
+        db_index=True,
+        verbose_name="DNI"
+    )
+    
+    business_line = models.ForeignKey(
+        BusinessLine,
+        on_delete=models.PROTECT,
+        related_name='archived_clients',
+        verbose_name="Línea de negocio"
+    )
+    
+    categoria = models.CharField(
+        max_length=10,
+        choices=Client.CATEGORIA_CHOICES,
+        verbose_name="Categoría"
+    )
+    
+    metodo_pago = models.CharField(
+        max_length=20,
+        choices=Client.METODO_PAGO_CHOICES,
+        verbose_name="Método de pago"
+    )
+    
+    fecha_inicio = models.DateField(verbose_name="Fecha de inicio")
+    fecha_renovacion = models.DateField(verbose_name="Fecha de renovación")
+    periodicidad_meses = models.PositiveSmallIntegerField(
+        choices=Client.PERIODICIDAD_CHOICES,
+        default=1,
+        verbose_name="Periodicidad"
+    )
+    
+    precio = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Precio €")
+    
+    remanente_pepe = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    remanente_pepe_video = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    remanente_dani = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    remanente_aven = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    
+    # Metadatos del cliente original y del archivado
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    # Campos que se copian tal cual entre Client y ArchivedClient
+    COPIED_FIELDS = [
+        'nombre', 'dni', 'business_line_id', 'categoria', 'metodo_pago',
+        'fecha_inicio', 'fecha_renovacion', 'periodicidad_meses', 'precio',
+        'remanente_pepe', 'remanente_pepe_video', 'remanente_dani', 'remanente_aven',
+        'created_at', 'updated_at',
+    ]
+    
+    class Meta:
+        verbose_name = "Cliente archivado"
+        verbose_name_plural = "Clientes archivados"
+        ordering = ['-archived_at']
+    
+    def __str__(self):
+        return f"{self.nombre} ({self.dni}) - archivado"
+
+
+class ClientMatchKey(models.Model):
+    """
+    Clave de bloqueo para la detección de duplicados (ver accounting.dedup).
+    Cada cliente tiene unas pocas claves; solo se comparan clientes que
+    comparten alguna.
+    """
+    
+    client = models.ForeignKey(
+        Client,
+        on_delete=models.CASCADE,
+        related_name='match_keys'
+    )
+    
+    key = models.CharField(max_length=100)
+    
+    class Meta:
+        verbose_name = "Clave de duplicados"
+        verbose_name_plural = "Claves de duplicados"
+        constraints = [
+            # El índice único (key, client) sirve también para buscar por clave
+            models.UniqueConstraint(fields=['key', 'client'], name='client_match_key_unique'),
+        ]
+    
+    def __str__(self):
+        return self.key
+
+
+class DuplicateCandidate(models.Model):
+    """
+    Pareja de clientes que probablemente son la misma persona, pendiente de
+    revisión. Al fusionarlos se borra el cliente descartado y, con él, la pareja.
+    """
+    
+    STATUS_PENDING = 'pending'
+    STATUS_DISMISSED = 'dismissed'
+    
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pendiente'),
+        (STATUS_DISMISSED, 'Descartado'),
+    ]
+    
+    # Siempre client_id < duplicate_id: una sola fila por pareja
+    client = models.ForeignKey(
+        Client,
+        on_delete=models.CASCADE,
+        related_name='duplicate_candidates',
+        verbose_name="Cliente"
+    )
+    
+    duplicate = models.ForeignKey(
+        Client,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name="Posible duplicado"
+    )
+    
+    score = models.FloatField(verbose_name="Similitud")
+    
+    reasons = models.JSONField(
+        default=list,
+        verbose_name="Coincidencias"
+    )
+    
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        verbose_name="Estado"
+    )
+    
+    reviewed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Revisado por"
+    )
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    reviewed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        verbose_name = "Posible duplicado"
+        verbose_name_plural = "Posibles duplicados"
+        ordering = ['-score']
+        constraints = [
+            models.UniqueConstraint(fields=['client', 'duplicate'], name='duplicate_candidate_unique_pair'),
+            models.CheckConstraint(
+                check=models.Q(client__lt=models.F('duplicate')),
+                name='duplicate_candidate_ordered_pair',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.client_id} ↔ {self.duplicate_id} ({self.score:.2f})"
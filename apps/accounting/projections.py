@@ -0,0 +1,192 @@
+"""
+Proyección vectorizada de ingresos mensuales por línea de negocio.
+
+Los clientes activos se extraen una sola vez a arrays de NumPy (un array por
+columna) y todo el calendario de renovaciones se calcula con aritmética de
+fechas vectorizada: el único bucle avanza una renovación a la vez para todos
+los clientes, nunca recorre los clientes uno a uno.
+
+Modelo de la proyección:
+- Periodicidad: Client.periodicidad_meses (mensual, trimestral...).
+- Renovaciones vencidas: se llevan al siguiente múltiplo de la periodicidad
+  a partir del mes actual.
+- Abandono: tasa mensual de cada línea (bajas por mes de exposición, la
+  misma del análisis de cohortes). Un cliente sigue activo en el mes m con
+  probabilidad (1 - tasa) ** (m + 1), así cada renovación acumula tantos
+  meses de abandono como su periodicidad.
+"""
+
+from datetime import date
+
+import numpy as np
+from django.core.cache import cache
+
+from apps.business_lines.models import BusinessLine
+from .analytics import monthly_churn_by_line
+from .models import Client
+
+
+CHUNK_SIZE = 20000
+CACHE_TIMEOUT = 15 * 60
+
+
+COLUMNS = ('business_line_id', 'fecha_inicio', 'fecha_renovacion', 'periodicidad', 'precio')
+
+
+class ClientColumns:
+    """Buffer columnar con los datos de los clientes activos; crece según llegan filas"""
+
+    def __init__(self, capacity=CHUNK_SIZE):
+        self.business_line_id = np.empty(capacity, dtype=np.int64)
+        self.fecha_inicio = np.empty(capacity, dtype='datetime64[D]')
+        self.fecha_renovacion = np.empty(capacity, dtype='datetime64[D]')
+        self.periodicidad = np.empty(capacity, dtype=np.int64)
+        self.precio = np.empty(capacity, dtype=np.float64)
+        self.size = 0
+
+    def reserve(self, size):
+        """Duplica la capacidad hasta que quepan 'size' filas"""
+        capacity = len(self.precio)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity = max(capacity * 2, 1)
+        for name in COLUMNS:
+            column = getattr(self, name)
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            setattr(self, name, grown)
+
+    def append(self, rows):
+        """Copia un bloque de filas (tuplas de values_list) en los arrays"""
+        if not rows:
+            return
+        start, end = self.size, self.size + len(rows)
+        self.reserve(end)
+        business_line_id, fecha_inicio, fecha_renovacion, periodicidad, precio = zip(*rows)
+        self.business_line_id[start:end] = business_line_id
+        self.fecha_inicio[start:end] = np.array(fecha_inicio, dtype='datetime64[D]')
+        self.fecha_renovacion[start:end] = np.array(fecha_renovacion, dtype='datetime64[D]')
+        self.periodicidad[start:end] = periodicidad
+        self.precio[start:end] = np.array(precio, dtype=np.float64)
+        self.size = end
+
+    def trim(self):
+        for name in COLUMNS:
+            setattr(self, name, getattr(self, name)[:self.size])
+        return self
+
+
+def extract_active_clients(queryset=None):
+    """
+    Lee los clientes activos una sola vez, en bloques, a un buffer columnar.
+    Sin COUNT previo: el buffer crece con las filas que devuelve la lectura,
+    así altas o bajas concurrentes no lo desbordan ni dejan filas vacías.
+    """
+    if queryset is None:
+        queryset = Client.objects.all()
+    queryset = queryset.filter(is_active=True).order_by()
+
+    columns = ClientColumns()
+    rows = queryset.values_list(
+        'business_line_id', 'fecha_inicio', 'fecha_renovacion', 'periodicidad_meses', 'precio'
+    ).iterator(chunk_size=CHUNK_SIZE)
+
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == CHUNK_SIZE:
+            columns.append(chunk)
+            chunk = []
+    columns.append(chunk)
+    return columns.trim()
+
+
+def churn_rates_by_line(today=None):
+    """
+    Tasa mensual de abandono por línea: {business_line_id: bajas por mes de
+    exposición}, incluidos los clientes archivados (ver analytics).
+    """
+    return monthly_churn_by_line(today)
+
+
+def project_revenue(columns, churn_rates, months=12, start=None):
+    """
+    Calcula los ingresos esperados por línea para cada mes del horizonte.
+
+    Retorna (line_ids, month_labels, matrix) donde matrix[i, m] es el ingreso
+    esperado de line_ids[i] en el mes m.
+    """
+    start = start or date.today()
+    start_month = np.datetime64(start, 'M')
+    month_labels = [str(start_month + offset) for offset in range(months)]
+
+    if columns.size == 0:
+        return np.empty(0, dtype=np.int64), month_labels, np.zeros((0, months))
+
+    line_ids, line_index = np.unique(columns.business_line_id, return_inverse=True)
+    churn = np.array([churn_rates.get(int(line_id), 0.0) for line_id in line_ids])
+    monthly_retention = 1.0 - churn[line_index]
+
+    # Meses como enteros (meses desde 1970) para operar sin objetos date
+    renovacion_month = columns.fecha_renovacion.astype('datetime64[M]').astype(np.int64)
+    current = start_month.astype(np.int64)
+
+    period = np.maximum(columns.periodicidad, 1)
+
+    # Las renovaciones vencidas pasan al próximo múltiplo de la periodicidad
+    overdue = np.maximum(current - renovacion_month, 0)
+    first_renewal = renovacion_month + -(-overdue // period) * period
+
+    # Cada iteración avanza una renovación a todos los clientes que siguen dentro
+    # del horizonte, así el trabajo total es proporcional al número de renovaciones
+    offset = first_renewal - current
+    lines = line_index
+    precio = columns.precio
+    retention = monthly_retention
+    flat = np.zeros(len(line_ids) * months)
+    while offset.size:
+        within = offset < months
+        offset, lines, precio = offset[within], lines[within], precio[within]
+        period, retention = period[within], retention[within]
+        # Probabilidad de seguir activo en el mes de la renovación
+        factor = retention ** (offset + 1)
+        flat += np.bincount(lines * months + offset, weights=precio * factor, minlength=flat.size)
+        offset = offset + period
+    matrix = flat.reshape(len(line_ids), months)
+
+    return line_ids, month_labels, matrix
+
+
+def build_revenue_projection(months=12, start=None):
+    """Proyección lista para mostrar: filas con ruta de la línea e importes por mes"""
+    columns = extract_active_clients()
+    line_ids, month_labels, matrix = project_revenue(
+        columns, churn_rates_by_line(), months=months, start=start
+    )
+
+    lines = BusinessLine.objects.in_bulk(line_ids.tolist())
+    rows = [
+        {
+            'business_line_id': int(line_id),
+            'business_line': lines[int(line_id)].get_full_path(),
+            'amounts': [round(float(amount), 2) for amount in matrix[i]],
+            'total': round(float(matrix[i].sum()), 2),
+        }
+        for i, line_id in enumerate(line_ids)
+    ]
+    rows.sort(key=lambda row: row['business_line'])
+
+    return {
+        'months': month_labels,
+        'rows': rows,
+        'totals': [round(float(amount), 2) for amount in matrix.sum(axis=0)],
+        'grand_total': round(float(matrix.sum()), 2),
+        'clients': columns.size,
+    }
+
+
+def get_cached_revenue_projection(months=12):
+    """Proyección cacheada para el admin (se recalcula como mucho cada CACHE_TIMEOUT)"""
+    key = f'accounting:revenue_projection:{date.today().isoformat()}:{months}'
+    return cache.get_or_set(key, lambda: build_revenue_projection(months), CACHE_TIMEOUT)
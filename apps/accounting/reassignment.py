@@ -0,0 +1,112 @@
+"""
+Reasignación masiva de clientes entre líneas de negocio.
+
+Se usa al dividir o fusionar líneas (p.ej. PEPE-normal -> PEPE-videoCall).
+Los remanentes de los clientes Black pasan del campo de la línea de origen
+al campo de la línea destino según BusinessLine.remanente_field. Todo se
+ejecuta como UPDATEs por conjunto (uno por línea de origen) dentro de una
+única transacción; el resumen previo se calcula con una agregación.
+"""
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Case, Count, F, Sum, When
+
+from apps.business_lines.hierarchy import get_tree
+from .models import REMANENTE_FIELDS
+
+
+def remanente_field_for(node):
+    """Campo de remanente de una línea (nodo del árbol) o None si no maneja remanentes"""
+    if not node['has_remanente']:
+        return None
+    if node['remanente_field'] not in REMANENTE_FIELDS:
+        raise ValidationError(
+            f"La línea {node['name']} tiene un campo de remanente no válido: '{node['remanente_field']}'"
+        )
+    return node['remanente_field']
+
+
+def _validate_target(tree, target_id):
+    if target_id not in tree:
+        raise ValidationError("La línea destino no existe")
+    target = tree.nodes[target_id]
+    if not target['is_active']:
+        raise ValidationError(f"La línea destino {target['name']} no está activa")
+    return target
+
+
+def reassignment_summary(queryset, target_id):
+    """
+    Resumen sin modificar nada: clientes y remanentes por línea de origen,
+    con el importe que se traslada y el que se descarta.
+    """
+    tree = get_tree()
+    target = _validate_target(tree, target_id)
+    target_field = remanente_field_for(target)
+
+    rows = (
+        queryset.order_by()
+        .values('business_line_id', 'categoria')
+        .annotate(clients=Count('pk'), **{field: Sum(field) for field in REMANENTE_FIELDS})
+    )
+
+    sources = {}
+    for row in rows:
+        line_id = row['business_line_id']
+        source = sources.setdefault(line_id, {
+            'business_line_id': line_id,
+            'business_line': tree.path(line_id) if line_id in tree else str(line_id),
+            'clients': 0,
+            'remanente_moved': 0,
+            'remanente_discarded': 0,
+        })
+        source['clients'] += row['clients']
+        source_field = remanente_field_for(tree.nodes[line_id]) if line_id in tree else None
+        for field in REMANENTE_FIELDS:
+            amount = row[field] or 0
+            if row['categoria'] == 'Black' and field == source_field and target_field:
+                source['remanente_moved'] += amount
+            else:
+                source['remanente_discarded'] += amount
+
+    sources = sorted(sources.values(), key=lambda source: source['business_line'])
+    return {
+        'target': tree.path(target_id),
+        'target_remanente_field': target_field,
+        'sources': sources,
+        'clients': sum(source['clients'] for source in sources),
+        'remanente_moved': sum(source['remanente_moved'] for source in sources),
+        'remanente_discarded': sum(source['remanente_discarded'] for source in sources),
+    }
+
+
+def reassign_clients(queryset, target_id):
+    """
+    Mueve los clientes del queryset a la línea destino.
+    Un UPDATE por línea de origen: el remanente del campo de origen se copia
+    al campo destino (solo Black) y el resto de campos de remanente se vacían.
+    """
+    tree = get_tree()
+    target = _validate_target(tree, target_id)
+    target_field = remanente_field_for(target)
+
+    moved = 0
+    with transaction.atomic():
+        source_ids = list(
+            queryset.order_by().values_list('business_line_id', flat=True).distinct()
+        )
+        for source_id in source_ids:
+            source_field = remanente_field_for(tree.nodes[source_id]) if source_id in tree else None
+
+            updates = {field: None for field in REMANENTE_FIELDS}
+            if target_field and source_field:
+                # Todas las expresiones del SET leen los valores anteriores de la fila
+                updates[target_field] = Case(
+                    When(categoria='Black', then=F(source_field)),
+                    default=None,
+                )
+            updates['business_line_id'] = target_id
+
+            moved += queryset.filter(business_line_id=source_id).update(**updates)
+    return moved
@@ -0,0 +1,209 @@
+"""
+Generación masiva de recibos de renovación en PDF.
+
+Los clientes activos que renuevan en el periodo se leen en streaming (cursor
+del servidor) y se reparten por lotes entre un pool de procesos que solo
+renderizan: los hijos no tocan la base de datos. Cada recibo se escribe en
+PRIVATE_ROOT/receipts/<periodo>/ de forma atómica y el proceso padre añade sus
+datos al manifest.jsonl del periodo al terminar cada lote.
+
+La ejecución es reanudable e idempotente: los recibos que ya figuran en el
+manifest con su fichero presente se saltan, y el número de recibo y el
+contenido del PDF dependen solo de los datos, así que repetir un recibo
+produce el mismo fichero.
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+from collections import deque
+from datetime import date
+from decimal import Decimal
+
+from django.db import connections
+
+from apps.business_lines.hierarchy import get_tree
+from apps.common.pdf import PAGE_HEIGHT, render_pdf
+from apps.common.private_files import private_path
+from .models import REMANENTE_FIELDS, Client
+
+
+CHUNK_SIZE = 500
+MANIFEST_NAME = 'manifest.jsonl'
+
+METODO_PAGO_LABELS = dict(Client.METODO_PAGO_CHOICES)
+
+
+def parse_period(value):
+    """'2025-06' -> (primer día del mes, primer día del mes siguiente)"""
+    try:
+        year, month = (int(part) for part in value.split('-'))
+        start = date(year, month, 1)
+    except ValueError:
+        raise ValueError(f"Periodo no válido: '{value}' (formato AAAA-MM)")
+    end = date(year + month // 12, month % 12 + 1, 1)
+    return start, end
+
+
+def receipts_dir(period):
+    return private_path('receipts', period)
+
+
+def receipt_number(period, client_id):
+    return f"R{period.replace('-', '')}-{client_id:08d}"
+
+
+def renewed_clients(period):
+    """Clientes activos con renovación en el periodo (índice parcial client_active_renov_idx)"""
+    start, end = parse_period(period)
+    return Client.objects.filter(
+        is_active=True,
+        fecha_renovacion__gte=start,
+        fecha_renovacion__lt=end,
+    ).order_by('pk')
+
+
+def load_manifest(directory):
+    """Recibos ya generados: {client_id: entrada}, solo si el fichero sigue existiendo"""
+    path = os.path.join(directory, MANIFEST_NAME)
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # Última línea truncada por una interrupción
+                continue
+            if os.path.exists(os.path.join(directory, entry['file'])):
+                done[entry['client_id']] = entry
+    return done
+
+
+def _receipt_lines(period, row):
+    top = PAGE_HEIGHT - 72
+    lines = [
+        (72, top, 20, 'Recibo de renovación', True),
+        (72, top - 28, 11, f"Nº {row['number']}", False),
+        (72, top - 44, 11, f"Fecha: {row['fecha_renovacion']}", False),
+        (72, top - 84, 12, 'Cliente', True),
+        (72, top - 102, 11, row['nombre'], False),
+        (72, top - 118, 11, f"DNI: {row['dni']}", False),
+        (72, top - 158, 12, 'Servicio', True),
+        (72, top - 176, 11, f"Línea de negocio: {row['business_line']}", False),
+        (72, top - 192, 11, f"Categoría: {row['categoria']}", False),
+        (72, top - 208, 11, f"Método de pago: {row['metodo_pago']}", False),
+        (72, top - 248, 12, 'Importe', True),
+        (72, top - 266, 11, f"Precio: {row['precio']} €", False),
+    ]
+    if row['remanente'] is not None:
+        lines.append((72, top - 282, 11, f"Remanente pendiente: {row['remanente']} €", False))
+    lines.append((72, 72, 9, f'Periodo {period}', False))
+    return lines
+
+
+def render_chunk(directory, period, rows):
+    """Renderiza un lote de recibos (en un proceso del pool) y devuelve sus entradas de manifest"""
+    entries = []
+    for row in rows:
+        data = render_pdf(_receipt_lines(period, row), title=row['number'])
+        filename = f"{row['number']}.pdf"
+        path = os.path.join(directory, filename)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        entries.append({
+            'client_id': row['client_id'],
+            'number': row['number'],
+            'file': filename,
+            'bytes': len(data),
+            'sha256': hashlib.sha256(data).hexdigest(),
+            'precio': row['precio'],
+            'metodo_pago': row['metodo_pago'],
+            'remanente': row['remanente'],
+        })
+    return entries
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def _pending_chunks(period, done, chunk_size):
+    """Filas pendientes en lotes, leídas con un cursor del servidor"""
+    tree = get_tree()
+    rows = renewed_clients(period).values_list(
+        'pk', 'nombre', 'dni', 'business_line_id', 'categoria',
+        'metodo_pago', 'fecha_renovacion', 'precio', *REMANENTE_FIELDS,
+    ).iterator(chunk_size=chunk_size)
+
+    chunk = []
+    for pk, nombre, dni, line_id, categoria, metodo_pago, renovacion, precio, *remanentes in rows:
+        if pk in done:
+            continue
+        remanente = sum((value for value in remanentes if value is not None), Decimal(0))
+        chunk.append({
+            'client_id': pk,
+            'number': receipt_number(period, pk),
+            'nombre': nombre,
+            'dni': dni,
+            'business_line': tree.path(line_id) if line_id in tree else str(line_id),
+            'categoria': categoria,
+            'metodo_pago': METODO_PAGO_LABELS.get(metodo_pago, metodo_pago),
+            'fecha_renovacion': renovacion.strftime('%d/%m/%Y'),
+            'precio': str(precio),
+            'remanente': str(remanente) if categoria == 'Black' and remanente else None,
+        })
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def generate_receipts(period, processes=None, chunk_size=CHUNK_SIZE, force=False, progress=None):
+    """
+    Genera los recibos pendientes del periodo. Devuelve (generados, ya existentes).
+    Como mucho hay processes * 2 lotes en vuelo: la memoria no crece con el volumen.
+    """
+    parse_period(period)
+    directory = receipts_dir(period)
+    os.makedirs(directory, exist_ok=True)
+    manifest_path = os.path.join(directory, MANIFEST_NAME)
+    if force and os.path.exists(manifest_path):
+        os.remove(manifest_path)
+
+    done = load_manifest(directory)
+    processes = processes or os.cpu_count() or 1
+
+    # Los hijos no deben heredar la conexión del padre
+    connections.close_all()
+    generated = 0
+    with multiprocessing.Pool(processes, initializer=_init_worker) as pool, \
+            open(manifest_path, 'a', encoding='utf-8') as manifest:
+
+        def collect(result):
+            entries = result.get()
+            for entry in entries:
+                manifest.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            manifest.flush()
+            os.fsync(manifest.fileno())
+            return len(entries)
+
+        pending = deque()
+        for chunk in _pending_chunks(period, done, chunk_size):
+            pending.append(pool.apply_async(render_chunk, (directory, period, chunk)))
+            if len(pending) >= processes * 2:
+                generated += collect(pending.popleft())
+                if progress:
+                    progress(generated)
+        while pending:
+            generated += collect(pending.popleft())
+            if progress:
+                progress(generated)
+
+    return generated, len(done)
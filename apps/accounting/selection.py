@@ -0,0 +1,55 @@
+"""
+Selección de clientes de una acción del admin, serializable para la cola.
+
+Con "seleccionar todos" no se guardan los ids: el trabajo recibe los filtros
+y la búsqueda del changelist (su querystring) y el worker reconstruye el
+queryset con el mismo ClientAdmin y el usuario que lo encoló, así que se
+aplica también su ámbito de líneas. La petición web solo serializa unos
+pocos parámetros; con una selección manual los ids están acotados por el
+tamaño de página.
+"""
+
+from django.contrib import admin
+from django.http import HttpRequest, QueryDict
+from django.urls import reverse
+
+from .models import Client
+
+
+def serialize_selection(request, queryset):
+    """{'query': querystring} con "seleccionar todos", {'ids': [...]} si no"""
+    if request.POST.get('select_across') == '1':
+        return {'query': request.GET.urlencode()}
+    # El queryset de la acción ya está restringido a los ids marcados y al ámbito
+    return {'ids': list(queryset.order_by('pk').values_list('pk', flat=True))}
+
+
+def resolve_selection(selection, user):
+    """Queryset de la selección, con los filtros y el ámbito de 'user'"""
+    if 'ids' in selection:
+        return Client.objects.filter(pk__in=selection['ids'])
+    if user is None:
+        raise ValueError('La selección por filtros necesita el usuario que encoló el trabajo')
+
+    request = HttpRequest()
+    request.method = 'GET'
+    request.path = request.path_info = reverse('admin:accounting_client_changelist')
+    request.META['QUERY_STRING'] = selection['query']
+    request.GET = QueryDict(selection['query'])
+    request.user = user
+    model_admin = admin.site._registry[Client]
+    changelist = model_admin.get_changelist_instance(request)
+    return changelist.get_queryset(request)
+
+
+def iter_pk_chunks(queryset, size):
+    """Ids del queryset por bloques en orden de pk, sin cargarlos todos a la vez"""
+    last = 0
+    while True:
+        chunk = list(
+            queryset.filter(pk__gt=last).order_by('pk').values_list('pk', flat=True)[:size]
+        )
+        if not chunk:
+            return
+        yield chunk
+        last = chunk[-1]
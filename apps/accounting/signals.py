@@ -0,0 +1,25 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from apps.common.signals import post_bulk_update
+from .models import Client
+
+
+@receiver(post_save, sender=Client)
+def update_match_keys(sender, instance, created, update_fields=None, **kwargs):
+    """Mantiene las claves de duplicados al crear o renombrar un cliente"""
+    if update_fields is not None and not {'nombre', 'dni'} & set(update_fields):
+        return
+    from .dedup import index_clients
+    index_clients([instance])
+
+
+@receiver(post_bulk_update, sender=Client)
+def update_bulk_match_keys(sender, pks, fields, **kwargs):
+    """Lo mismo para update() y bulk_update() que cambian nombre o dni"""
+    if not {'nombre', 'dni'} & fields:
+        return
+    from .dedup import INDEX_BATCH_SIZE, index_clients
+    for start in range(0, len(pks), INDEX_BATCH_SIZE):
+        chunk = pks[start:start + INDEX_BATCH_SIZE]
+        index_clients(Client.objects.filter(pk__in=chunk).only('pk', 'nombre', 'dni'))
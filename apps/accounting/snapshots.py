@@ -0,0 +1,320 @@
+"""
+Instantáneas columnares (Parquet) de clientes y líneas de negocio para análisis.
+
+Cada ejecución de export_snapshot añade a SNAPSHOT_ROOT/<tabla>/ un fichero
+part-NNNNN-<fecha>.parquet con la versión actual de las filas que tienen
+eventos en el outbox posteriores al cursor anterior. El cursor sigue el
+orden de commit (transaction_id, id) y solo avanza sobre transacciones ya
+terminadas, así una transacción lenta no se salta aunque su updated_at sea
+antiguo. Las filas se leen con un cursor del servidor y se escriben en row
+groups, así la memoria no depende del tamaño de la tabla.
+
+Los ficheros son un registro de cambios: una misma fila puede aparecer en
+varias partes y la versión vigente es la de la parte más reciente. Los
+clientes borrados o archivados se anotan en client_deletions/ a partir del
+mismo outbox. El estado (cursores, columnas y partes escritas) se guarda en
+state.json; si cambian las columnas de una tabla se vuelve a exportar entera
+para que todas sus partes tengan el mismo esquema.
+"""
+
+import json
+import os
+import pyarrow as pa
+import pyarrow.parquet as pq
+from django.conf import settings
+from django.utils import timezone
+
+from apps.business_lines.hierarchy import get_tree
+from apps.business_lines.models import BusinessLine
+from apps.common.models import OutboxEvent
+from apps.common.outbox import aggregate_type_for, committed_events, snapshot_xmin
+from .models import Client
+
+
+ROW_GROUP_SIZE = 50_000
+STATE_FILE = 'state.json'
+COMPRESSION = 'zstd'
+
+# Id de evento del cursor tras una exportación completa: se da por leída
+# toda transacción anterior a xmin
+MAX_EVENT_ID = 2 ** 63 - 1
+
+MONEY = pa.decimal128(10, 2)
+TIMESTAMP = pa.timestamp('us', tz='UTC')
+
+CLIENT_SCHEMA = pa.schema([
+    ('id', pa.int64()),
+    ('nombre', pa.string()),
+    ('dni', pa.string()),
+    ('business_line_id', pa.int64()),
+    ('business_line_path', pa.string()),
+    ('categoria', pa.string()),
+    ('metodo_pago', pa.string()),
+    ('fecha_inicio', pa.date32()),
+    ('fecha_renovacion', pa.date32()),
+    ('periodicidad_meses', pa.int16()),
+    ('precio', MONEY),
+    ('remanente_pepe', MONEY),
+    ('remanente_pepe_video', MONEY),
+    ('remanente_dani', MONEY),
+    ('remanente_aven', MONEY),
+    ('is_active', pa.bool_()),
+    ('created_at', TIMESTAMP),
+    ('updated_at', TIMESTAMP),
+])
+
+BUSINESS_LINE_SCHEMA = pa.schema([
+    ('id', pa.int64()),
+    ('parent_id', pa.int64()),
+    ('name', pa.string()),
+    ('slug', pa.string()),
+    ('level', pa.int16()),
+    ('path', pa.string()),
+    ('has_remanente', pa.bool_()),
+    ('remanente_field', pa.string()),
+    ('is_active', pa.bool_()),
+    ('created_at', TIMESTAMP),
+    ('updated_at', TIMESTAMP),
+])
+
+DELETION_SCHEMA = pa.schema([
+    ('id', pa.int64()),
+    ('event_type', pa.string()),
+    ('deleted_at', TIMESTAMP),
+])
+
+
+def _tree_path(tree, line_id):
+    return tree.path(line_id) if line_id in tree else None
+
+
+# Columna derivada -> (campo de origen, función(árbol, valor))
+TABLES = {
+    'clients': {
+        'model': Client,
+        'schema': CLIENT_SCHEMA,
+        'derived': {'business_line_path': ('business_line_id', _tree_path)},
+    },
+    'business_lines': {
+        'model': BusinessLine,
+        'schema': BUSINESS_LINE_SCHEMA,
+        'derived': {'path': ('id', _tree_path)},
+    },
+}
+
+
+def snapshot_root():
+    return str(settings.SNAPSHOT_ROOT)
+
+
+def load_state(root):
+    path = os.path.join(root, STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_state(root, state):
+    """Escritura atómica: el estado nunca queda a medias"""
+    path = os.path.join(root, STATE_FILE)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class PartWriter:
+    """Escribe un fichero Parquet por row groups; solo se crea si llega alguna fila"""
+
+    def __init__(self, directory, part, schema, row_group_size=ROW_GROUP_SIZE):
+        stamp = timezone.now().strftime('%Y%m%dT%H%M%S')
+        self.path = os.path.join(directory, f'part-{part:05d}-{stamp}.parquet')
+        self.tmp_path = f'{self.path}.tmp'
+        self.schema = schema
+        self.row_group_size = row_group_size
+        self.columns = {name: [] for name in schema.names}
+        self.buffered = 0
+        self.rows = 0
+        self.writer = None
+
+    def append(self, row):
+        for name, value in row.items():
+            self.columns[name].append(value)
+        self.buffered += 1
+        if self.buffered >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if not self.buffered:
+            return
+        if self.writer is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.writer = pq.ParquetWriter(self.tmp_path, self.schema, compression=COMPRESSION)
+        table = pa.Table.from_pydict(self.columns, schema=self.schema)
+        self.writer.write_table(table, row_group_size=self.row_group_size)
+        self.rows += self.buffered
+        self.columns = {name: [] for name in self.schema.names}
+        self.buffered = 0
+
+    def close(self):
+        """Cierra el fichero y lo publica con su nombre definitivo; devuelve el nombre o None"""
+        self.flush()
+        if self.writer is None:
+            return None
+        self.writer.close()
+        os.replace(self.tmp_path, self.path)
+        return os.path.basename(self.path)
+
+    def abort(self):
+        if self.writer is not None:
+            self.writer.close()
+            os.remove(self.tmp_path)
+
+
+def _reset_if_schema_changed(root, name, table_state, schema):
+    """Descarta las partes escritas con otras columnas (o sin columnas registradas)"""
+    if table_state.get('columns') == schema.names:
+        return
+    for filename in table_state.get('files', []):
+        path = os.path.join(root, name, filename)
+        if os.path.exists(path):
+            os.remove(path)
+    table_state.clear()
+    table_state['columns'] = schema.names
+
+
+def _changed_batches(model, table_state, xmin, batch_size):
+    """
+    Querysets por lotes con las filas a exportar y el cursor que queda tras
+    ellas. Sin cursor previo (primera ejecución o --full) se exporta todo.
+    """
+    queryset = model.objects.order_by()
+    cursor = table_state.get('cursor')
+    if cursor is None:
+        return [queryset], [xmin - 1, MAX_EVENT_ID]
+
+    events = committed_events(*cursor, xmin=xmin).filter(aggregate_type=aggregate_type_for(model))
+    changed = set()
+    for transaction_id, event_id, aggregate_id in events.values_list(
+        'transaction_id', 'id', 'aggregate_id'
+    ).iterator(chunk_size=batch_size):
+        changed.add(aggregate_id)
+        cursor = [transaction_id, event_id]
+
+    # Los borrados no tienen fila: solo aparecen en client_deletions
+    changed = sorted(changed)
+    batches = [
+        queryset.filter(pk__in=changed[start:start + batch_size])
+        for start in range(0, len(changed), batch_size)
+    ]
+    return batches, cursor
+
+
+def _export_table(root, name, table_state, xmin, tree, row_group_size):
+    config = TABLES[name]
+    model = config['model']
+    schema = config['schema']
+    derived = config['derived']
+    source_fields = [field for field in schema.names if field not in derived]
+
+    _reset_if_schema_changed(root, name, table_state, schema)
+    batches, cursor = _changed_batches(model, table_state, xmin, row_group_size)
+
+    writer = PartWriter(
+        os.path.join(root, name), table_state.get('parts', 0) + 1, schema, row_group_size
+    )
+    try:
+        for queryset in batches:
+            for values in queryset.values_list(*source_fields).iterator(chunk_size=row_group_size):
+                row = dict(zip(source_fields, values))
+                for column, (source, func) in derived.items():
+                    row[column] = func(tree, row[source])
+                writer.append(row)
+        filename = writer.close()
+    except BaseException:
+        writer.abort()
+        raise
+
+    table_state['cursor'] = cursor
+    table_state.pop('watermark', None)
+    if filename:
+        table_state['parts'] = table_state.get('parts', 0) + 1
+        table_state['rows'] = table_state.get('rows', 0) + writer.rows
+        table_state.setdefault('files', []).append(filename)
+    return writer.rows
+
+
+def _export_deletions(root, table_state, xmin, row_group_size):
+    """Clientes borrados o archivados desde el último evento exportado"""
+    # Los eventos anteriores a transaction_id (todos con 0) siguen el orden por id
+    cursor = table_state.get('cursor', [0, table_state.get('last_event_id', 0)])
+    events = committed_events(*cursor, xmin=xmin).filter(
+        aggregate_type=aggregate_type_for(Client),
+        event_type__in=[OutboxEvent.EVENT_DELETED, OutboxEvent.EVENT_ARCHIVED],
+    )
+
+    writer = PartWriter(
+        os.path.join(root, 'client_deletions'), table_state.get('parts', 0) + 1,
+        DELETION_SCHEMA, row_group_size,
+    )
+    try:
+        for transaction_id, event_id, client_id, event_type, created_at in events.values_list(
+            'transaction_id', 'id', 'aggregate_id', 'event_type', 'created_at'
+        ).iterator(chunk_size=row_group_size):
+            writer.append({'id': client_id, 'event_type': event_type, 'deleted_at': created_at})
+            cursor = [transaction_id, event_id]
+        filename = writer.close()
+    except BaseException:
+        writer.abort()
+        raise
+
+    table_state['cursor'] = cursor
+    table_state.pop('last_event_id', None)
+    if filename:
+        table_state['parts'] = table_state.get('parts', 0) + 1
+        table_state['rows'] = table_state.get('rows', 0) + writer.rows
+        table_state.setdefault('files', []).append(filename)
+    return writer.rows
+
+
+def export_snapshot(root=None, tables=None, full=False, row_group_size=ROW_GROUP_SIZE):
+    """
+    Exporta los cambios de cada tabla desde su cursor del outbox. Con full=True se
+    borran las partes anteriores de las tablas indicadas y se exporta todo.
+    Devuelve {tabla: filas escritas}.
+    """
+    root = root or snapshot_root()
+    os.makedirs(root, exist_ok=True)
+    tables = list(tables or TABLES)
+    if 'clients' in tables:
+        tables.append('client_deletions')
+
+    state = load_state(root)
+    if full:
+        for name in tables:
+            for filename in state.pop(name, {}).get('files', []):
+                path = os.path.join(root, name, filename)
+                if os.path.exists(path):
+                    os.remove(path)
+        save_state(root, state)
+
+    # Antes de leer nada: las transacciones aún abiertas se exportarán en la siguiente ejecución
+    xmin = snapshot_xmin()
+    tree = get_tree()
+
+    written = {}
+    for name in tables:
+        if name not in TABLES:
+            continue
+        table_state = state.setdefault(name, {})
+        written[name] = _export_table(root, name, table_state, xmin, tree, row_group_size)
+        save_state(root, state)
+
+    if 'client_deletions' in tables:
+        deletions_state = state.setdefault('client_deletions', {})
+        written['client_deletions'] = _export_deletions(root, deletions_state, xmin, row_group_size)
+        save_state(root, state)
+    return written
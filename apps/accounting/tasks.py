@@ -0,0 +1,71 @@
+import csv
+import os
+
+from apps.common.jobs import task
+from apps.common.private_files import private_path
+from .selection import iter_pk_chunks, resolve_selection
+
+
+CHUNK_SIZE = 1000
+
+CSV_COLUMNS = [
+    ('nombre', 'Nombre'),
+    ('dni', 'DNI'),
+    ('business_line', 'Línea de negocio'),
+    ('categoria', 'Categoría'),
+    ('metodo_pago', 'Método de pago'),
+    ('fecha_inicio', 'Fecha de inicio'),
+    ('fecha_renovacion', 'Fecha de renovación'),
+    ('precio', 'Precio €'),
+    ('remanente_total', 'Remanente'),
+    ('is_active', 'Activo'),
+]
+
+
+@task('accounting.exportar_clientes_csv')
+def exportar_clientes_csv(job, selection):
+    """Exporta los clientes seleccionados a un CSV en PRIVATE_ROOT/exports (se descarga desde el trabajo)"""
+    queryset = resolve_selection(selection, job.created_by)
+    export_dir = private_path('exports')
+    os.makedirs(export_dir, exist_ok=True)
+    filename = f'clientes-{job.pk}.csv'
+    path = os.path.join(export_dir, filename)
+
+    total = queryset.count()
+    written = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow([label for _, label in CSV_COLUMNS])
+        for chunk in iter_pk_chunks(queryset, CHUNK_SIZE):
+            clients = queryset.model.objects.filter(pk__in=chunk).select_related(
+                'business_line', 'business_line__parent'
+            ).order_by('pk')
+            for client in clients:
+                row = []
+                for field, _ in CSV_COLUMNS:
+                    if field == 'business_line':
+                        row.append(client.business_line.get_full_path())
+                    else:
+                        row.append(getattr(client, field))
+                writer.writerow(row)
+                written += 1
+            job.set_progress(written, total, f'{written} de {total} clientes exportados')
+
+    return {
+        'rows': written,
+        'file': f'exports/{filename}',
+    }
+
+
+@task('accounting.actualizar_estado_clientes')
+def actualizar_estado_clientes(job, selection, is_active):
+    """Activa o desactiva clientes en lotes para no mantener bloqueos largos"""
+    queryset = resolve_selection(selection, job.created_by)
+    total = queryset.count()
+    updated = 0
+    done = 0
+    for chunk in iter_pk_chunks(queryset, CHUNK_SIZE):
+        updated += queryset.model.objects.filter(pk__in=chunk).update(is_active=is_active)
+        done += len(chunk)
+        job.set_progress(done, total, f'{done} de {total} clientes procesados')
+    return {'updated': updated}
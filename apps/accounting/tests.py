@@ -1,3 +1,337 @@
-from django.test import TestCase
+import os
+import random
+import shutil
+import tempfile
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+import pyarrow.parquet as pq
+from django.core.cache import cache
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from apps.business_lines.models import BusinessLine
+from . import dedup, projections, snapshots
+from .archive import archive_inactive_clients, restore_clients
+from .models import ArchivedClient, Client, ClientMatchKey, DuplicateCandidate
+
+
+def valid_dni(digits):
+    return digits + dedup.dni_letter(digits)
+
+
+def typos(digits):
+    """Todas las erratas de un dígito cambiado o dos contiguos intercambiados"""
+    for position, current in enumerate(digits):
+        for digit in '0123456789':
+            if digit != current:
+                yield digits[:position] + digit + digits[position + 1:]
+    for position in range(len(digits) - 1):
+        if digits[position] != digits[position + 1]:
+            yield digits[:position] + digits[position + 1] + digits[position] + digits[position + 2:]
+
+
+class MatchKeysTests(SimpleTestCase):
+
+    def test_name_keys_ignore_order_accents_and_particles(self):
+        self.assertEqual(
+            dedup.match_keys('José Pérez de la Fuente', ''),
+            dedup.match_keys('fuente perez, JOSE', ''),
+        )
+
+    def test_keys_by_kind(self):
+        keys = dedup.match_keys('Ana Vázquez', valid_dni('12345678'))
+        self.assertEqual(keys, {'n:ana|vazq', 'p:an|bsks', 'd:12345678'})
+
+    def test_phonetic_keys_absorb_sound_typos(self):
+        phonetic = lambda nombre: {key for key in dedup.match_keys(nombre, '') if key.startswith('p:')}
+        self.assertEqual(phonetic('Ana Vázquez'), phonetic('Ana Basquez'))
+
+    def test_invalid_letter_adds_corrections(self):
+        digits = '12345678'
+        wrong = next(letter for letter in dedup.DNI_LETTERS if letter != dedup.dni_letter(digits))
+        keys = dedup.match_keys('', digits + wrong)
+        self.assertIn(f'd:{digits}', keys)
+        self.assertEqual(
+            keys - {f'd:{digits}'},
+            {f'd:{candidate}' for candidate in dedup.dni_corrections(digits, wrong)},
+        )
+
+    def test_malformed_dni_has_no_dni_keys(self):
+        self.assertEqual(dedup.match_keys('', '1234X'), set())
+
+
+class DniCorrectionsTests(SimpleTestCase):
+
+    def test_every_typo_breaks_the_letter_and_is_corrected(self):
+        rng = random.Random(23)
+        samples = ['00000000', '99999999', '12345678'] + [
+            f'{rng.randrange(10 ** 8):08d}' for _ in range(200)
+        ]
+        for digits in samples:
+            letter = dedup.dni_letter(digits)
+            for typo in typos(digits):
+                with self.subTest(digits=digits, typo=typo):
+                    # Cualquier errata altera el resto módulo 23
+                    self.assertNotEqual(dedup.dni_letter(typo), letter)
+                    self.assertIn(digits, dedup.dni_corrections(typo, letter))
+
+    def test_corrections_match_the_letter(self):
+        for candidate in dedup.dni_corrections('12345679', 'Z'):
+            self.assertEqual(dedup.dni_letter(candidate), 'Z')
+
+
+class ScorePairTests(SimpleTestCase):
+
+    def score(self, a, b):
+        return dedup.score_pair(
+            {'nombre': a[0], 'dni': a[1]}, {'nombre': b[0], 'dni': b[1]}
+        )
+
+    def test_same_person(self):
+        self.assertEqual(self.score(('José Pérez', '12345678Z'), ('Jose Perez', '12345678Z')), (1.0, ['nombre', 'dni']))
+
+    def test_dni_typo(self):
+        score, reasons = self.score(('José Pérez', '12345678Z'), ('José Pérez', '12345687Z'))
+        self.assertGreaterEqual(score, dedup.DUPLICATE_THRESHOLD)
+        self.assertIn('dni_errata', reasons)
+
+    def test_name_alone_is_enough_without_dni(self):
+        score, _reasons = self.score(('José Pérez', '12345678Z'), ('José Pérez', ''))
+        self.assertGreaterEqual(score, dedup.DUPLICATE_THRESHOLD)
+
+    def test_homonyms_with_different_valid_dnis(self):
+        score, reasons = self.score(('José Pérez', '12345678Z'), ('José Pérez', valid_dni('87654321')))
+        self.assertLess(score, dedup.DUPLICATE_THRESHOLD)
+        self.assertIn('dni_distinto', reasons)
+
+    def test_phonetic_name(self):
+        score, reasons = self.score(('Ana Vázquez', '12345678Z'), ('Ana Basquez', '12345678Z'))
+        self.assertGreaterEqual(score, dedup.DUPLICATE_THRESHOLD)
+        self.assertTrue({'nombre_similar', 'fonetico'} & set(reasons))
+
+    def test_empty_names_do_not_match(self):
+        self.assertEqual(self.score(('', ''), ('', '')), (0.0, []))
+
+
+class ClientTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.line = BusinessLine.objects.create(name='Pruebas')
+        cls.other_line = BusinessLine.objects.create(name='Otra')
+
+    def create_client(self, nombre, digits, **kwargs):
+        values = {
+            'business_line': self.line,
+            'categoria': 'White',
+            'metodo_pago': 'tarjeta',
+            'fecha_inicio': date(2024, 1, 1),
+            'fecha_renovacion': date(2024, 2, 1),
+            'precio': 50,
+            **kwargs,
+        }
+        return Client.objects.create(nombre=nombre, dni=valid_dni(digits), **values)
+
+
+class MergeClientsTests(ClientTestCase):
+
+    def test_merge_keeps_survivor_and_copies_chosen_fields(self):
+        client = self.create_client('José Pérez', '12345678', precio=50)
+        duplicate = self.create_client('Jose Perez', '12345687', precio=70, business_line=self.other_line)
+        candidate = DuplicateCandidate.objects.create(
+            client=client, duplicate=duplicate, score=0.9, reasons=['nombre']
+        )
+
+        survivor = dedup.merge_clients(candidate, 'client', ['precio', 'dni'])
+
+        survivor.refresh_from_db()
+        self.assertEqual(survivor.pk, client.pk)
+        self.assertEqual(survivor.precio, 70)
+        self.assertEqual(survivor.dni, duplicate.dni)
+        self.assertEqual(survivor.business_line, self.line)
+        self.assertFalse(Client.objects.filter(pk=duplicate.pk).exists())
+        self.assertFalse(DuplicateCandidate.objects.exists())
+        self.assertIn(f'd:{duplicate.dni[:8]}', set(survivor.match_keys.values_list('key', flat=True)))
+
+    def test_merge_rejects_unknown_fields(self):
+        client = self.create_client('José Pérez', '12345678')
+        duplicate = self.create_client('Jose Perez', '12345687')
+        candidate = DuplicateCandidate.objects.create(client=client, duplicate=duplicate, score=0.9)
+        with self.assertRaises(dedup.ValidationError):
+            dedup.merge_clients(candidate, 'client', ['business_line'])
+        self.assertEqual(Client.objects.count(), 2)
+
+
+class MatchKeyIndexTests(ClientTestCase):
+
+    def keys(self, client):
+        return set(ClientMatchKey.objects.filter(client=client).values_list('key', flat=True))
+
+    def test_queryset_update_rebuilds_keys(self):
+        client = self.create_client('José Pérez', '12345678')
+        other = self.create_client('Ana Gómez', '11111111')
+
+        Client.objects.filter(nombre='José Pérez').update(nombre='Ana Vázquez', dni=valid_dni('22222222'))
+
+        self.assertEqual(self.keys(client), dedup.match_keys('Ana Vázquez', valid_dni('22222222')))
+        self.assertEqual(self.keys(other), dedup.match_keys('Ana Gómez', valid_dni('11111111')))
+
+    def test_bulk_update_rebuilds_keys(self):
+        clients = [self.create_client('José Pérez', f'{number:08d}') for number in range(2)]
+        for client in clients:
+            client.nombre = 'Luis Martín'
+        Client.objects.bulk_update(clients, ['nombre'])
+
+        for client in clients:
+            self.assertEqual(self.keys(client), dedup.match_keys('Luis Martín', client.dni))
+
+    def test_other_fields_keep_keys(self):
+        client = self.create_client('José Pérez', '12345678')
+        with mock.patch.object(dedup, 'index_clients') as index_clients:
+            Client.objects.filter(pk=client.pk).update(precio=60)
+        index_clients.assert_not_called()
+
+
+class BlockingTests(ClientTestCase):
+
+    def test_find_duplicates_uses_the_index(self):
+        client = self.create_client('José Pérez', '12345678')
+        self.create_client('Ana Gómez', '11111111')
+        matches = dedup.find_duplicates('Jose Perez', '12345687Z')
+        self.assertEqual([match['id'] for match in matches], [client.pk])
+
+    def test_saturated_blocks_are_ignored(self):
+        for number in range(4):
+            self.create_client('José Pérez', f'{number:08d}')
+        keys = dedup.match_keys('José Pérez', '')
+
+        with mock.patch.object(dedup, 'MAX_BLOCK_SIZE', 3):
+            self.assertEqual(dedup.block_members(keys), {})
+            self.assertEqual(list(dedup._block_pairs()), [])
+        with mock.patch.object(dedup, 'MAX_BLOCK_SIZE', 4):
+            self.assertEqual(len(dedup.block_members(keys)), 4)
+            self.assertEqual(len(set(dedup._block_pairs())), 6)
+
+    def test_archive_and_restore_clients_with_match_keys(self):
+        client = self.create_client('José Pérez', '12345678', is_active=False)
+        duplicate = self.create_client('Jose Perez', '12345687')
+        DuplicateCandidate.objects.create(client=client, duplicate=duplicate, score=0.9)
+        Client.objects.filter(pk=client.pk).update(updated_at=F('updated_at') - timedelta(days=400))
+
+        self.assertEqual(archive_inactive_clients(days=30), 1)
+        self.assertFalse(ClientMatchKey.objects.filter(client_id=client.pk).exists())
+        self.assertFalse(DuplicateCandidate.objects.exists())
+
+        restored, skipped, failed = restore_clients(ArchivedClient.objects.all())
+        self.assertEqual((restored, skipped, failed), (1, 0, []))
+        self.assertTrue(ClientMatchKey.objects.filter(client_id=client.pk).exists())
+
+
+class ProjectRevenueTests(SimpleTestCase):
+
+    def columns(self, rows):
+        columns = projections.ClientColumns(capacity=1)
+        columns.append(rows)
+        return columns.trim()
+
+    def test_monthly_churn_compounds_over_each_period(self):
+        columns = self.columns([
+            # Mensual que renueva este mes
+            (1, date(2024, 1, 1), date(2025, 1, 10), 1, 100),
+            # Trimestral vencida en diciembre: pasa a marzo
+            (1, date(2024, 1, 1), date(2024, 12, 1), 3, 300),
+            # Anual de una línea sin bajas
+            (2, date(2024, 1, 1), date(2025, 4, 1), 12, 1200),
+        ])
+
+        line_ids, labels, matrix = projections.project_revenue(
+            columns, {1: 0.1}, months=6, start=date(2025, 1, 15)
+        )
+
+        self.assertEqual(line_ids.tolist(), [1, 2])
+        self.assertEqual(labels, ['2025-01', '2025-02', '2025-03', '2025-04', '2025-05', '2025-06'])
+        self.assertEqual(
+            [round(value, 4) for value in matrix[0]],
+            [90.0, 81.0, 291.6, 65.61, 59.049, 212.5764],
+        )
+        self.assertEqual(matrix[1].tolist(), [0, 0, 0, 1200, 0, 0])
+
+    def test_no_clients(self):
+        line_ids, labels, matrix = projections.project_revenue(
+            self.columns([]), {}, months=3, start=date(2025, 1, 1)
+        )
+        self.assertEqual((line_ids.size, len(labels), matrix.shape), (0, 3, (0, 3)))
+
+
+class ProjectionDataTests(ClientTestCase):
+
+    def setUp(self):
+        # Los datos de cohortes se cachean entre consultas
+        cache.clear()
+
+    def test_extract_active_clients_grows_the_buffer(self):
+        for number in range(5):
+            self.create_client(f'Cliente {number}', f'{number:08d}', periodicidad_meses=3)
+        self.create_client('Inactivo', '99999999', is_active=False)
+
+        small_buffer = lambda columns=projections.ClientColumns: columns(capacity=2)
+        with mock.patch.object(projections, 'ClientColumns', small_buffer):
+            columns = projections.extract_active_clients()
+
+        self.assertEqual(columns.size, 5)
+        self.assertEqual(len(columns.precio), 5)
+        self.assertEqual(columns.periodicidad.tolist(), [3] * 5)
+        self.assertEqual(set(columns.business_line_id.tolist()), {self.line.pk})
+
+    def test_churn_rate_per_exposure_month_includes_archived(self):
+        today = timezone.localdate()
+        year_ago = date(today.year - 1, today.month, 1)
+        self.create_client('Activo', '00000001', fecha_inicio=year_ago, fecha_renovacion=today)
+        self.create_client('Baja', '00000002', fecha_inicio=year_ago, fecha_renovacion=today, is_active=False)
+        now = timezone.now()
+        ArchivedClient.objects.create(
+            original_id=10 ** 9, nombre='Archivado', dni=valid_dni('00000003'),
+            business_line=self.line, categoria='White', metodo_pago='tarjeta',
+            fecha_inicio=year_ago, fecha_renovacion=today, precio=50,
+            created_at=now, updated_at=now,
+        )
+
+        # Tres clientes con 12 meses de exposición cada uno y dos bajas
+        rates = projections.churn_rates_by_line(today)
+        self.assertAlmostEqual(rates[self.line.pk], 2 / 36)
+
+
+class SnapshotTests(ClientTestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def read_clients(self):
+        return pq.ParquetDataset(os.path.join(self.root, 'clients')).read()
+
+    def test_export_includes_periodicidad(self):
+        self.create_client('José Pérez', '12345678', periodicidad_meses=3)
+
+        snapshots.export_snapshot(self.root, tables=['clients'])
+
+        table = self.read_clients()
+        self.assertEqual(table.schema, snapshots.CLIENT_SCHEMA)
+        self.assertEqual(table.column('periodicidad_meses').to_pylist(), [3])
+
+    def test_schema_change_reexports_the_table(self):
+        self.create_client('José Pérez', '12345678', periodicidad_meses=6)
+        snapshots.export_snapshot(self.root, tables=['clients'])
+        # Estado de una versión anterior, sin columnas registradas
+        state = snapshots.load_state(self.root)
+        del state['clients']['columns']
+        snapshots.save_state(self.root, state)
+
+        written = snapshots.export_snapshot(self.root, tables=['clients'])
+
+        self.assertEqual(written['clients'], 1)
+        self.assertEqual(len(os.listdir(os.path.join(self.root, 'clients'))), 1)
+        state = snapshots.load_state(self.root)
+        self.assertEqual(state['clients']['columns'], snapshots.CLIENT_SCHEMA.names)
@@ -1,9 +1,13 @@
 from django.contrib import admin
-from .models import BusinessLine
+from apps.common.autocomplete import PrefixAutocompleteMixin, is_autocomplete_request
+from apps.common.tracing import traced
+from .hierarchy import get_request_tree
+from .models import BusinessLine, BusinessLineAccess
+from .scoping import scope_queryset
 
 
 @admin.register(BusinessLine)
-class BusinessLineAdmin(admin.ModelAdmin):
+class BusinessLineAdmin(PrefixAutocompleteMixin, admin.ModelAdmin):
     """
     Admin para BusinessLine con vista jerárquica optimizada
     """
@@ -26,6 +30,10 @@ class BusinessLineAdmin(admin.ModelAdmin):
     
     search_fields = ['name', 'slug']
     
+    # Autocompletado (formulario de Client): prefijo sobre nombre y slug
+    autocomplete_prefix_fields = ['name', 'slug']
+    autocomplete_only_fields = ['id', 'name']
+    
     readonly_fields = ['slug', 'level', 'created_at', 'updated_at']
     
     fieldsets = (
@@ -47,6 +55,7 @@ class BusinessLineAdmin(admin.ModelAdmin):
     
     ordering = ['level', 'name']
     
+    @traced()
     def get_hierarchy_display(self, obj):
         """Muestra la jerarquía completa con indentación visual"""
         indent = "    " * (obj.level - 1)
@@ -65,11 +74,44 @@ class BusinessLineAdmin(admin.ModelAdmin):
     get_hierarchy_display.admin_order_field = 'name'
     
     def get_queryset(self, request):
-        """Optimizar consultas con select_related"""
-        return super().get_queryset(request).select_related('parent')
+        """Optimizar consultas con select_related; solo las líneas del ámbito del usuario"""
+        queryset = scope_queryset(
+            request, super().get_queryset(request).select_related('parent'), field='id'
+        )
+        if is_autocomplete_request(request):
+            # En los formularios solo se pueden elegir líneas activas
+            queryset = queryset.filter(is_active=True)
+        return queryset
+    
+    def get_autocomplete_text(self, request, obj):
+        """Ruta completa desde el árbol cacheado, sin consultar los padres"""
+        tree = get_request_tree(request)
+        if obj.pk in tree:
+            return tree.path(obj.pk)
+        return obj.name
     
     class Media:
         css = {
             'all': ('admin/css/business_lines.css',)
         }
         js = ('admin/js/business_lines.js',)
+
+
+@admin.register(BusinessLineAccess)
+class BusinessLineAccessAdmin(admin.ModelAdmin):
+    """
+    Asignación de líneas raíz a usuarios y grupos (ámbito de clientes visibles)
+    """
+    
+    list_display = ['business_line', 'user', 'group', 'created_at']
+    
+    list_filter = ['group']
+    
+    search_fields = ['user__username', 'group__name', 'business_line__name']
+    
+    autocomplete_fields = ['business_line', 'user', 'group']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'business_line__parent', 'user', 'group'
+        )
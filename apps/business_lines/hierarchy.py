@@ -0,0 +1,130 @@
+"""
+Árbol de líneas de negocio en memoria, cacheado.
+
+La jerarquía tiene unas pocas decenas de nodos: se carga entera con una sola
+consulta y se recorre en memoria para obtener rutas, subárboles y ancestros
+sin consultas recursivas. La clave de caché incluye el número de líneas y su
+último updated_at, así cualquier cambio guardado invalida el árbol en todos
+los procesos sin coordinación adicional.
+"""
+
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from .models import BusinessLine
+
+
+CACHE_PREFIX = 'business_lines:tree'
+CACHE_TIMEOUT = 60 * 60
+
+TREE_FIELDS = [
+    'id', 'parent_id', 'name', 'slug', 'level',
+    'has_remanente', 'remanente_field', 'is_active',
+]
+
+
+class BusinessLineTree:
+    """Nodos indexados por id con sus hijos ordenados por nombre"""
+
+    def __init__(self, rows):
+        self.nodes = {row['id']: row for row in rows}
+        self.children = {node_id: [] for node_id in self.nodes}
+        self.roots = []
+        for row in sorted(rows, key=lambda row: row['name']):
+            parent_id = row['parent_id']
+            if parent_id in self.children:
+                self.children[parent_id].append(row['id'])
+            else:
+                self.roots.append(row['id'])
+
+    def __contains__(self, node_id):
+        return node_id in self.nodes
+
+    def ancestor_ids(self, node_id):
+        """Ids desde el padre hasta la raíz (se detiene ante un ciclo)"""
+        ancestors = []
+        seen = {node_id}
+        parent_id = self.nodes[node_id]['parent_id']
+        while parent_id in self.nodes and parent_id not in seen:
+            ancestors.append(parent_id)
+            seen.add(parent_id)
+            parent_id = self.nodes[parent_id]['parent_id']
+        return ancestors
+
+    def path(self, node_id, separator=" > "):
+        """Ruta completa: Jaen > PEPE > PEPE-normal"""
+        names = [self.nodes[ancestor]['name'] for ancestor in reversed(self.ancestor_ids(node_id))]
+        names.append(self.nodes[node_id]['name'])
+        return separator.join(names)
+
+    def descendant_ids(self, node_id, include_self=True):
+        """Ids del subárbol en preorden"""
+        result = [node_id] if include_self else []
+        stack = list(reversed(self.children.get(node_id, [])))
+        seen = set(result)
+        while stack:
+            current = stack.pop()
+            if current in seen:
+                continue
+            seen.add(current)
+            result.append(current)
+            stack.extend(reversed(self.children.get(current, [])))
+        return result
+
+    def walk(self, only_active=False):
+        """Recorre el árbol en preorden: (id, profundidad empezando en 1)"""
+        stack = [(root, 1) for root in reversed(self.roots)]
+        seen = set()
+        while stack:
+            node_id, depth = stack.pop()
+            if node_id in seen:
+                continue
+            seen.add(node_id)
+            if only_active and not self.nodes[node_id]['is_active']:
+                continue
+            yield node_id, depth
+            stack.extend((child, depth + 1) for child in reversed(self.children[node_id]))
+
+    def fold_counts(self, counts):
+        """Suma los recuentos de cada nodo a todos sus ancestros"""
+        totals = dict.fromkeys(self.nodes, 0)
+        for node_id, count in counts.items():
+            if node_id not in totals:
+                continue
+            totals[node_id] += count
+            for ancestor in self.ancestor_ids(node_id):
+                totals[ancestor] += count
+        return totals
+
+
+def _tree_stamp():
+    stamp = BusinessLine.objects.order_by().aggregate(
+        total=Count('id'),
+        last=Max('updated_at'),
+    )
+    last = stamp['last'].timestamp() if stamp['last'] else 0
+    return f"{stamp['total']}:{last}"
+
+
+def load_tree():
+    """Carga el árbol completo con una sola consulta, sin caché"""
+    return BusinessLineTree(list(BusinessLine.objects.order_by().values(*TREE_FIELDS)))
+
+
+def get_tree():
+    """Árbol cacheado; la validación cuesta una consulta agregada sobre una tabla diminuta"""
+    key = f'{CACHE_PREFIX}:{_tree_stamp()}'
+    tree = cache.get(key)
+    if tree is None:
+        tree = load_tree()
+        cache.set(key, tree, CACHE_TIMEOUT)
+    return tree
+
+
+def get_request_tree(request):
+    """Árbol memorizado en la petición: una sola validación de caché por request"""
+    tree = getattr(request, '_business_line_tree', None)
+    if tree is None:
+        tree = get_tree()
+        request._business_line_tree = tree
+    return tree
@@ -0,0 +1,129 @@
+"""
+Comprobación y reparación de la integridad de la jerarquía de líneas.
+
+Se carga el árbol completo con una consulta y se verifica en memoria:
+ausencia de ciclos, profundidad máxima, nivel y slug esperados de cada nodo
+y unicidad de los slugs. Los nodos desalineados se corrigen con un único
+bulk_update.
+"""
+
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .hierarchy import load_tree
+from .models import BusinessLine
+
+
+MAX_DEPTH = 4
+
+
+def expected_slug(parent_slug, name):
+    """Slug de un nodo: slug del padre + nombre, como en BusinessLine.save()"""
+    base_slug = slugify(name)
+    if parent_slug:
+        return f"{parent_slug}-{base_slug}"
+    return base_slug
+
+
+class HierarchyReport:
+    """Resultado de check_hierarchy()"""
+
+    def __init__(self):
+        self.cycles = []
+        self.too_deep = []
+        self.level_drift = {}
+        self.slug_drift = {}
+        self.duplicate_slugs = {}
+        self.expected = {}
+
+    @property
+    def drifted_ids(self):
+        return sorted(set(self.level_drift) | set(self.slug_drift))
+
+    @property
+    def is_valid(self):
+        return not (
+            self.cycles or self.too_deep or self.level_drift
+            or self.slug_drift or self.duplicate_slugs
+        )
+
+
+def _find_cycles(tree):
+    """Ciclos en los punteros al padre (cada nodo se visita una sola vez)"""
+    state = {}
+    cycles = []
+    for start in tree.nodes:
+        path = []
+        node_id = start
+        while node_id in tree.nodes and node_id not in state:
+            state[node_id] = start
+            path.append(node_id)
+            node_id = tree.nodes[node_id]['parent_id']
+        if node_id in tree.nodes and state.get(node_id) == start:
+            cycles.append(path[path.index(node_id):])
+    return cycles
+
+
+def check_hierarchy(tree=None, subtree_root=None):
+    """
+    Verifica la jerarquía completa (o solo el subárbol de subtree_root).
+    Niveles y slugs esperados se calculan desde las raíces en preorden.
+    """
+    tree = tree or load_tree()
+    report = HierarchyReport()
+    report.cycles = _find_cycles(tree)
+
+    # Nodos alcanzables desde una raíz con su nivel y slug esperados
+    stack = [(root, 1, '') for root in tree.roots]
+    while stack:
+        node_id, level, parent_slug = stack.pop()
+        node = tree.nodes[node_id]
+        slug = expected_slug(parent_slug, node['name'])
+        report.expected[node_id] = (level, slug)
+        stack.extend((child, level + 1, slug) for child in tree.children[node_id])
+
+    if subtree_root is not None:
+        scope = set(tree.descendant_ids(subtree_root))
+    else:
+        scope = set(tree.nodes)
+
+    for node_id in sorted(scope & set(report.expected)):
+        level, slug = report.expected[node_id]
+        node = tree.nodes[node_id]
+        if level > MAX_DEPTH:
+            report.too_deep.append(node_id)
+        if node['level'] != level:
+            report.level_drift[node_id] = (node['level'], level)
+        if node['slug'] != slug:
+            report.slug_drift[node_id] = (node['slug'], slug)
+
+    # Unicidad de los slugs tal y como quedarían tras la reparación
+    owners = {}
+    for node_id, node in tree.nodes.items():
+        final_slug = report.expected.get(node_id, (None, node['slug']))[1]
+        owners.setdefault(final_slug, []).append(node_id)
+    report.duplicate_slugs = {slug: ids for slug, ids in owners.items() if len(ids) > 1}
+
+    return report
+
+
+def repair_hierarchy(report):
+    """
+    Corrige nivel y slug de los nodos desalineados con un único bulk_update.
+    No repara si hay ciclos o slugs duplicados: requieren intervención manual.
+    Actualiza updated_at para invalidar el árbol cacheado.
+    """
+    if report.cycles or report.duplicate_slugs:
+        return 0
+
+    drifted = report.drifted_ids
+    if not drifted:
+        return 0
+
+    now = timezone.now()
+    lines = list(BusinessLine.objects.filter(pk__in=drifted))
+    for line in lines:
+        line.level, line.slug = report.expected[line.pk]
+        line.updated_at = now
+    BusinessLine.objects.bulk_update(lines, ['level', 'slug', 'updated_at'])
+    return len(lines)
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.business_lines.hierarchy import load_tree
+from apps.business_lines.integrity import MAX_DEPTH, check_hierarchy, repair_hierarchy
+
+
+class Command(BaseCommand):
+    help = 'Verifica la jerarquía de líneas de negocio y repara niveles y slugs desalineados'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Reparar niveles y slugs con un bulk_update')
+
+    def handle(self, *args, **options):
+        tree = load_tree()
+        report = check_hierarchy(tree)
+
+        def label(node_id):
+            return f"#{node_id} {tree.nodes[node_id]['name']}"
+
+        for cycle in report.cycles:
+            self.stdout.write(self.style.ERROR(
+                'Ciclo: ' + ' → '.join(label(node_id) for node_id in cycle)
+            ))
+        for node_id in report.too_deep:
+            self.stdout.write(self.style.ERROR(f'{label(node_id)} supera {MAX_DEPTH} niveles'))
+        for slug, ids in report.duplicate_slugs.items():
+            self.stdout.write(self.style.ERROR(
+                f"Slug duplicado '{slug}': " + ', '.join(label(node_id) for node_id in ids)
+            ))
+        for node_id, (actual, expected) in report.level_drift.items():
+            self.stdout.write(self.style.WARNING(f'{label(node_id)}: nivel {actual}, esperado {expected}'))
+        for node_id, (actual, expected) in report.slug_drift.items():
+            self.stdout.write(self.style.WARNING(f"{label(node_id)}: slug '{actual}', esperado '{expected}'"))
+
+        if report.is_valid:
+            self.stdout.write(self.style.SUCCESS(f'{len(tree.nodes)} líneas verificadas sin incidencias'))
+            return
+
+        if options['fix']:
+            if report.cycles or report.duplicate_slugs:
+                raise CommandError('Hay ciclos o slugs duplicados: corrígelos manualmente antes de reparar')
+            repaired = repair_hierarchy(report)
+            self.stdout.write(self.style.SUCCESS(f'{repaired} líneas reparadas'))
+        elif report.drifted_ids:
+            self.stdout.write('Ejecuta con --fix para reparar niveles y slugs')
+
+        if report.cycles or report.too_deep or report.duplicate_slugs:
+            raise CommandError('La jerarquía tiene errores que requieren intervención manual')
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.22 on 2026-10-19 05:39
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('business_lines', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BusinessLineAccess',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('business_line', models.ForeignKey(help_text='Se incluyen todas sus sublíneas', on_delete=django.db.models.deletion.CASCADE, related_name='accesses', to='business_lines.businessline', verbose_name='Línea de negocio')),
+                ('group', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='business_line_accesses', to='auth.group', verbose_name='Grupo')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='business_line_accesses', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Acceso a línea de negocio',
+                'verbose_name_plural': 'Accesos a líneas de negocio',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='businesslineaccess',
+            constraint=models.CheckConstraint(check=models.Q(models.Q(('group__isnull', True), ('user__isnull', False)), models.Q(('group__isnull', False), ('user__isnull', True)), _connector='OR'), name='business_line_access_user_xor_group'),
+        ),
+        migrations.AddConstraint(
+            model_name='businesslineaccess',
+            constraint=models.UniqueConstraint(condition=models.Q(('user__isnull', False)), fields=('user', 'business_line'), name='business_line_access_unique_user'),
+        ),
+        migrations.AddConstraint(
+            model_name='businesslineaccess',
+            constraint=models.UniqueConstraint(condition=models.Q(('group__isnull', False)), fields=('group', 'business_line'), name='business_line_access_unique_group'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.22 on 2026-10-19 06:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('business_lines', '0002_businesslineaccess'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='businessline',
+            name='reference_id',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, unique=True, verbose_name='Id de referencia'),
+        ),
+    ]
@@ -1,9 +1,11 @@
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
 from django.utils.text import slugify
 from django.core.exceptions import ValidationError
+from apps.common.models import OutboxModelMixin, OutboxQuerySet
 
 
-class BusinessLine(models.Model):
+class BusinessLine(OutboxModelMixin, models.Model):
     """
     Modelo para gestionar las líneas de negocio jerárquicas.
     Estructura: Jaen -> PEPE -> PEPE-normal, etc.
@@ -58,10 +60,21 @@ class BusinessLine(models.Model):
         verbose_name="Activa"
     )
     
+    # Id de la línea en los datos de referencia (seeds): no cambia al renombrarla
+    reference_id = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        unique=True,
+        editable=False,
+        verbose_name="Id de referencia"
+    )
+    
     # Metadatos
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = OutboxQuerySet.as_manager()
+    
     class Meta:
         verbose_name = "Línea de Negocio"
         verbose_name_plural = "Líneas de Negocio"
@@ -73,9 +86,22 @@ class BusinessLine(models.Model):
             return f"{self.parent.name} → {self.name}"
         return self.name
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Valores cargados para detectar re-parentado o renombrado en save()
+        instance._loaded_parent_id = instance.__dict__.get('parent_id')
+        instance._loaded_name = instance.__dict__.get('name')
+        return instance
+    
     def save(self, *args, **kwargs):
-        # Auto-generar slug si no existe
-        if not self.slug:
+        moved = not self._state.adding and (
+            self.parent_id != getattr(self, '_loaded_parent_id', self.parent_id)
+            or self.name != getattr(self, '_loaded_name', self.name)
+        )
+        
+        # Auto-generar slug si no existe o si cambia su posición/nombre
+        if not self.slug or moved:
             base_slug = slugify(self.name)
             if self.parent:
                 base_slug = f"{self.parent.slug}-{base_slug}"
@@ -87,20 +113,52 @@ class BusinessLine(models.Model):
         else:
             self.level = 1
             
-        super().save(*args, **kwargs)
+        # El nodo y la reparación de su subárbol se guardan juntos o no se guardan
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            
+            # Los descendientes heredan nivel y slug: se recalculan en bloque
+            if moved:
+                from .integrity import check_hierarchy, repair_hierarchy
+                report = check_hierarchy(subtree_root=self.pk)
+                if report.drifted_ids and (report.cycles or report.duplicate_slugs):
+                    raise ValidationError(
+                        "No se pueden recalcular los slugs del subárbol; quedarían duplicados: "
+                        + ", ".join(sorted(report.duplicate_slugs))
+                    )
+                repair_hierarchy(report)
+        self._loaded_parent_id = self.parent_id
+        self._loaded_name = self.name
     
     def clean(self):
+        from .hierarchy import load_tree
+        from .integrity import MAX_DEPTH
+        
+        if not self.parent_id:
+            return
+        
+        # Una sola consulta: el árbol completo se recorre en memoria
+        tree = load_tree()
+        if self.parent_id not in tree:
+            return
+        
         # Validar que no se cree una jerarquía circular
-        if self.parent:
-            parent = self.parent
-            while parent:
-                if parent == self:
-                    raise ValidationError("No se puede crear una referencia circular")
-                parent = parent.parent
+        if self.pk is not None and (
+            self.parent_id == self.pk or self.pk in tree.ancestor_ids(self.parent_id)
+        ):
+            raise ValidationError("No se puede crear una referencia circular")
         
-        # Validar nivel máximo (evitar jerarquías muy profundas)
-        if self.level > 4:
-            raise ValidationError("No se permiten más de 4 niveles de jerarquía")
+        # Validar nivel máximo (evitar jerarquías muy profundas), incluido el subárbol movido
+        level = len(tree.ancestor_ids(self.parent_id)) + 2
+        if self.pk is not None and self.pk in tree:
+            subtree_depth = max(
+                len(tree.ancestor_ids(node_id)) - len(tree.ancestor_ids(self.pk))
+                for node_id in tree.descendant_ids(self.pk)
+            )
+        else:
+            subtree_depth = 0
+        if level + subtree_depth > MAX_DEPTH:
+            raise ValidationError(f"No se permiten más de {MAX_DEPTH} niveles de jerarquía")
     
     def get_full_path(self):
         """Retorna la ruta completa: Jaen > PEPE > PEPE-normal"""
@@ -122,3 +180,68 @@ class BusinessLine(models.Model):
     def is_leaf(self):
         """Retorna True si es una línea terminal (sin hijos)"""
         return not self.children.exists()
+
+
+class BusinessLineAccess(models.Model):
+    """
+    Asigna a un usuario o a un grupo una línea de negocio raíz: ve los
+    clientes de todo su subárbol (ver apps.business_lines.scoping).
+    """
+    
+    business_line = models.ForeignKey(
+        BusinessLine,
+        on_delete=models.CASCADE,
+        related_name='accesses',
+        verbose_name="Línea de negocio",
+        help_text="Se incluyen todas sus sublíneas"
+    )
+    
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='business_line_accesses',
+        verbose_name="Usuario"
+    )
+    
+    group = models.ForeignKey(
+        'auth.Group',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='business_line_accesses',
+        verbose_name="Grupo"
+    )
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = "Acceso a línea de negocio"
+        verbose_name_plural = "Accesos a líneas de negocio"
+        constraints = [
+            models.CheckConstraint(
+                check=(
+                    models.Q(user__isnull=False, group__isnull=True)
+                    | models.Q(user__isnull=True, group__isnull=False)
+                ),
+                name='business_line_access_user_xor_group',
+            ),
+            models.UniqueConstraint(
+                fields=['user', 'business_line'],
+                condition=models.Q(user__isnull=False),
+                name='business_line_access_unique_user',
+            ),
+            models.UniqueConstraint(
+                fields=['group', 'business_line'],
+                condition=models.Q(group__isnull=False),
+                name='business_line_access_unique_group',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.user or self.group} → {self.business_line}"
+    
+    def clean(self):
+        if bool(self.user_id) == bool(self.group_id):
+            raise ValidationError("Indica un usuario o un grupo, pero no ambos")
@@ -0,0 +1,74 @@
+"""
+Ámbito de líneas de negocio por usuario.
+
+Cada nutricionista (o su grupo) tiene asignadas una o varias líneas raíz en
+BusinessLineAccess y solo ve los clientes de esos subárboles. Las líneas
+permitidas se resuelven una vez por petición: una consulta indexada para
+las raíces del usuario y el resto en memoria sobre el árbol cacheado, sin
+consultas recursivas. Los querysets se restringen con un único
+business_line_id IN (...) sobre la columna indexada.
+
+Los superusuarios no tienen restricción (None). Un usuario sin ningún
+acceso asignado no ve ninguna línea (conjunto vacío), salvo que el ajuste
+BUSINESS_LINES_UNASSIGNED_SEE_ALL se active para mantener el acceso
+completo mientras se reparten las líneas.
+"""
+
+from django.conf import settings
+from django.db.models import Q
+
+from .hierarchy import get_request_tree
+from .models import BusinessLineAccess
+
+
+def root_line_ids(user):
+    """Líneas raíz asignadas al usuario, directamente o por sus grupos"""
+    return set(
+        BusinessLineAccess.objects.filter(Q(user=user) | Q(group__user=user))
+        .order_by().values_list('business_line_id', flat=True).distinct()
+    )
+
+
+def allowed_line_ids(request):
+    """
+    frozenset de ids de línea visibles para el usuario, o None si no tiene
+    restricción. Memorizado en la petición.
+    """
+    if hasattr(request, '_allowed_line_ids'):
+        return request._allowed_line_ids
+
+    user = request.user
+    if user.is_superuser:
+        allowed = None
+    elif not user.is_authenticated:
+        allowed = frozenset()
+    else:
+        roots = root_line_ids(user)
+        if roots:
+            tree = get_request_tree(request)
+            allowed = frozenset(
+                line_id
+                for root in roots if root in tree
+                for line_id in tree.descendant_ids(root)
+            )
+        else:
+            allowed = None if settings.BUSINESS_LINES_UNASSIGNED_SEE_ALL else frozenset()
+    request._allowed_line_ids = allowed
+    return allowed
+
+
+def is_scoped(request):
+    return allowed_line_ids(request) is not None
+
+
+def is_line_allowed(request, line_id):
+    allowed = allowed_line_ids(request)
+    return allowed is None or line_id in allowed
+
+
+def scope_queryset(request, queryset, field='business_line_id'):
+    """Restringe el queryset a las líneas permitidas (sin cambios si no hay ámbito)"""
+    allowed = allowed_line_ids(request)
+    if allowed is None:
+        return queryset
+    return queryset.filter(**{f'{field}__in': sorted(allowed)})
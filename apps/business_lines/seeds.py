@@ -0,0 +1,134 @@
+"""
+Datos de referencia de las líneas de negocio.
+
+Se reutiliza el fixture initial_business_lines.json como fuente, pero en
+lugar de loaddata (fila a fila por save() y conflictos al repetir) se hace
+un upsert por BusinessLine.reference_id, el pk de la entrada en el fixture,
+que no cambia aunque la línea se renombre o se mueva en el admin. Las
+líneas anteriores a reference_id se adoptan la primera vez por slug, o
+nombre + padre. Una vez adoptada, nombre, slug y padre son del admin: el
+seed solo crea las líneas que faltan y mantiene la configuración de
+remanentes. Niveles y slugs se calculan en memoria y cada nivel de la
+jerarquía se escribe con un bulk_create y un bulk_update.
+"""
+
+import json
+import os
+
+from django.utils import timezone
+
+from apps.common.seeding import seeder
+from .integrity import check_hierarchy, expected_slug, repair_hierarchy
+from .models import BusinessLine
+
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), 'fixtures', 'initial_business_lines.json')
+
+# Campos escritos por el seed; is_active solo se fija al crear
+SEED_FIELDS = ['name', 'slug', 'parent_id', 'level', 'has_remanente', 'remanente_field', 'reference_id']
+
+# Campos que el seed sigue gobernando en las líneas ya adoptadas
+REFERENCE_FIELDS = ['has_remanente', 'remanente_field']
+
+
+def load_reference_lines(path=FIXTURE_PATH):
+    """Entradas del fixture con slug y nivel resueltos en memoria"""
+    with open(path, encoding='utf-8') as f:
+        records = {record['pk']: record['fields'] for record in json.load(f)}
+
+    resolved = {}
+
+    def resolve(pk, seen=()):
+        if pk in resolved:
+            return resolved[pk]
+        if pk in seen:
+            raise ValueError(f'Ciclo en los datos de referencia (pk {pk})')
+        fields = records[pk]
+        parent = resolve(fields['parent'], seen + (pk,)) if fields['parent'] else None
+        resolved[pk] = {
+            'reference_id': pk,
+            'parent_reference_id': fields['parent'],
+            'name': fields['name'],
+            'slug': expected_slug(parent['slug'] if parent else '', fields['name']),
+            'parent_slug': parent['slug'] if parent else None,
+            'level': parent['level'] + 1 if parent else 1,
+            'has_remanente': fields.get('has_remanente', False),
+            'remanente_field': fields.get('remanente_field', ''),
+            'is_active': fields.get('is_active', True),
+        }
+        return resolved[pk]
+
+    for pk in records:
+        resolve(pk)
+    return sorted(resolved.values(), key=lambda entry: (entry['level'], entry['slug']))
+
+
+@seeder('business_lines', order=10)
+def seed_business_lines(entries=None):
+    entries = entries if entries is not None else load_reference_lines()
+
+    rows = list(BusinessLine.objects.order_by().values('id', 'is_active', *SEED_FIELDS))
+    by_reference = {row['reference_id']: row for row in rows if row['reference_id'] is not None}
+    unclaimed = [row for row in rows if row['reference_id'] is None]
+    by_slug = {row['slug']: row for row in unclaimed}
+    by_name_parent = {(row['name'], row['parent_id']): row for row in unclaimed}
+
+    now = timezone.now()
+    # reference_id -> (id, slug) de la línea real, para enlazar a los hijos
+    lines_by_reference = {}
+    created = updated = 0
+
+    levels = sorted({entry['level'] for entry in entries})
+    for level in levels:
+        to_create = []
+        to_update = []
+        for entry in entries:
+            if entry['level'] != level:
+                continue
+            parent_id, parent_slug = lines_by_reference.get(entry['parent_reference_id'], (None, ''))
+            values = {
+                'name': entry['name'],
+                'slug': expected_slug(parent_slug, entry['name']),
+                'parent_id': parent_id,
+                'level': entry['level'],
+                'has_remanente': entry['has_remanente'],
+                'remanente_field': entry['remanente_field'],
+                'reference_id': entry['reference_id'],
+            }
+
+            row = by_reference.get(entry['reference_id'])
+            if row is not None:
+                # Línea ya adoptada: nombre, slug y padre pueden haberse editado en el admin
+                values.update({field: row[field] for field in SEED_FIELDS if field not in REFERENCE_FIELDS})
+            else:
+                row = by_slug.get(values['slug']) or by_name_parent.get((entry['name'], parent_id))
+                if row is not None:
+                    by_slug.pop(row['slug'], None)
+                    by_name_parent.pop((row['name'], row['parent_id']), None)
+
+            if row is None:
+                to_create.append(BusinessLine(is_active=entry['is_active'], **values))
+                continue
+            lines_by_reference[entry['reference_id']] = (row['id'], values['slug'])
+            if any(row[field] != values[field] for field in SEED_FIELDS):
+                to_update.append(BusinessLine(id=row['id'], updated_at=now, **values))
+
+        # PostgreSQL devuelve los ids del INSERT: el siguiente nivel ya puede enlazar con el padre
+        for line in BusinessLine.objects.bulk_create(to_create):
+            lines_by_reference[line.reference_id] = (line.pk, line.slug)
+        if to_update:
+            BusinessLine.objects.bulk_update(to_update, SEED_FIELDS + ['updated_at'])
+        created += len(to_create)
+        updated += len(to_update)
+
+    # Descendientes no sembrados de una línea movida o renombrada
+    repaired = 0
+    if updated:
+        repaired = repair_hierarchy(check_hierarchy())
+
+    return {
+        'created': created,
+        'updated': updated,
+        'unchanged': len(entries) - created - updated,
+        'repaired': repaired,
+    }
@@ -1,3 +1,95 @@
-from django.test import TestCase
+from django.contrib.auth.models import Group, User
+from django.test import RequestFactory, TestCase, override_settings
 
-# Create your tests here.
+from .models import BusinessLine, BusinessLineAccess
+from .scoping import allowed_line_ids, scope_queryset
+from .seeds import load_reference_lines, seed_business_lines
+
+
+class SeedBusinessLinesTests(TestCase):
+
+    def setUp(self):
+        self.entries = load_reference_lines()
+
+    def test_seed_is_idempotent(self):
+        first = seed_business_lines(self.entries)
+        second = seed_business_lines(self.entries)
+        self.assertEqual(first['created'], len(self.entries))
+        self.assertEqual(second, {'created': 0, 'updated': 0, 'unchanged': len(self.entries), 'repaired': 0})
+
+    def test_renamed_line_is_not_recreated(self):
+        seed_business_lines(self.entries)
+        child = BusinessLine.objects.filter(parent__isnull=False).order_by('pk').first()
+        siblings = BusinessLine.objects.filter(parent_id=child.parent_id).count()
+        child.name = f'{child.name} Online'
+        child.save()
+
+        result = seed_business_lines(self.entries)
+
+        self.assertEqual(result['created'], 0)
+        self.assertEqual(BusinessLine.objects.filter(parent_id=child.parent_id).count(), siblings)
+        child.refresh_from_db()
+        self.assertTrue(child.name.endswith(' Online'))
+
+    def test_legacy_lines_are_adopted_by_slug(self):
+        seed_business_lines(self.entries)
+        BusinessLine.objects.update(reference_id=None)
+
+        result = seed_business_lines(self.entries)
+
+        self.assertEqual(result['created'], 0)
+        self.assertFalse(BusinessLine.objects.filter(reference_id__isnull=True).exists())
+
+    def test_missing_line_is_created_under_renamed_parent(self):
+        seed_business_lines(self.entries)
+        child = BusinessLine.objects.filter(parent__isnull=False, children__isnull=True).order_by('pk').first()
+        parent = child.parent
+        child.delete()
+        parent.name = f'{parent.name} Norte'
+        parent.save()
+
+        result = seed_business_lines(self.entries)
+
+        self.assertEqual(result['created'], 1)
+        recreated = BusinessLine.objects.get(reference_id=child.reference_id)
+        self.assertEqual(recreated.parent_id, parent.pk)
+        self.assertTrue(recreated.slug.startswith(BusinessLine.objects.get(pk=parent.pk).slug))
+
+
+class ScopingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.root = BusinessLine.objects.create(name='Nutrición')
+        cls.child = BusinessLine.objects.create(name='Online', parent=cls.root)
+        cls.other = BusinessLine.objects.create(name='Deporte')
+
+    def request_for(self, user):
+        request = RequestFactory().get('/admin/')
+        request.user = user
+        return request
+
+    def scoped_lines(self, user):
+        request = self.request_for(user)
+        return set(scope_queryset(request, BusinessLine.objects.all(), field='id'))
+
+    def test_superuser_is_not_scoped(self):
+        user = User.objects.create_superuser('admin', password='x')
+        self.assertIsNone(allowed_line_ids(self.request_for(user)))
+
+    def test_access_includes_the_subtree(self):
+        user = User.objects.create_user('nutri', password='x', is_staff=True)
+        group = Group.objects.create(name='Nutricionistas')
+        user.groups.add(group)
+        BusinessLineAccess.objects.create(group=group, business_line=self.root)
+        self.assertEqual(self.scoped_lines(user), {self.root, self.child})
+
+    def test_unassigned_staff_sees_nothing(self):
+        user = User.objects.create_user('nuevo', password='x', is_staff=True)
+        self.assertEqual(allowed_line_ids(self.request_for(user)), frozenset())
+        self.assertEqual(self.scoped_lines(user), set())
+
+    @override_settings(BUSINESS_LINES_UNASSIGNED_SEE_ALL=True)
+    def test_unassigned_staff_can_opt_into_full_access(self):
+        user = User.objects.create_user('nuevo', password='x', is_staff=True)
+        self.assertIsNone(allowed_line_ids(self.request_for(user)))
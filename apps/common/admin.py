@@ -0,0 +1,127 @@
+from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
+from .models import Job, OutboxEvent, OutboxOffset
+from .private_files import private_file_response
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    """
+    Admin de solo lectura para inspeccionar el outbox
+    """
+
+    list_display = ['id', 'aggregate_type', 'aggregate_id', 'event_type', 'created_at']
+    list_filter = ['aggregate_type', 'event_type']
+    search_fields = ['=aggregate_id']
+    readonly_fields = ['aggregate_type', 'aggregate_id', 'event_type', 'payload', 'transaction_id', 'created_at']
+    ordering = ['-id']
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(OutboxOffset)
+class OutboxOffsetAdmin(admin.ModelAdmin):
+    """
+    Posición de cada consumidor del outbox
+    """
+
+    list_display = ['consumer', 'last_transaction_id', 'last_event_id', 'updated_at']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """
+    Estado, progreso y resultado de los trabajos en segundo plano
+    """
+
+    list_display = ['id', 'name', 'status', 'get_progress_display', 'created_by', 'created_at', 'finished_at']
+    list_filter = ['status', 'name']
+    readonly_fields = [
+        'name', 'kwargs', 'status', 'get_progress_display', 'progress_message',
+        'get_result_display', 'error', 'attempts', 'created_by',
+        'created_at', 'started_at', 'finished_at',
+    ]
+    fieldsets = (
+        ('Trabajo', {
+            'fields': ('name', 'status', 'get_progress_display', 'progress_message', 'attempts')
+        }),
+        ('Resultado', {
+            'fields': ('get_result_display', 'error')
+        }),
+        ('Parámetros', {
+            'fields': ('kwargs',),
+            'classes': ('collapse',)
+        }),
+        ('Metadatos', {
+            'fields': ('created_by', 'created_at', 'started_at', 'finished_at'),
+        }),
+    )
+    ordering = ['-id']
+    change_form_template = 'admin/common/job/change_form.html'
+
+    def get_progress_display(self, obj):
+        """Barra de progreso del trabajo"""
+        return format_html(
+            '<progress max="100" value="{}"></progress> {}%',
+            obj.progress,
+            obj.progress
+        )
+    get_progress_display.short_description = "Progreso"
+
+    def get_result_display(self, obj):
+        """Resultado del trabajo, con enlace de descarga si genera un fichero"""
+        if not obj.result:
+            return '-'
+        if isinstance(obj.result, dict) and obj.result.get('file'):
+            return format_html(
+                '<a href="{}">Descargar {}</a>',
+                reverse('admin:common_job_download', args=[obj.pk]),
+                obj.result['file'].rsplit('/', 1)[-1],
+            )
+        return str(obj.result)
+    get_result_display.short_description = "Resultado"
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request).select_related('created_by')
+        # Con ámbito de líneas, solo los trabajos propios: los resultados
+        # (p.ej. exportaciones) pueden contener clientes de otras líneas
+        from apps.business_lines.scoping import is_scoped
+        if is_scoped(request):
+            queryset = queryset.filter(created_by=request.user)
+        return queryset
+
+    def get_urls(self):
+        custom_urls = [
+            path(
+                '<int:pk>/descargar/',
+                self.admin_site.admin_view(self.download_view),
+                name='common_job_download',
+            ),
+        ]
+        return custom_urls + super().get_urls()
+
+    def download_view(self, request, pk):
+        """Fichero generado por el trabajo: solo para quien lo lanzó (o un superusuario)"""
+        job = get_object_or_404(self.get_queryset(request), pk=pk)
+        if not self.has_view_permission(request, job):
+            raise PermissionDenied
+        if not request.user.is_superuser and job.created_by_id != request.user.pk:
+            raise PermissionDenied
+        if not isinstance(job.result, dict) or not job.result.get('file'):
+            raise PermissionDenied
+        return private_file_response(job.result['file'])
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,22 @@
+from django.apps import AppConfig
+
+
+class CommonConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.common'
+    verbose_name = 'Infraestructura común'
+
+    def ready(self):
+        # Eventos de borrado del outbox (solo para los modelos con OutboxModelMixin)
+        from .signals import connect_outbox_signals
+        connect_outbox_signals()
+
+        # Registrar las tareas de la cola de trabajos (tasks.py de cada app)
+        from .jobs import autodiscover_tasks
+        autodiscover_tasks()
+
+        # Spans de renderizado de plantillas (solo con las trazas activadas)
+        from django.conf import settings
+        if getattr(settings, 'TRACING_ENABLED', False):
+            from .tracing import install_template_tracing
+            install_template_tracing()
@@ -0,0 +1,116 @@
+"""
+Endpoint de autocompletado del admin con búsqueda por prefijo y caché breve.
+
+Sustituye a la vista estándar admin/autocomplete/ (ver config/urls.py):
+- Los ModelAdmin con PrefixAutocompleteMixin buscan por prefijo sobre
+  columnas indexadas en lugar de con icontains.
+- Solo se leen las columnas declaradas en autocomplete_only_fields.
+- El texto de cada resultado lo da get_autocomplete_text() (p.ej. la ruta
+  completa de la línea desde el árbol cacheado), sin consultas por fila.
+- No se ejecuta COUNT(*): se pide una fila de más para saber si hay más páginas.
+- La respuesta se cachea unos segundos por usuario y término.
+"""
+
+import hashlib
+
+from django.contrib.admin.views.autocomplete import AutocompleteJsonView
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.db.models import Q
+from django.http import JsonResponse
+
+
+CACHE_TIMEOUT = 30
+PAGE_SIZE = 20
+
+
+def is_autocomplete_request(request):
+    return getattr(request, 'is_autocomplete', False)
+
+
+class PrefixAutocompleteMixin:
+    """
+    Mixin de ModelAdmin para el autocompletado: búsqueda por prefijo
+    (istartswith) en autocomplete_prefix_fields, que deben tener índice
+    UPPER(campo) text_pattern_ops.
+    """
+
+    autocomplete_prefix_fields = []
+    autocomplete_only_fields = None
+    autocomplete_ordering = None
+
+    def get_autocomplete_text(self, request, obj):
+        return str(obj)
+
+    def get_search_results(self, request, queryset, search_term):
+        if not is_autocomplete_request(request) or not self.autocomplete_prefix_fields:
+            return super().get_search_results(request, queryset, search_term)
+        term = search_term.strip()
+        if term:
+            condition = Q()
+            for field in self.autocomplete_prefix_fields:
+                condition |= Q(**{f'{field}__istartswith': term})
+            queryset = queryset.filter(condition)
+        if self.autocomplete_ordering:
+            queryset = queryset.order_by(*self.autocomplete_ordering)
+        return queryset, False
+
+
+class CachedAutocompleteJsonView(AutocompleteJsonView):
+    paginate_by = PAGE_SIZE
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        only_fields = getattr(self.model_admin, 'autocomplete_only_fields', None)
+        if only_fields:
+            queryset = queryset.select_related(None).only(*only_fields)
+        return queryset
+
+    def serialize_result(self, obj, to_field_name):
+        if hasattr(self.model_admin, 'get_autocomplete_text'):
+            text = self.model_admin.get_autocomplete_text(self.request, obj)
+        else:
+            text = str(obj)
+        return {'id': str(getattr(obj, to_field_name)), 'text': str(text)}
+
+    def cache_key(self, request):
+        raw = '|'.join([
+            str(request.user.pk),
+            request.GET.get('app_label', ''),
+            request.GET.get('model_name', ''),
+            request.GET.get('field_name', ''),
+            request.GET.get('term', ''),
+            request.GET.get('page', '1'),
+        ])
+        return 'admin:autocomplete:' + hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def get(self, request, *args, **kwargs):
+        request.is_autocomplete = True
+        (
+            self.term,
+            self.model_admin,
+            self.source_field,
+            to_field_name,
+        ) = self.process_request(request)
+
+        if not self.has_perm(request):
+            raise PermissionDenied
+
+        key = self.cache_key(request)
+        data = cache.get(key)
+        if data is None:
+            try:
+                page = max(int(request.GET.get('page', 1)), 1)
+            except ValueError:
+                page = 1
+            offset = (page - 1) * self.paginate_by
+            rows = list(self.get_queryset()[offset:offset + self.paginate_by + 1])
+            data = {
+                'results': [
+                    self.serialize_result(obj, to_field_name)
+                    for obj in rows[:self.paginate_by]
+                ],
+                'pagination': {'more': len(rows) > self.paginate_by},
+            }
+            cache.set(key, data, CACHE_TIMEOUT)
+        return JsonResponse(data)
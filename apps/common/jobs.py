@@ -0,0 +1,108 @@
+"""
+Cola de trabajos en segundo plano respaldada por la base de datos.
+
+Las tareas se registran con @task en el módulo tasks.py de cada app y se
+encolan con enqueue(). manage.py run_workers lanza un pool de procesos que
+reclaman trabajos con SELECT ... FOR UPDATE SKIP LOCKED, de modo que varios
+workers nunca ejecutan el mismo trabajo y no se bloquean entre sí.
+"""
+
+import logging
+import traceback
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def task(name):
+    """Registra una función como tarea ejecutable por los workers"""
+    def decorator(func):
+        _registry[name] = func
+        return func
+    return decorator
+
+
+def autodiscover_tasks():
+    """Importa el módulo tasks.py de cada app instalada"""
+    autodiscover_modules('tasks')
+
+
+def get_task(name):
+    try:
+        return _registry[name]
+    except KeyError:
+        raise LookupError(f"Tarea no registrada: {name}")
+
+
+def enqueue(name, user=None, **kwargs):
+    """Crea un trabajo pendiente; los parámetros deben ser serializables a JSON"""
+    get_task(name)
+    return Job.objects.create(
+        name=name,
+        kwargs=kwargs,
+        created_by=user if user is not None and user.is_authenticated else None,
+    )
+
+
+def claim_next_job():
+    """Reclama el trabajo pendiente más antiguo que no esté bloqueado por otro worker"""
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.STATUS_PENDING)
+            .order_by('id')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = Job.STATUS_RUNNING
+        job.started_at = timezone.now()
+        job.attempts += 1
+        job.save(update_fields=['status', 'started_at', 'attempts'])
+    return job
+
+
+def run_job(job):
+    """Ejecuta un trabajo ya reclamado y guarda su resultado o el error"""
+    try:
+        result = get_task(job.name)(job, **job.kwargs)
+    except Exception:
+        logger.exception("Fallo en el trabajo %s", job)
+        job.status = Job.STATUS_FAILED
+        job.error = traceback.format_exc()
+        job.result = None
+    else:
+        job.status = Job.STATUS_DONE
+        job.progress = 100
+        job.result = result
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'progress', 'result', 'error', 'finished_at'])
+    return job
+
+
+def requeue_stale_jobs(minutes, max_attempts=3):
+    """
+    Devuelve a pendientes los trabajos 'en curso' abandonados por un worker caído.
+    Los que ya agotaron sus intentos se marcan como fallidos.
+    """
+    cutoff = timezone.now() - timedelta(minutes=minutes)
+    stale = Job.objects.filter(status=Job.STATUS_RUNNING, started_at__lt=cutoff)
+    failed = stale.filter(attempts__gte=max_attempts).update(
+        status=Job.STATUS_FAILED,
+        error='Worker interrumpido demasiadas veces',
+        finished_at=timezone.now(),
+    )
+    requeued = stale.filter(attempts__lt=max_attempts).update(
+        status=Job.STATUS_PENDING,
+        started_at=None,
+    )
+    return requeued, failed
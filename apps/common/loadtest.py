@@ -0,0 +1,216 @@
+"""
+Generador de carga HTTP concurrente para el admin (sin dependencias).
+
+Cada usuario virtual es un hilo con su propia sesión (cookies, login por el
+formulario del admin y token CSRF) que elige peticiones al azar según los
+pesos del escenario. Por cada endpoint se acumulan latencias, errores y las
+consultas SQL que devuelve el servidor en X-DB-Queries (requiere
+TRACING_ENABLED en el servidor, ver apps.common.tracing).
+"""
+
+import http.cookiejar
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+
+
+LOGIN_PATH = '/admin/login/'
+
+
+class LoginError(Exception):
+    pass
+
+
+class _NoPostRedirect(urllib.request.HTTPRedirectHandler):
+    """Los POST no siguen el redirect: se mide solo la petición que escribe"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        if req.get_method() == 'POST':
+            return None
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+class HttpSession:
+    """Cliente HTTP con cookies y token CSRF de Django"""
+
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(self.cookies), _NoPostRedirect,
+        )
+
+    @property
+    def csrf_token(self):
+        for cookie in self.cookies:
+            if cookie.name == 'csrftoken':
+                return cookie.value
+        return ''
+
+    def request(self, method, path, data=None):
+        """Devuelve (status, cabeceras, url final); solo los GET siguen los redirects"""
+        url = self.base_url + path
+        body = None
+        headers = {}
+        if data is not None:
+            data = list(data.items()) if isinstance(data, dict) else list(data)
+            data.append(('csrfmiddlewaretoken', self.csrf_token))
+            body = urllib.parse.urlencode(data).encode('utf-8')
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            headers['Referer'] = url
+        request = urllib.request.Request(url, data=body, headers=headers, method=method)
+        try:
+            with self.opener.open(request, timeout=self.timeout) as response:
+                response.read()
+                return response.status, response.headers, response.geturl()
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code, e.headers, url
+
+    def login(self, username, password):
+        self.request('GET', LOGIN_PATH)
+        status, headers, _url = self.request('POST', LOGIN_PATH, {
+            'username': username,
+            'password': password,
+            'next': '/admin/',
+        })
+        if status != 302 or LOGIN_PATH in headers.get('Location', LOGIN_PATH):
+            raise LoginError(f'No se pudo iniciar sesión como {username}')
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.db_queries = 0
+        self.db_reported = 0
+
+
+def percentile(sorted_values, fraction):
+    """Percentil por rango más cercano sobre una lista ordenada"""
+    if not sorted_values:
+        return None
+    index = max(int(round(fraction * len(sorted_values))) - 1, 0)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+class LoadTest:
+    """
+    scenario: {nombre: (peso, función(sesión, rng) -> (método, ruta, datos[, estado]))}
+    Si la función indica el estado esperado, cualquier otro cuenta como error
+    (un formulario que vuelve con 200 no se ha guardado); si no, es error
+    todo estado >= 400. Cada usuario ejecuta hasta agotar la duración o su
+    número de peticiones.
+    """
+
+    def __init__(self, base_url, username, password, scenario, users=10,
+                 duration=60, requests_per_user=None, think_time=0.0, seed=None):
+        self.base_url = base_url
+        self.username = username
+        self.password = password
+        self.scenario = scenario
+        self.users = users
+        self.duration = duration
+        self.requests_per_user = requests_per_user
+        self.think_time = think_time
+        self.seed = seed
+        self.stats = defaultdict(EndpointStats)
+        self.lock = threading.Lock()
+        self.login_errors = 0
+        self.started = None
+        self.deadline = None
+        self.elapsed = 0.0
+
+    def _record(self, name, latency, ok, headers):
+        with self.lock:
+            stats = self.stats[name]
+            stats.latencies.append(latency)
+            if not ok:
+                stats.errors += 1
+            queries = headers.get('X-DB-Queries') if headers else None
+            if queries is not None:
+                stats.db_queries += int(queries)
+                stats.db_reported += 1
+
+    def _user(self, number, start_barrier):
+        rng = random.Random(None if self.seed is None else self.seed + number)
+        session = HttpSession(self.base_url)
+        try:
+            session.login(self.username, self.password)
+        except (LoginError, OSError):
+            with self.lock:
+                self.login_errors += 1
+            start_barrier.wait()
+            return
+        start_barrier.wait()
+
+        names = list(self.scenario)
+        weights = [self.scenario[name][0] for name in names]
+        done = 0
+        while time.monotonic() < self.deadline:
+            if self.requests_per_user is not None and done >= self.requests_per_user:
+                break
+            name = rng.choices(names, weights)[0]
+            method, path, data, *expected = self.scenario[name][1](session, rng)
+            started = time.perf_counter()
+            try:
+                status, headers, _url = session.request(method, path, data)
+                ok = status in expected if expected else status < 400
+            except Exception:
+                # Cualquier fallo (red, respuesta malformada...) es una petición fallida,
+                # no el fin del usuario virtual
+                headers, ok = None, False
+            self._record(name, time.perf_counter() - started, ok, headers)
+            done += 1
+            if self.think_time:
+                time.sleep(rng.uniform(0, self.think_time * 2))
+
+    def _start_clock(self):
+        self.started = time.monotonic()
+        self.deadline = self.started + self.duration if self.duration else float('inf')
+
+    def run(self):
+        # La medición empieza cuando todos los usuarios han iniciado sesión
+        barrier = threading.Barrier(self.users, action=self._start_clock)
+        threads = [
+            threading.Thread(target=self._user, args=(number, barrier), daemon=True)
+            for number in range(self.users)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.elapsed = time.monotonic() - self.started
+        return self.report()
+
+    def report(self):
+        rows = []
+        for name, stats in sorted(self.stats.items()):
+            latencies = sorted(stats.latencies)
+            rows.append({
+                'endpoint': name,
+                'requests': len(latencies),
+                'errors': stats.errors,
+                'p50_ms': percentile(latencies, 0.50) * 1000,
+                'p95_ms': percentile(latencies, 0.95) * 1000,
+                'p99_ms': percentile(latencies, 0.99) * 1000,
+                'throughput': len(latencies) / self.elapsed if self.elapsed else 0.0,
+                'db_queries': stats.db_queries if stats.db_reported else None,
+                'db_queries_per_request': (
+                    stats.db_queries / stats.db_reported if stats.db_reported else None
+                ),
+            })
+        total = sum(row['requests'] for row in rows)
+        return {
+            'users': self.users,
+            'elapsed': self.elapsed,
+            'requests': total,
+            'throughput': total / self.elapsed if self.elapsed else 0.0,
+            'login_errors': self.login_errors,
+            'endpoints': rows,
+        }
@@ -0,0 +1,79 @@
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Arranque equivalente al de un worker: settings, registro de apps y URLconf
+STARTUP_CODE = (
+    "import django; django.setup(); "
+    "from django.urls import get_resolver; get_resolver().reverse_dict"
+)
+WSGI_CODE = (
+    "import config.wsgi; "
+    "from django.urls import get_resolver; get_resolver().reverse_dict"
+)
+
+
+def parse_importtime(output):
+    """Líneas 'import time: self | cumulative | paquete' de python -X importtime"""
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+class Command(BaseCommand):
+    help = 'Mide el tiempo de importación del arranque de Django (python -X importtime)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--wsgi', action='store_true', help='Arrancar como config.wsgi (settings de producción por defecto)')
+
+    def handle(self, *args, **options):
+        env = os.environ.copy()
+        if options['wsgi']:
+            code = WSGI_CODE
+            env.pop('DJANGO_SETTINGS_MODULE', None)
+        else:
+            code = STARTUP_CODE
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, [os.getcwd(), env.get('PYTHONPATH')]))
+
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', code],
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        modules = parse_importtime(result.stderr)
+        if result.returncode != 0:
+            errors = [line for line in result.stderr.splitlines() if not line.startswith('import time:')]
+            raise CommandError('El arranque ha fallado:\n' + '\n'.join(errors[-10:]))
+
+        limit = options['limit']
+        total_us = sum(self_us for _name, self_us, _cumulative in modules)
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{len(modules)} módulos importados en {total_us / 1000:.1f} ms'
+        ))
+
+        # Tiempo propio agregado por paquete de primer nivel
+        packages = defaultdict(lambda: [0, 0])
+        for name, self_us, _cumulative in modules:
+            package = packages[name.split('.')[0]]
+            package[0] += self_us
+            package[1] += 1
+
+        self.stdout.write('')
+        self.stdout.write(self.style.MIGRATE_HEADING('Paquetes por tiempo propio'))
+        for package, (self_us, count) in sorted(packages.items(), key=lambda item: item[1][0], reverse=True)[:limit]:
+            self.stdout.write(f'{self_us / 1000:9.1f} ms {count:5d} módulos  {package}')
+
+        self.stdout.write('')
+        self.stdout.write(self.style.MIGRATE_HEADING('Módulos por tiempo acumulado'))
+        for name, _self_us, cumulative_us in sorted(modules, key=lambda module: module[2], reverse=True)[:limit]:
+            self.stdout.write(f'{cumulative_us / 1000:9.1f} ms  {name}')
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.common.outbox import JSONLFileSink, WebhookSink, relay_batch
+
+
+class Command(BaseCommand):
+    help = 'Envía los eventos del outbox a un fichero JSONL o a un webhook en lotes con offset'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--consumer', default='default', help='Nombre del consumidor (offset independiente)')
+        parser.add_argument('--file', dest='path', help='Ruta del fichero JSONL de salida')
+        parser.add_argument('--webhook', dest='url', help='URL a la que enviar cada lote por POST')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--max-batches', type=int, default=0, help='0 = hasta vaciar el outbox')
+        parser.add_argument('--follow', action='store_true', help='Seguir esperando nuevos eventos')
+        parser.add_argument('--interval', type=float, default=5.0, help='Segundos entre sondeos con --follow')
+
+    def handle(self, *args, **options):
+        if bool(options['path']) == bool(options['url']):
+            raise CommandError('Indica exactamente uno de --file o --webhook')
+
+        if options['path']:
+            sink = JSONLFileSink(options['path'])
+        else:
+            sink = WebhookSink(options['url'])
+
+        consumer = options['consumer']
+        batches = 0
+        total = 0
+        while True:
+            sent = relay_batch(consumer, sink, batch_size=options['batch_size'])
+            if sent:
+                batches += 1
+                total += sent
+                self.stdout.write(f'Lote {batches}: {sent} eventos enviados')
+                if options['max_batches'] and batches >= options['max_batches']:
+                    break
+                continue
+            if not options['follow']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'{total} eventos enviados a {consumer}'))
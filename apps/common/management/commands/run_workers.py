@@ -0,0 +1,70 @@
+import multiprocessing
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from apps.common.jobs import claim_next_job, requeue_stale_jobs, run_job
+
+
+def worker_loop(poll_interval, once):
+    """Bucle de un proceso worker: reclama y ejecuta trabajos hasta recibir SIGTERM"""
+    import django
+    django.setup()
+
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.append(signum))
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    while not stopping:
+        job = claim_next_job()
+        if job is not None:
+            run_job(job)
+            continue
+        if once:
+            break
+        connections.close_all()
+        time.sleep(poll_interval)
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta un pool de workers que procesan la cola de trabajos en segundo plano'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=2, help='Número de procesos worker')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Segundos de espera con la cola vacía')
+        parser.add_argument('--once', action='store_true', help='Vaciar la cola y terminar')
+        parser.add_argument('--stale-minutes', type=int, default=60,
+                            help='Reencolar trabajos en curso más antiguos que estos minutos')
+
+    def handle(self, *args, **options):
+        requeued, failed = requeue_stale_jobs(options['stale_minutes'])
+        if requeued or failed:
+            self.stdout.write(f'{requeued} trabajos reencolados, {failed} marcados como fallidos')
+
+        # Los hijos no deben heredar las conexiones abiertas del proceso padre
+        connections.close_all()
+
+        workers = [
+            multiprocessing.Process(
+                target=worker_loop,
+                args=(options['poll_interval'], options['once']),
+                name=f'crm-worker-{i}',
+            )
+            for i in range(options['processes'])
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(self.style.SUCCESS(f'{len(workers)} workers en marcha'))
+
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            self.stdout.write('Deteniendo workers tras el trabajo en curso...')
+            for worker in workers:
+                worker.terminate()
+            for worker in workers:
+                worker.join()
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.common.seeding import autodiscover_seeders, get_seeders, run_seeders
+
+
+class Command(BaseCommand):
+    help = 'Carga los datos de referencia con upserts masivos (idempotente, seguro en cada despliegue)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help='Cargadores a ejecutar (por defecto, todos)')
+        parser.add_argument('--list', action='store_true', help='Mostrar los cargadores registrados')
+        parser.add_argument('--dry-run', action='store_true', help='Calcular los cambios y revertirlos')
+
+    def handle(self, *args, **options):
+        autodiscover_seeders()
+
+        if options['list']:
+            for name, _func in get_seeders():
+                self.stdout.write(name)
+            return
+
+        try:
+            results = run_seeders(options['names'], dry_run=options['dry_run'])
+        except LookupError as e:
+            raise CommandError(str(e))
+
+        for name, summary in results:
+            details = ', '.join(f'{key}: {value}' for key, value in (summary or {}).items())
+            self.stdout.write(f'{name}: {details}')
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('Simulación: no se ha guardado ningún cambio'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Datos de referencia actualizados'))
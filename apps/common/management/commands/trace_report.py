@@ -0,0 +1,87 @@
+import json
+import re
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+SQL_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+SQL_IN_LISTS = re.compile(r'IN \((?:\s*(?:%s|\?)\s*,?)+\)')
+
+
+def normalize_sql(sql, width=120):
+    """Agrupa consultas iguales salvo por sus literales"""
+    sql = SQL_LITERALS.sub('?', sql)
+    sql = SQL_IN_LISTS.sub('IN (...)', sql)
+    sql = ' '.join(sql.split())
+    return sql[:width]
+
+
+def span_key(span):
+    if span['kind'] == 'db':
+        return f"sql {normalize_sql(span['attributes'].get('sql', ''))}"
+    return span['name']
+
+
+class Command(BaseCommand):
+    help = 'Resume las trazas exportadas: peticiones más lentas y spans con más tiempo propio'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', dest='path', help='Fichero JSONL de trazas (por defecto TRACING_PATH)')
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument('--path-prefix', default='', help='Solo peticiones cuya ruta empiece así')
+
+    def handle(self, *args, **options):
+        path = options['path'] or settings.TRACING_PATH
+        limit = options['limit']
+
+        try:
+            with open(path, encoding='utf-8') as f:
+                traces = [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            raise CommandError(f'No existe el fichero de trazas: {path}')
+
+        prefix = options['path_prefix']
+        if prefix:
+            traces = [
+                trace for trace in traces
+                if trace['name'].split(' ', 1)[-1].startswith(prefix)
+            ]
+        if not traces:
+            self.stdout.write('No hay trazas')
+            return
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f'Peticiones más lentas ({len(traces)} trazas)'))
+        slowest = sorted(traces, key=lambda trace: trace['duration_ms'] or 0, reverse=True)
+        for trace in slowest[:limit]:
+            self.stdout.write(
+                f"{trace['duration_ms'] or 0:9.1f} ms  {trace['db_queries']:4d} SQL "
+                f"({trace['db_time_ms']:.1f} ms)  {trace['name']}  [{trace['trace_id'][:12]}]"
+            )
+
+        # Tiempo propio de cada span: duración menos la de sus hijos directos
+        stats = defaultdict(lambda: {'count': 0, 'self_ms': 0.0, 'total_ms': 0.0, 'max_ms': 0.0})
+        for trace in traces:
+            children_ms = defaultdict(float)
+            for span in trace['spans']:
+                if span['parent_id'] is not None and span['duration_ms'] is not None:
+                    children_ms[span['parent_id']] += span['duration_ms']
+            for span in trace['spans']:
+                if span['kind'] == 'request' or span['duration_ms'] is None:
+                    continue
+                entry = stats[span_key(span)]
+                entry['count'] += 1
+                entry['total_ms'] += span['duration_ms']
+                entry['self_ms'] += max(span['duration_ms'] - children_ms[span['id']], 0)
+                entry['max_ms'] = max(entry['max_ms'], span['duration_ms'])
+
+        self.stdout.write('')
+        self.stdout.write(self.style.MIGRATE_HEADING('Spans con más tiempo propio'))
+        self.stdout.write(f"{'propio ms':>10} {'total ms':>10} {'llamadas':>9} {'máx ms':>8}  span")
+        hottest = sorted(stats.items(), key=lambda item: item[1]['self_ms'], reverse=True)
+        for key, entry in hottest[:limit]:
+            self.stdout.write(
+                f"{entry['self_ms']:10.1f} {entry['total_ms']:10.1f} {entry['count']:9d} "
+                f"{entry['max_ms']:8.1f}  {key}"
+            )
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.22 on 2026-10-19 05:16
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxOffset',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('consumer', models.CharField(max_length=100, unique=True, verbose_name='Consumidor')),
+                ('last_event_id', models.BigIntegerField(default=0, verbose_name='Último evento entregado')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Offset del outbox',
+                'verbose_name_plural': 'Offsets del outbox',
+                'ordering': ['consumer'],
+            },
+        ),
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('aggregate_type', models.CharField(help_text='Ej: accounting.client, business_lines.businessline', max_length=100, verbose_name='Entidad')),
+                ('aggregate_id', models.BigIntegerField(verbose_name='ID de la entidad')),
+                ('event_type', models.CharField(choices=[('created', 'Creado'), ('updated', 'Actualizado'), ('deactivated', 'Desactivado'), ('deleted', 'Eliminado')], max_length=20, verbose_name='Tipo de evento')),
+                ('payload', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Datos del cambio')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Evento de cambio',
+                'verbose_name_plural': 'Eventos de cambio',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['aggregate_type', 'aggregate_id'], name='outbox_aggregate_idx')],
+            },
+        ),
+    ]
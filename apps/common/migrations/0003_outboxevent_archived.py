@@ -0,0 +1,18 @@
+# Generated by Django 4.2.22 on 2026-10-19 05:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0002_job'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='outboxevent',
+            name='event_type',
+            field=models.CharField(choices=[('created', 'Creado'), ('updated', 'Actualizado'), ('deactivated', 'Desactivado'), ('deleted', 'Eliminado'), ('archived', 'Archivado')], max_length=20, verbose_name='Tipo de evento'),
+        ),
+    ]
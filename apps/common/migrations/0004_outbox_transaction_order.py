@@ -0,0 +1,51 @@
+# Generated by Django 4.2.22 on 2026-10-19 05:51
+
+from django.db import migrations, models
+
+
+# Los eventos existentes quedan en la transacción 0: los offsets actuales
+# (last_transaction_id=0, last_event_id=N) siguen apuntando al mismo sitio
+TRIGGER_SQL = """
+UPDATE common_outboxevent SET transaction_id = 0 WHERE transaction_id IS NULL;
+
+CREATE OR REPLACE FUNCTION common_outboxevent_set_transaction_id() RETURNS trigger AS $$
+BEGIN
+    NEW.transaction_id := txid_current();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER common_outboxevent_set_transaction_id
+    BEFORE INSERT ON common_outboxevent
+    FOR EACH ROW EXECUTE FUNCTION common_outboxevent_set_transaction_id();
+"""
+
+DROP_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS common_outboxevent_set_transaction_id ON common_outboxevent;
+DROP FUNCTION IF EXISTS common_outboxevent_set_transaction_id();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0003_outboxevent_archived'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxevent',
+            name='transaction_id',
+            field=models.BigIntegerField(editable=False, null=True, verbose_name='Transacción'),
+        ),
+        migrations.AddField(
+            model_name='outboxoffset',
+            name='last_transaction_id',
+            field=models.BigIntegerField(default=0, verbose_name='Transacción del último evento'),
+        ),
+        migrations.AddIndex(
+            model_name='outboxevent',
+            index=models.Index(fields=['transaction_id', 'id'], name='outbox_transaction_idx'),
+        ),
+        migrations.RunSQL(TRIGGER_SQL, DROP_TRIGGER_SQL),
+    ]
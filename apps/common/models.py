@@ -0,0 +1,292 @@
+from django.conf import settings
+from django.db import models, transaction
+from django.utils import timezone
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+class OutboxEvent(models.Model):
+    """
+    Evento de cambio escrito en la misma transacción que el cambio de datos.
+    Los sistemas externos lo consumen de forma incremental con relay_outbox.
+    """
+
+    EVENT_CREATED = 'created'
+    EVENT_UPDATED = 'updated'
+    EVENT_DEACTIVATED = 'deactivated'
+    EVENT_DELETED = 'deleted'
+    EVENT_ARCHIVED = 'archived'
+
+    EVENT_TYPE_CHOICES = [
+        (EVENT_CREATED, 'Creado'),
+        (EVENT_UPDATED, 'Actualizado'),
+        (EVENT_DEACTIVATED, 'Desactivado'),
+        (EVENT_DELETED, 'Eliminado'),
+        (EVENT_ARCHIVED, 'Archivado'),
+    ]
+
+    aggregate_type = models.CharField(
+        max_length=100,
+        verbose_name="Entidad",
+        help_text="Ej: accounting.client, business_lines.businessline"
+    )
+
+    aggregate_id = models.BigIntegerField(
+        verbose_name="ID de la entidad"
+    )
+
+    event_type = models.CharField(
+        max_length=20,
+        choices=EVENT_TYPE_CHOICES,
+        verbose_name="Tipo de evento"
+    )
+
+    payload = models.JSONField(
+        default=dict,
+        encoder=DjangoJSONEncoder,
+        verbose_name="Datos del cambio"
+    )
+
+    # Lo rellena un trigger con txid_current(): los consumidores avanzan por
+    # (transaction_id, id) y solo leen transacciones ya terminadas
+    transaction_id = models.BigIntegerField(
+        null=True,
+        editable=False,
+        verbose_name="Transacción"
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Evento de cambio"
+        verbose_name_plural = "Eventos de cambio"
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['aggregate_type', 'aggregate_id'], name='outbox_aggregate_idx'),
+            models.Index(fields=['transaction_id', 'id'], name='outbox_transaction_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} {self.aggregate_type}:{self.aggregate_id} {self.event_type}"
+
+    def as_message(self):
+        """Representación compacta que se envía a los consumidores"""
+        return {
+            'id': self.id,
+            'aggregate_type': self.aggregate_type,
+            'aggregate_id': self.aggregate_id,
+            'event_type': self.event_type,
+            'payload': self.payload,
+            'created_at': self.created_at,
+        }
+
+
+class OutboxOffset(models.Model):
+    """Último evento entregado a cada consumidor del outbox"""
+
+    consumer = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name="Consumidor"
+    )
+
+    last_transaction_id = models.BigIntegerField(
+        default=0,
+        verbose_name="Transacción del último evento"
+    )
+
+    last_event_id = models.BigIntegerField(
+        default=0,
+        verbose_name="Último evento entregado"
+    )
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Offset del outbox"
+        verbose_name_plural = "Offsets del outbox"
+        ordering = ['consumer']
+
+    def __str__(self):
+        return f"{self.consumer} @ {self.last_transaction_id}/{self.last_event_id}"
+
+
+class OutboxQuerySet(models.QuerySet):
+    """
+    QuerySet que registra eventos de cambio también en las rutas masivas
+    (update() de acciones del admin, bulk_update y bulk_create).
+    """
+
+    def update(self, **kwargs):
+        from .outbox import record_bulk_events
+        from .signals import post_bulk_update
+
+        with transaction.atomic(using=self.db):
+            pks = list(
+                self.order_by().select_for_update(of=('self',)).values_list('pk', flat=True)
+            )
+            if not pks:
+                return 0
+            # update() no aplica auto_now: se marca igual que en save() para
+            # que los consumidores incrementales por updated_at vean el cambio
+            for field in self.model._meta.concrete_fields:
+                if getattr(field, 'auto_now', False) and field.name not in kwargs:
+                    kwargs[field.name] = timezone.now()
+            rows = super().update(**kwargs)
+            record_bulk_events(self.model, pks, kwargs, using=self.db)
+            post_bulk_update.send(sender=self.model, pks=pks, fields=set(kwargs), using=self.db)
+        return rows
+
+    update.alters_data = True
+
+    def bulk_create(self, objs, *args, **kwargs):
+        from .outbox import record_instance_events
+
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            record_instance_events(
+                [obj for obj in objs if obj.pk is not None],
+                OutboxEvent.EVENT_CREATED,
+                using=self.db,
+            )
+        return objs
+
+
+class OutboxModelMixin(models.Model):
+    """
+    Mixin para modelos cuyos cambios se publican en el outbox.
+    save() escribe el evento dentro de la misma transacción.
+    """
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._outbox_was_active = instance.__dict__.get('is_active')
+        return instance
+
+    def save(self, *args, **kwargs):
+        from .outbox import record_instance_event
+
+        adding = self._state.adding
+        using = kwargs.get('using') or transaction.DEFAULT_DB_ALIAS
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+            if adding:
+                event_type = OutboxEvent.EVENT_CREATED
+            elif getattr(self, '_outbox_was_active', None) and self.is_active is False:
+                event_type = OutboxEvent.EVENT_DEACTIVATED
+            else:
+                event_type = OutboxEvent.EVENT_UPDATED
+            record_instance_event(self, event_type, using=using)
+        self._outbox_was_active = self.is_active
+
+
+class Job(models.Model):
+    """
+    Trabajo en segundo plano ejecutado por manage.py run_workers.
+    Los workers reclaman trabajos con SELECT ... FOR UPDATE SKIP LOCKED.
+    """
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pendiente'),
+        (STATUS_RUNNING, 'En curso'),
+        (STATUS_DONE, 'Completado'),
+        (STATUS_FAILED, 'Fallido'),
+    ]
+
+    name = models.CharField(
+        max_length=100,
+        verbose_name="Tarea",
+        help_text="Nombre registrado de la tarea: accounting.exportar_clientes_csv, etc."
+    )
+
+    kwargs = models.JSONField(
+        default=dict,
+        encoder=DjangoJSONEncoder,
+        verbose_name="Parámetros"
+    )
+
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        verbose_name="Estado"
+    )
+
+    progress = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name="Progreso %"
+    )
+
+    progress_message = models.CharField(
+        max_length=200,
+        blank=True,
+        verbose_name="Detalle del progreso"
+    )
+
+    result = models.JSONField(
+        null=True,
+        blank=True,
+        encoder=DjangoJSONEncoder,
+        verbose_name="Resultado"
+    )
+
+    error = models.TextField(
+        blank=True,
+        verbose_name="Error"
+    )
+
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name="Intentos"
+    )
+
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='jobs',
+        verbose_name="Creado por"
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Trabajo en segundo plano"
+        verbose_name_plural = "Trabajos en segundo plano"
+        ordering = ['-id']
+        indexes = [
+            # Solo los pendientes: el índice que usan los workers se mantiene pequeño
+            models.Index(
+                fields=['id'],
+                name='job_pending_idx',
+                condition=models.Q(status='pending'),
+            ),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} {self.name} ({self.get_status_display()})"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_DONE, self.STATUS_FAILED)
+
+    def set_progress(self, done, total, message=''):
+        """Actualiza el progreso sin tocar el resto de columnas"""
+        percent = int(done * 100 / total) if total else 100
+        self.progress = min(percent, 100)
+        self.progress_message = message[:200]
+        Job.objects.filter(pk=self.pk).update(
+            progress=self.progress,
+            progress_message=self.progress_message,
+        )
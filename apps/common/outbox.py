@@ -0,0 +1,192 @@
+"""
+Outbox transaccional: registro de eventos de cambio y envío a consumidores.
+
+Los eventos se escriben en la misma transacción que el cambio de datos, de
+modo que nunca se publica un cambio revertido ni se pierde uno confirmado.
+relay_outbox los lee en lotes y guarda el offset de cada consumidor para que
+la sincronización sea incremental.
+
+El orden de lectura es (transaction_id, id), no solo id: los ids se asignan
+al insertar pero las transacciones confirman en otro orden, y un cursor por
+id saltaría para siempre los eventos de una transacción lenta. Solo se leen
+eventos de transacciones anteriores al xmin del snapshot actual (todas
+terminadas), así que ningún evento nuevo puede aparecer detrás del cursor.
+"""
+
+import json
+import os
+import urllib.request
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, models, transaction
+from django.db.models import Q
+
+from .models import OutboxEvent, OutboxOffset
+
+
+EVENT_BATCH_SIZE = 1000
+
+
+def aggregate_type_for(model):
+    """Etiqueta estable de la entidad: 'accounting.client'"""
+    return model._meta.label_lower
+
+
+def serialize_instance(instance):
+    """Valores de las columnas cargadas del objeto (se omiten los campos diferidos)"""
+    data = {}
+    for field in instance._meta.concrete_fields:
+        if field.attname in instance.__dict__:
+            data[field.attname] = field.value_from_object(instance)
+    return data
+
+
+def record_instance_event(instance, event_type, using=None):
+    """Registra el evento de un objeto concreto"""
+    return OutboxEvent.objects.using(using or 'default').create(
+        aggregate_type=aggregate_type_for(type(instance)),
+        aggregate_id=instance.pk,
+        event_type=event_type,
+        payload=serialize_instance(instance),
+    )
+
+
+def record_instance_events(instances, event_type, using=None):
+    """Registra el mismo tipo de evento para varios objetos con un bulk_create"""
+    return OutboxEvent.objects.using(using or 'default').bulk_create(
+        [
+            OutboxEvent(
+                aggregate_type=aggregate_type_for(type(instance)),
+                aggregate_id=instance.pk,
+                event_type=event_type,
+                payload=serialize_instance(instance),
+            )
+            for instance in instances
+        ],
+        batch_size=EVENT_BATCH_SIZE,
+    )
+
+
+def _serialize_update_kwargs(model, kwargs):
+    """
+    Convierte los argumentos de QuerySet.update() en un payload compacto.
+    Las expresiones (F, Case...) no tienen valor conocido: solo se indica el campo.
+    """
+    values = {}
+    for name, value in kwargs.items():
+        field = model._meta.get_field(name)
+        if hasattr(value, 'resolve_expression'):
+            continue
+        if isinstance(value, models.Model):
+            value = value.pk
+        values[field.attname] = value
+    return {
+        'changed_fields': sorted(model._meta.get_field(name).attname for name in kwargs),
+        'values': values,
+    }
+
+
+def record_bulk_events(model, pks, kwargs, using=None):
+    """Registra un evento por fila afectada por un update() masivo"""
+    if kwargs.get('is_active') is False:
+        event_type = OutboxEvent.EVENT_DEACTIVATED
+    else:
+        event_type = OutboxEvent.EVENT_UPDATED
+
+    payload = _serialize_update_kwargs(model, kwargs)
+    aggregate_type = aggregate_type_for(model)
+    OutboxEvent.objects.using(using or 'default').bulk_create(
+        [
+            OutboxEvent(
+                aggregate_type=aggregate_type,
+                aggregate_id=pk,
+                event_type=event_type,
+                payload=payload,
+            )
+            for pk in pks
+        ],
+        batch_size=EVENT_BATCH_SIZE,
+    )
+
+
+class JSONLFileSink:
+    """Añade cada evento como una línea JSON a un fichero local"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def send(self, messages):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for message in messages:
+                f.write(json.dumps(message, cls=DjangoJSONEncoder, ensure_ascii=False))
+                f.write('\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class WebhookSink:
+    """Envía cada lote como un POST JSON; cualquier respuesta no 2xx aborta el lote"""
+
+    def __init__(self, url, timeout=10):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, messages):
+        body = json.dumps({'events': messages}, cls=DjangoJSONEncoder).encode('utf-8')
+        request = urllib.request.Request(
+            self.url,
+            data=body,
+            headers={'Content-Type': 'application/json'},
+            method='POST',
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            if not 200 <= response.status < 300:
+                raise RuntimeError(f"Webhook respondió {response.status}")
+
+
+def snapshot_xmin(using='default'):
+    """Transacción activa más antigua: todas las anteriores ya han terminado"""
+    with connections[using].cursor() as cursor:
+        cursor.execute('SELECT txid_snapshot_xmin(txid_current_snapshot())')
+        return cursor.fetchone()[0]
+
+
+def committed_events(after_transaction_id=0, after_event_id=0, xmin=None, using='default'):
+    """
+    Eventos posteriores al cursor (transaction_id, id) de transacciones ya
+    terminadas, en ese orden. xmin debe obtenerse antes de que la transacción
+    del lector escriba nada (ver snapshot_xmin).
+    """
+    if xmin is None:
+        xmin = snapshot_xmin(using)
+    return OutboxEvent.objects.using(using).filter(
+        Q(transaction_id__gt=after_transaction_id)
+        | Q(transaction_id=after_transaction_id, id__gt=after_event_id),
+        transaction_id__lt=xmin,
+    ).order_by('transaction_id', 'id')
+
+
+def relay_batch(consumer, sink, batch_size=500):
+    """
+    Entrega al sink el siguiente lote de eventos del consumidor y avanza su offset.
+    La entrega es at-least-once: si falla la confirmación el lote se reenvía,
+    por lo que los consumidores deben deduplicar por 'id'.
+    """
+    xmin = snapshot_xmin()
+    with transaction.atomic():
+        offset, _ = OutboxOffset.objects.select_for_update().get_or_create(consumer=consumer)
+        events = list(
+            committed_events(offset.last_transaction_id, offset.last_event_id, xmin)[:batch_size]
+        )
+        if not events:
+            return 0
+
+        sink.send([event.as_message() for event in events])
+
+        offset.last_transaction_id = events[-1].transaction_id
+        offset.last_event_id = events[-1].id
+        offset.save(update_fields=['last_transaction_id', 'last_event_id', 'updated_at'])
+    return len(events)
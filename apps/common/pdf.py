@@ -0,0 +1,57 @@
+"""
+Generador mínimo de PDF de una página con texto, sin dependencias.
+
+Suficiente para recibos y documentos tabulares sencillos: líneas de texto
+en Helvetica (WinAnsiEncoding, admite acentos, ñ y €) en posiciones fijas.
+La salida es determinista para el mismo contenido, así que volver a generar
+un documento produce exactamente los mismos bytes.
+"""
+
+PAGE_WIDTH = 595  # A4 en puntos
+PAGE_HEIGHT = 842
+
+
+def _escape(text):
+    data = str(text).encode('cp1252', errors='replace')
+    return data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+def render_pdf(lines, title=''):
+    """
+    lines: iterable de (x, y, tamaño, texto, negrita) en puntos desde la
+    esquina inferior izquierda. Devuelve los bytes del PDF.
+    """
+    content = bytearray()
+    for x, y, size, text, bold in lines:
+        font = b'/F2' if bold else b'/F1'
+        content += b'BT %s %d Tf %d %d Td (%s) Tj ET\n' % (font, size, x, y, _escape(text))
+
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        (
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] '
+            b'/Resources << /Font << /F1 4 0 R /F2 5 0 R >> >> /Contents 6 0 R >>'
+            % (PAGE_WIDTH, PAGE_HEIGHT)
+        ),
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>',
+        b'<< /Length %d >>\nstream\n%sendstream' % (len(content), bytes(content)),
+        b'<< /Title (%s) /Producer (CRM) >>' % _escape(title),
+    ]
+
+    output = bytearray(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+
+    xref = len(output)
+    output += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    for offset in offsets:
+        output += b'%010d 00000 n \n' % offset
+    output += (
+        b'trailer\n<< /Size %d /Root 1 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n'
+        % (len(objects) + 1, len(objects), xref)
+    )
+    return bytes(output)
@@ -0,0 +1,25 @@
+"""
+Ficheros privados bajo PRIVATE_ROOT (exportaciones, recibos).
+
+No tienen URL pública: cada vista del admin comprueba primero los permisos
+sobre el objeto (trabajo, cliente) y después sirve el fichero con
+private_file_response().
+"""
+
+import os
+
+from django.conf import settings
+from django.http import FileResponse, Http404
+
+
+def private_path(*parts):
+    return os.path.join(str(settings.PRIVATE_ROOT), *parts)
+
+
+def private_file_response(relative_path):
+    """Descarga de un fichero relativo a PRIVATE_ROOT; 404 si no existe o sale de la carpeta"""
+    root = os.path.realpath(str(settings.PRIVATE_ROOT))
+    path = os.path.realpath(os.path.join(root, relative_path))
+    if os.path.commonpath([root, path]) != root or not os.path.isfile(path):
+        raise Http404('Fichero no encontrado')
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=os.path.basename(path))
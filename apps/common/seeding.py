@@ -0,0 +1,58 @@
+"""
+Carga idempotente de datos de referencia (manage.py seed_reference_data).
+
+Cada app registra sus cargadores con @seeder en su módulo seeds.py. Todos se
+ejecutan en una única transacción, serializada con un advisory lock de
+PostgreSQL para que varios contenedores arrancando a la vez no compitan.
+Los cargadores deben hacer upsert por clave natural: volver a ejecutarlos
+sin cambios en los datos no escribe nada.
+"""
+
+from django.db import connection, transaction
+from django.utils.module_loading import autodiscover_modules
+
+
+# Identificador arbitrario del advisory lock de la carga
+SEED_LOCK_ID = 7_301_001
+
+_registry = []
+
+
+def seeder(name, order=100):
+    """Registra una función que carga datos de referencia y devuelve un resumen"""
+    def decorator(func):
+        _registry.append((order, name, func))
+        _registry.sort(key=lambda entry: (entry[0], entry[1]))
+        return func
+    return decorator
+
+
+def autodiscover_seeders():
+    """Importa el módulo seeds.py de cada app instalada"""
+    autodiscover_modules('seeds')
+
+
+def get_seeders(names=None):
+    seeders = [(name, func) for _order, name, func in _registry]
+    if names:
+        unknown = set(names) - {name for name, _func in seeders}
+        if unknown:
+            raise LookupError(f"Cargadores no registrados: {', '.join(sorted(unknown))}")
+        seeders = [(name, func) for name, func in seeders if name in names]
+    return seeders
+
+
+def run_seeders(names=None, dry_run=False):
+    """
+    Ejecuta los cargadores en orden dentro de una transacción.
+    Con dry_run se revierte todo al final y solo se devuelve el resumen.
+    """
+    results = []
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [SEED_LOCK_ID])
+        for name, func in get_seeders(names):
+            results.append((name, func()))
+        if dry_run:
+            transaction.set_rollback(True)
+    return results
@@ -0,0 +1,31 @@
+from django.apps import apps
+from django.db.models.signals import post_delete
+from django.dispatch import Signal
+
+from .models import OutboxEvent, OutboxModelMixin
+from .outbox import record_instance_event
+
+
+# Lo envía OutboxQuerySet.update (también desde bulk_update) dentro de su
+# transacción, con los pks actualizados y los campos asignados: update() no
+# emite post_save
+post_bulk_update = Signal()
+
+
+def record_delete_event(sender, instance, using, **kwargs):
+    """Los borrados (incluidos los CASCADE) se ejecutan dentro de la transacción del Collector"""
+    record_instance_event(instance, OutboxEvent.EVENT_DELETED, using=using)
+
+
+def connect_outbox_signals():
+    """
+    Solo los modelos del outbox: un receptor sin sender desactivaría el
+    borrado rápido (sin cargar objetos) de todos los demás modelos.
+    """
+    for model in apps.get_models():
+        if issubclass(model, OutboxModelMixin):
+            post_delete.connect(
+                record_delete_event,
+                sender=model,
+                dispatch_uid=f'outbox_delete_{model._meta.label_lower}',
+            )
@@ -0,0 +1,137 @@
+import threading
+
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+
+from apps.business_lines.models import BusinessLine
+from .models import Job, OutboxEvent, OutboxOffset
+from .outbox import aggregate_type_for, committed_events, relay_batch, snapshot_xmin
+
+
+def current_transaction_id():
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT txid_current()')
+        return cursor.fetchone()[0]
+
+
+def line_events(line):
+    return OutboxEvent.objects.filter(
+        aggregate_type=aggregate_type_for(BusinessLine), aggregate_id=line.pk
+    ).order_by('id')
+
+
+class ListSink:
+    def __init__(self, fail=False):
+        self.messages = []
+        self.fail = fail
+
+    def send(self, messages):
+        if self.fail:
+            raise RuntimeError('sink caído')
+        self.messages.extend(messages)
+
+
+class OutboxEventTests(TestCase):
+
+    def test_trigger_sets_the_writing_transaction(self):
+        line = BusinessLine.objects.create(name='Pruebas')
+        event = line_events(line).get()
+        self.assertEqual(event.event_type, OutboxEvent.EVENT_CREATED)
+        self.assertEqual(event.transaction_id, current_transaction_id())
+
+    def test_queryset_update_records_one_event_per_row(self):
+        lines = [BusinessLine.objects.create(name=f'Línea {number}') for number in range(3)]
+        OutboxEvent.objects.all().delete()
+
+        updated = BusinessLine.objects.filter(pk__in=[line.pk for line in lines[:2]]).update(is_active=False)
+
+        self.assertEqual(updated, 2)
+        events = OutboxEvent.objects.order_by('aggregate_id')
+        self.assertEqual(
+            [(event.aggregate_id, event.event_type) for event in events],
+            [(lines[0].pk, OutboxEvent.EVENT_DEACTIVATED), (lines[1].pk, OutboxEvent.EVENT_DEACTIVATED)],
+        )
+        self.assertIn('is_active', events[0].payload['changed_fields'])
+        self.assertIn('updated_at', events[0].payload['changed_fields'])
+
+    def test_delete_records_event_only_for_outbox_models(self):
+        line = BusinessLine.objects.create(name='Pruebas')
+        Job.objects.create(name='noop')
+        OutboxEvent.objects.all().delete()
+
+        line.delete()
+        Job.objects.all().delete()
+
+        self.assertEqual(
+            list(OutboxEvent.objects.values_list('aggregate_type', 'event_type')),
+            [(aggregate_type_for(BusinessLine), OutboxEvent.EVENT_DELETED)],
+        )
+
+    def test_committed_events_order_and_cursor(self):
+        events = [
+            OutboxEvent.objects.create(aggregate_type='x', aggregate_id=number, event_type='updated')
+            for number in range(4)
+        ]
+        # Ids en orden de inserción, transacciones confirmadas en otro orden
+        for event, transaction_id in zip(events, [7, 5, 7, 5]):
+            OutboxEvent.objects.filter(pk=event.pk).update(transaction_id=transaction_id)
+        ordered = [events[1].pk, events[3].pk, events[0].pk, events[2].pk]
+
+        self.assertEqual(list(committed_events(xmin=8).values_list('id', flat=True)), ordered)
+        self.assertEqual(list(committed_events(5, events[1].pk, xmin=8).values_list('id', flat=True)), ordered[1:])
+        # Las transacciones desde xmin pueden seguir abiertas: no se leen todavía
+        self.assertEqual(list(committed_events(xmin=7).values_list('id', flat=True)), ordered[:2])
+
+    def test_open_transaction_is_not_committed(self):
+        BusinessLine.objects.create(name='Pruebas')
+        self.assertGreater(current_transaction_id(), snapshot_xmin() - 1)
+        self.assertFalse(committed_events().filter(aggregate_type=aggregate_type_for(BusinessLine)).exists())
+
+
+class RelayTests(TransactionTestCase):
+
+    def test_relay_is_incremental_and_resends_failed_batches(self):
+        lines = [BusinessLine.objects.create(name=f'Línea {number}') for number in range(3)]
+
+        with self.assertRaises(RuntimeError):
+            relay_batch('pruebas', ListSink(fail=True))
+        # El offset se crea y avanza en la misma transacción que se revierte
+        self.assertFalse(OutboxOffset.objects.filter(consumer='pruebas').exists())
+
+        sink = ListSink()
+        self.assertEqual(relay_batch('pruebas', sink, batch_size=2), 2)
+        self.assertEqual(relay_batch('pruebas', sink, batch_size=2), 1)
+        self.assertEqual(relay_batch('pruebas', sink), 0)
+        self.assertEqual(
+            [message['aggregate_id'] for message in sink.messages], [line.pk for line in lines]
+        )
+
+    def test_slow_transaction_is_delivered_after_commit(self):
+        started, finish = threading.Event(), threading.Event()
+
+        def slow_writer():
+            try:
+                with transaction.atomic():
+                    BusinessLine.objects.create(name='Lenta')
+                    started.set()
+                    finish.wait(10)
+            finally:
+                connection.close()
+
+        writer = threading.Thread(target=slow_writer)
+        writer.start()
+        started.wait(10)
+        # Una transacción posterior confirma antes que la lenta
+        fast = BusinessLine.objects.create(name='Rápida')
+
+        sink = ListSink()
+        relay_batch('pruebas', sink)
+        self.assertEqual([message['aggregate_id'] for message in sink.messages], [])
+
+        finish.set()
+        writer.join()
+        relay_batch('pruebas', sink)
+        slow = BusinessLine.objects.get(name='Lenta')
+        self.assertEqual(
+            sorted(message['aggregate_id'] for message in sink.messages), sorted([slow.pk, fast.pk])
+        )
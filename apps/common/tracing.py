@@ -0,0 +1,243 @@
+"""
+Trazas locales de peticiones con spans anidados.
+
+TracingMiddleware abre una traza por petición (muestreada según
+TRACING_SAMPLE_RATE) y dentro de ella se registran spans para:
+- la vista resuelta,
+- cada consulta SQL (connection.execute_wrapper),
+- el renderizado de cada plantilla (Template.render),
+- las funciones decoradas con @traced (p.ej. columnas calculadas del admin).
+
+El span activo vive en una contextvar, así que los spans se anidan solos y
+fuera de una traza muestreada span() no hace nada. Las trazas terminadas se
+añaden como una línea JSON a TRACING_PATH; manage.py trace_report las resume.
+
+Aunque la petición no se muestree, el middleware cuenta las consultas y su
+tiempo y los devuelve en las cabeceras X-DB-Queries y X-DB-Time-Ms.
+"""
+
+import contextvars
+import functools
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Template
+
+
+DEFAULT_SAMPLE_RATE = 0.1
+DEFAULT_MAX_SPANS = 5000
+SQL_MAX_LENGTH = 500
+
+_current_trace = contextvars.ContextVar('tracing_trace', default=None)
+_current_span = contextvars.ContextVar('tracing_span', default=None)
+_write_lock = threading.Lock()
+
+
+class Trace:
+    """Spans de una petición; cada span es un dict serializable"""
+
+    def __init__(self, name, sampled, max_spans=DEFAULT_MAX_SPANS):
+        self.trace_id = uuid.uuid4().hex
+        self.name = name
+        self.sampled = sampled
+        self.max_spans = max_spans
+        self.started = time.time()
+        self.origin = time.perf_counter()
+        self.spans = []
+        self.dropped = 0
+        self.attributes = {}
+        self.db_queries = 0
+        self.db_time = 0.0
+
+    def start_span(self, name, kind, parent, attributes):
+        if len(self.spans) >= self.max_spans:
+            self.dropped += 1
+            return None
+        span = {
+            'id': len(self.spans) + 1,
+            'parent_id': parent['id'] if parent else None,
+            'name': name,
+            'kind': kind,
+            'start_ms': (time.perf_counter() - self.origin) * 1000,
+            'duration_ms': None,
+            'attributes': attributes or {},
+        }
+        self.spans.append(span)
+        return span
+
+    def as_dict(self):
+        duration = self.spans[0]['duration_ms'] if self.spans else None
+        return {
+            'trace_id': self.trace_id,
+            'name': self.name,
+            'timestamp': self.started,
+            'duration_ms': duration,
+            'db_queries': self.db_queries,
+            'db_time_ms': round(self.db_time * 1000, 3),
+            'dropped_spans': self.dropped,
+            'attributes': self.attributes,
+            'spans': self.spans,
+        }
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def _open_span(name, kind, attributes):
+    trace = _current_trace.get()
+    if trace is None or not trace.sampled:
+        return None
+    current = trace.start_span(name, kind, _current_span.get(), attributes)
+    if current is None:
+        return None
+    return current, _current_span.set(current), time.perf_counter()
+
+
+def _close_span(opened):
+    current, token, started = opened
+    current['duration_ms'] = round((time.perf_counter() - started) * 1000, 3)
+    _current_span.reset(token)
+
+
+@contextmanager
+def span(name, kind='internal', **attributes):
+    """Span anidado bajo el span activo; no hace nada fuera de una traza muestreada"""
+    opened = _open_span(name, kind, attributes)
+    if opened is None:
+        yield None
+        return
+    try:
+        yield opened[0]
+    except Exception as e:
+        opened[0]['attributes']['error'] = type(e).__name__
+        raise
+    finally:
+        _close_span(opened)
+
+
+def traced(name=None, kind='function'):
+    """Decorador: ejecuta la función dentro de un span con su nombre cualificado"""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            trace = _current_trace.get()
+            if trace is None or not trace.sampled:
+                return func(*args, **kwargs)
+            with span(span_name, kind):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _sql_wrapper(execute, sql, params, many, context):
+    trace = _current_trace.get()
+    if trace is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        if trace.sampled:
+            with span('sql', 'db', sql=sql[:SQL_MAX_LENGTH], many=many,
+                      alias=context['connection'].alias):
+                return execute(sql, params, many, context)
+        return execute(sql, params, many, context)
+    finally:
+        trace.db_queries += 1
+        trace.db_time += time.perf_counter() - started
+
+
+_original_template_render = Template.render
+
+
+def _traced_template_render(self, context):
+    trace = _current_trace.get()
+    if trace is None or not trace.sampled:
+        return _original_template_render(self, context)
+    with span(f'template {self.name or "<string>"}', 'template'):
+        return _original_template_render(self, context)
+
+
+def install_template_tracing():
+    """Envuelve Template.render del motor de Django (se llama desde CommonConfig.ready)"""
+    Template.render = _traced_template_render
+
+
+class JSONLTraceSink:
+    """Añade cada traza terminada como una línea JSON al fichero"""
+
+    def __init__(self, path):
+        self.path = str(path)
+
+    def export(self, trace):
+        line = json.dumps(trace.as_dict(), ensure_ascii=False, default=str)
+        directory = os.path.dirname(self.path)
+        with _write_lock:
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+
+def get_sink():
+    return JSONLTraceSink(getattr(settings, 'TRACING_PATH', 'traces.jsonl'))
+
+
+class TracingMiddleware:
+    """Abre una traza por petición; se desactiva si TRACING_ENABLED es falso"""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'TRACING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'TRACING_SAMPLE_RATE', DEFAULT_SAMPLE_RATE)
+        self.max_spans = getattr(settings, 'TRACING_MAX_SPANS', DEFAULT_MAX_SPANS)
+        self.sink = get_sink()
+
+    def __call__(self, request):
+        sampled = random.random() < self.sample_rate
+        trace = Trace(f'{request.method} {request.path}', sampled, self.max_spans)
+        trace_token = _current_trace.set(trace)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(_sql_wrapper))
+                with span(trace.name, 'request', method=request.method, path=request.path) as root:
+                    try:
+                        response = self.get_response(request)
+                    finally:
+                        # El span de la vista abierto en process_view cubre vista y renderizado
+                        view_span = getattr(request, '_tracing_view_span', None)
+                        if view_span is not None:
+                            _close_span(view_span)
+                            request._tracing_view_span = None
+                    if root is not None:
+                        root['attributes']['status'] = response.status_code
+        finally:
+            _current_trace.reset(trace_token)
+
+        response['X-DB-Queries'] = str(trace.db_queries)
+        response['X-DB-Time-Ms'] = f'{trace.db_time * 1000:.1f}'
+        if sampled:
+            response['X-Trace-Id'] = trace.trace_id
+            self.sink.export(trace)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        trace = _current_trace.get()
+        if trace is None or not trace.sampled:
+            return None
+        match = request.resolver_match
+        view_name = match.view_name if match and match.view_name else view_func.__qualname__
+        trace.attributes['view'] = view_name
+        request._tracing_view_span = _open_span(f'view {view_name}', 'view', {})
+        return None
@@ -0,0 +1,126 @@
+"""
+Calentamiento de procesos antes de aceptar tráfico (ver config/gunicorn.conf.py).
+
+Con preload_app el maestro de gunicorn carga Django una sola vez; warm_up()
+completa lo que Django deja para la primera petición (URLconf, compilación
+de plantillas, árbol de líneas de negocio en la caché local) para que los
+workers lo hereden ya hecho al hacer fork. Las conexiones a la base de datos
+no se pueden compartir entre procesos: el maestro las cierra antes del fork
+y cada worker abre las suyas en open_connections().
+"""
+
+import gc
+import importlib
+import logging
+import time
+
+from django.db import connections
+from django.forms.renderers import get_default_renderer
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template
+from django.urls import get_resolver
+
+
+logger = logging.getLogger(__name__)
+
+# Plantillas de las páginas más visitadas del admin
+TEMPLATES = [
+    'admin/index.html',
+    'admin/login.html',
+    'admin/change_list.html',
+    'admin/change_form.html',
+    'admin/change_list_results.html',
+    'admin/accounting/client/change_list.html',
+    'admin/accounting/client/revenue_projection.html',
+    'admin/accounting/client/cohort_report.html',
+]
+
+# Widgets de list_editable y de los formularios (motor del renderer de formularios)
+FORM_TEMPLATES = [
+    'django/forms/widgets/input.html',
+    'django/forms/widgets/text.html',
+    'django/forms/widgets/number.html',
+    'django/forms/widgets/select.html',
+    'django/forms/widgets/select_option.html',
+    'django/forms/widgets/checkbox.html',
+    'django/forms/widgets/attrs.html',
+]
+
+# Módulos que las vistas importan de forma diferida (NumPy): en el maestro
+# se importan una vez y los workers comparten esas páginas de memoria
+MODULES = [
+    'apps.accounting.projections',
+    'apps.accounting.analytics',
+]
+
+
+def import_modules():
+    for name in MODULES:
+        importlib.import_module(name)
+
+
+def load_urlconf():
+    """Importa el URLconf y las vistas (Django lo hace en la primera petición)"""
+    resolver = get_resolver()
+    # reverse_dict recorre todos los patrones (incluidos los del admin)
+    return len(resolver.reverse_dict)
+
+
+def compile_templates():
+    """Compila las plantillas en el loader cacheado del motor correspondiente"""
+    compiled = 0
+    for name in TEMPLATES:
+        try:
+            get_template(name)
+            compiled += 1
+        except TemplateDoesNotExist:
+            logger.warning("Plantilla de calentamiento inexistente: %s", name)
+    renderer = get_default_renderer()
+    for name in FORM_TEMPLATES:
+        renderer.get_template(name)
+        compiled += 1
+    return compiled
+
+
+def open_connections():
+    """Abre (o comprueba) una conexión por alias; requiere CONN_MAX_AGE para reutilizarla"""
+    for connection in connections.all():
+        connection.ensure_connection()
+
+
+def close_connections():
+    for connection in connections.all():
+        connection.close()
+
+
+def prime_caches():
+    """Carga el árbol de líneas de negocio en la caché"""
+    from apps.business_lines.hierarchy import get_tree
+
+    return len(get_tree().nodes)
+
+
+def warm_up(fork=True):
+    """
+    Calentamiento completo en el proceso maestro.
+    Con fork=True cierra las conexiones y congela el heap para que los
+    workers compartan las páginas de memoria copy-on-write.
+    """
+    started = time.perf_counter()
+    load_urlconf()
+    import_modules()
+    templates = compile_templates()
+    try:
+        lines = prime_caches()
+    except Exception:
+        # Sin base de datos disponible el worker arranca igualmente
+        logger.exception("No se pudo precargar el árbol de líneas de negocio")
+        lines = 0
+    if fork:
+        close_connections()
+        gc.collect()
+        gc.freeze()
+    logger.info(
+        "Calentamiento completado en %.0f ms: %d plantillas, %d líneas de negocio",
+        (time.perf_counter() - started) * 1000, templates, lines,
+    )
@@ -0,0 +1,43 @@
+"""
+Configuración de gunicorn para producción.
+
+    gunicorn -c config/gunicorn.conf.py config.wsgi
+
+El maestro carga Django una vez (preload_app) y lo calienta antes de crear
+los workers, que heredan por fork el registro de apps, el URLconf, las
+plantillas compiladas y el árbol de líneas de negocio. Cada worker solo
+abre su conexión a la base de datos antes de aceptar peticiones.
+"""
+
+import multiprocessing
+import os
+
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 200))
+
+preload_app = True
+accesslog = '-'
+errorlog = '-'
+
+
+def when_ready(server):
+    """Maestro: calentamiento completo antes de crear los workers"""
+    if not server.cfg.preload_app:
+        return
+    from apps.common.warmup import warm_up
+
+    warm_up(fork=True)
+
+
+def post_worker_init(worker):
+    """Worker: conexión propia a la base de datos antes de aceptar tráfico"""
+    from apps.common.warmup import open_connections
+
+    try:
+        open_connections()
+    except Exception:
+        worker.log.exception("No se pudo abrir la conexión a la base de datos")
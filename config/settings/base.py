@@ -67,6 +67,7 @@ DJANGO_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 ]
 
 THIRD_PARTY_APPS = [
@@ -85,6 +86,7 @@ INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'apps.common.tracing.TracingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -168,6 +170,23 @@ SASS_PROCESSOR_ROOT = BASE_DIR / 'static'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Ficheros con datos personales (exportaciones CSV, recibos): nunca se
+# publican por MEDIA_URL, solo se descargan desde vistas del admin con permisos
+PRIVATE_ROOT = get_env('PRIVATE_ROOT', default=str(BASE_DIR / 'private'))
+
+# Ámbito de líneas de negocio (apps.business_lines.scoping): el personal sin
+# líneas asignadas no ve ningún cliente salvo que esto se active
+BUSINESS_LINES_UNASSIGNED_SEE_ALL = get_env('BUSINESS_LINES_UNASSIGNED_SEE_ALL', default=False, cast=bool)
+
+# Trazas locales de peticiones (apps.common.tracing, manage.py trace_report)
+TRACING_ENABLED = get_env('TRACING_ENABLED', default=False, cast=bool)
+TRACING_SAMPLE_RATE = get_env('TRACING_SAMPLE_RATE', default=0.1, cast=float)
+TRACING_PATH = get_env('TRACING_PATH', default=str(BASE_DIR / 'logs' / 'traces.jsonl'))
+TRACING_MAX_SPANS = 5000
+
+# Instantáneas Parquet para análisis (manage.py export_snapshot)
+SNAPSHOT_ROOT = get_env('SNAPSHOT_ROOT', default=str(BASE_DIR / 'snapshots'))
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
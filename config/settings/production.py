@@ -16,6 +16,18 @@ MIDDLEWARE = [
 
 # Database ya está configurada en base.py con get_env()
 # Las variables se configuran en el servidor de producción
+# Conexiones persistentes: la que abre cada worker al arrancar se reutiliza
+DATABASES['default']['CONN_MAX_AGE'] = get_env('DATABASE_CONN_MAX_AGE', default=300, cast=int)
+DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+# sass_processor y compressor solo hacen falta al construir los estáticos
+# (BUILD_STATIC=1 manage.py collectstatic); en ejecución no se importan
+if not get_env('BUILD_STATIC', default=False, cast=bool):
+    INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in ('sass_processor', 'compressor')]
+    STATICFILES_FINDERS = [
+        finder for finder in STATICFILES_FINDERS
+        if not finder.startswith(('sass_processor.', 'compressor.'))
+    ]
 
 # Static files for production
 COMPRESS_ENABLED = True
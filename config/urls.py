@@ -17,6 +17,13 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path
 
+from apps.common.autocomplete import CachedAutocompleteJsonView
+
 urlpatterns = [
+    # Antes que admin.site.urls: sustituye al endpoint de autocompletado estándar
+    path(
+        'admin/autocomplete/',
+        admin.site.admin_view(CachedAutocompleteJsonView.as_view(admin_site=admin.site)),
+    ),
     path('admin/', admin.site.urls),
 ]